@@ -1,13 +1,23 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from web3 import Web3
-import rlp
 from supabase import create_client, Client
+import atexit
 import datetime
 from dotenv import load_dotenv
 import os
+import time
 from flask_cors import CORS, cross_origin
 # from bitpay import Client as Bitpay_Client
 import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'telegram-bot'))
+import prediction
+import predict_api
+from reverse_index import build_reverse_index
+from salt_search import SaltSearch, SearchBusy
+from rpc_cache import BlockAwareCache
+from write_behind import WriteBehindQueue
+from balance_engine import BalanceEngine
+from rpc_router import MultiEndpointProvider
 app = Flask(__name__)
 cors = CORS(app)
 app.config['CORS_HEADERS'] = 'Content-Type'
@@ -20,77 +30,374 @@ print(supabase_url, supabase_key)
 supabase: Client = create_client(supabase_url, supabase_key)
 # Web3 configuration
 alchemy_api_key = os.environ.get('ALCHEMY_API_KEY')
-web3 = Web3(Web3.HTTPProvider(f'https://eth-mainnet.g.alchemy.com/v2/{alchemy_api_key}'))
+rpc_url = os.environ.get('ETH_RPC_URL') or f'https://eth-mainnet.g.alchemy.com/v2/{alchemy_api_key}'
+# Extra comma-separated endpoints; reads go to the fastest healthy one, hedged when slow
+rpc_extra_urls = [url for url in os.environ.get('ETH_RPC_EXTRA_URLS', '').split(',') if url]
+web3 = Web3(MultiEndpointProvider(
+    [rpc_url] + rpc_extra_urls,
+    pool_size=int(os.environ.get('RPC_POOL_SIZE', '20')),
+    timeout=float(os.environ.get('RPC_TIMEOUT', '10')),
+    hedge=os.environ.get('RPC_HEDGE', 'true').lower() == 'true'
+))
+# Block-aware cache for RPC lookups and pure predictions
+rpc_cache = BlockAwareCache(
+    lambda: web3.eth.block_number,
+    predict_api.cache_network(rpc_url, lambda: web3.eth.chain_id),
+    block_interval=float(os.environ.get('RPC_CACHE_BLOCK_INTERVAL', '1.0')),
+    lru_size=int(os.environ.get('PREDICTION_CACHE_SIZE', '10000'))
+)
+# ETH and ERC-20 balances for many addresses per multicall, cached per block
+balance_engine = BalanceEngine(
+    web3,
+    rpc_cache.block_number,
+    chunk_size=int(os.environ.get('BALANCES_CHUNK_SIZE', '500'))
+)
+BALANCES_MAX_ADDRESSES = int(os.environ.get('BALANCES_MAX_ADDRESSES', '1000'))
+BALANCES_MAX_TOKENS = int(os.environ.get('BALANCES_MAX_TOKENS', '20'))
+# Prediction rows are written to Supabase in the background, in multi-row inserts
+def insert_predictions(rows):
+    response = supabase.table('predictions').insert(rows).execute()
+    print(f"Supabase insert of {len(rows)} predictions: {len(response.data)} rows")
+    # The batch is written; only persisted senders are indexed, on their own queue
+    for row in rows:
+        sender_indexing.put({'sender': row['contract_address']})
+
+def index_senders(rows):
+    # Never raises: a failed batch would be retried, and indexing is best effort
+    try:
+        reverse_index.add_senders({row['sender'] for row in rows})
+    except Exception as e:
+        print(f"Error indexing {len(rows)} senders: {e}")
+
+prediction_writes = predict_api.make_prediction_writes(insert_predictions)
+atexit.register(prediction_writes.close)
+sender_indexing = WriteBehindQueue(
+    index_senders,
+    max_backlog=int(os.environ.get('REVERSE_INDEX_MAX_BACKLOG', '10000')),
+    overflow='drop_newest',
+    name='sender-indexing'
+)
+atexit.register(sender_indexing.close)
+# Batch prediction configuration
+PREDICT_BATCH_CHUNK_SIZE = int(os.environ.get('PREDICT_BATCH_CHUNK_SIZE', '100'))
+PREDICT_BATCH_MAX_ITEMS = int(os.environ.get('PREDICT_BATCH_MAX_ITEMS', '1000'))
+# Reverse lookup index (predicted address -> deployer, nonce)
+REVERSE_INDEX_NONCE_HORIZON = int(os.environ.get('REVERSE_INDEX_NONCE_HORIZON', '1000'))
+# About 200 bytes of memory per entry; built in the background
+REVERSE_INDEX_MAX_ENTRIES = int(os.environ.get('REVERSE_INDEX_MAX_ENTRIES', '2000000'))
+reverse_index = build_reverse_index(supabase, REVERSE_INDEX_NONCE_HORIZON, os.environ.get('REVERSE_INDEX_PATH'),
+                                    REVERSE_INDEX_MAX_ENTRIES)
+# CREATE2 vanity salt searches, keyed by search id
+CREATE2_MAX_SALTS = int(os.environ.get('CREATE2_MAX_SALTS', '1000'))
+CREATE2_MAX_PATTERN_LENGTH = int(os.environ.get('CREATE2_MAX_PATTERN_LENGTH', '6'))
+CREATE2_MAX_PROCESSES = int(os.environ.get('CREATE2_MAX_PROCESSES', str(os.cpu_count() or 1)))
+# Finished searches stay pollable for this many seconds, then are dropped
+CREATE2_SEARCH_TTL = int(os.environ.get('CREATE2_SEARCH_TTL', '3600'))
+salt_searches = {}
+
+def expire_salt_searches():
+    now = time.monotonic()
+    for search_id, search in list(salt_searches.items()):
+        if search.done and now - search.finished_at > CREATE2_SEARCH_TTL:
+            salt_searches.pop(search_id, None)
 # bitpay = Bitpay_Client.create_client_by_config_file_path("./bitpay.config.json")
 # console.log(bitpay)
 def mk_contract_address(sender, nonce):
-    return Web3.keccak(rlp.encode([Web3.to_bytes(hexstr=sender), nonce]))[12:]
+    return prediction.contract_address_bytes(prediction.sender_to_bytes(sender), nonce)
 
 def get_contract_address(sender, nonce):
-    contract_address = mk_contract_address(sender, nonce)
-    return Web3.to_checksum_address(contract_address)
+    return prediction.predict_contract_address(sender, nonce)
+
+def get_transaction_count(address):
+    return rpc_cache.get('eth_getTransactionCount', address,
+                         lambda: web3.eth.get_transaction_count(Web3.to_checksum_address(address)))
 
 @app.route('/predict', methods=['POST'])
 def predict_contract_address():
+    # Request handling is shared with asgi_app.py through predict_api
     try:
-        if request.content_type != 'application/json':
-            return jsonify({'error': "Unsupported Media Type: Content-Type must be 'application/json'"}), 415
-        data = request.get_json()
-        if data is None:
-            return jsonify({'error': 'Invalid JSON'}), 400
-
-
-        contract_address = data.get('contractAddress')
-        nonce = data.get('nonce')
-
-        if not contract_address:
-            return jsonify({'error': 'Missing contractAddress parameter'}), 400
+        contract_address, nonce, nonce_range = predict_api.parse_predict_request(
+            request.content_type, request.get_json(silent=True))
 
+        if nonce_range is not None:
+            nonce_start, count, stream = nonce_range
+            if nonce_start is None:
+                nonce_start = get_transaction_count(contract_address)
+            predict_api.check_range(nonce_start, count, stream)
+            if not stream:
+                return jsonify(predict_api.range_body(contract_address, nonce_start, count))
+            return Response(stream_with_context(predict_api.iter_range_json(contract_address, nonce_start, count)),
+                            mimetype='application/json')
 
         # Get the current block number
-        block_number = web3.eth.block_number
+        block_number = rpc_cache.block_number()
 
         if nonce is not None:
-            nonce = int(nonce)
             # Predict the contract address for the specified nonce
-            predicted_address = get_contract_address(contract_address, nonce)
+            predicted_address = rpc_cache.memoize(
+                (contract_address.lower(), nonce), lambda: get_contract_address(contract_address, nonce)
+            )
         else:
-            # Get the current nonce for the contract address
-            current_nonce = web3.eth.get_transaction_count(contract_address)
             # Predict the contract address for the next nonce (automatic nonce detection)
-            predicted_address = get_contract_address(contract_address, current_nonce)
+            nonce = get_transaction_count(contract_address)
+            predicted_address = get_contract_address(contract_address, nonce)
 
         print(f"Predicted Address: {predicted_address}")
 
-        # Get the current timestamp
-        timestamp = datetime.datetime.now().isoformat()
-
         # Get the balance of the contract address
-        balance = web3.eth.get_balance(contract_address)
+        balance = rpc_cache.get('eth_getBalance', contract_address,
+                                lambda: web3.eth.get_balance(Web3.to_checksum_address(contract_address)))
         balance_in_eth = web3.from_wei(balance, 'ether')
 
         print(f"Balance in ETH: {balance_in_eth}")
 
-        if balance_in_eth > 1.5:
-            # Insert the data into the Supabase table only if balance is greater than 1.5 ETH
-            data = {
+        row = predict_api.prediction_row(contract_address, predicted_address, block_number, nonce, balance_in_eth)
+        if row is not None and not prediction_writes.put(row):
+            print(f"Prediction write queue full, dropped row for {contract_address}")
+
+        return jsonify(predict_api.predict_response(predicted_address, balance_in_eth))
+
+    except predict_api.PredictRequestError as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        print(f"Error in /predict endpoint: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+def _predict_batch_chunk(items):
+    # One JSON-RPC batch per chunk: a nonce lookup for every item without an
+    # explicit nonce, plus a balance lookup for every item.
+    with web3.batch_requests() as batch:
+        for item in items:
+            if item['nonce'] is None:
+                batch.add(web3.eth.get_transaction_count(item['address']))
+            batch.add(web3.eth.get_balance(item['address']))
+        responses = batch.execute()
+
+    results = iter(responses)
+    for item in items:
+        if item['nonce'] is None:
+            item['nonce'] = next(results)
+        item['balance'] = next(results)
+        item['predicted_address'] = get_contract_address(item['address'], item['nonce'])
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_contract_address_batch():
+    try:
+        if request.content_type != 'application/json':
+            return jsonify({'error': "Unsupported Media Type: Content-Type must be 'application/json'"}), 415
+        data = request.get_json()
+        if data is None:
+            return jsonify({'error': 'Invalid JSON'}), 400
+
+        items = data.get('items') if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            return jsonify({'error': 'Expected a list of items'}), 400
+        if len(items) > PREDICT_BATCH_MAX_ITEMS:
+            return jsonify({'error': f'Too many items: maximum is {PREDICT_BATCH_MAX_ITEMS}'}), 413
+
+        results = [None] * len(items)
+        pending = []
+        for index, item in enumerate(items):
+            contract_address = item.get('contractAddress') if isinstance(item, dict) else None
+            if not contract_address:
+                results[index] = {'error': 'Missing contractAddress parameter'}
+                continue
+            if not Web3.is_address(contract_address):
+                results[index] = {'contractAddress': contract_address, 'error': 'Invalid contractAddress'}
+                continue
+            try:
+                nonce = int(item['nonce']) if item.get('nonce') is not None else None
+            except (TypeError, ValueError):
+                results[index] = {'contractAddress': contract_address, 'error': 'Invalid nonce'}
+                continue
+            pending.append({
+                'index': index,
                 'contract_address': contract_address,
-                'predicted_address': predicted_address,
-                'block_number': block_number,
-                'timestamp': timestamp,
-                'nonce': nonce if nonce is not None else current_nonce,
-                'balance': float(balance_in_eth)  # Convert balance to float
+                'address': Web3.to_checksum_address(contract_address),
+                'nonce': nonce,
+            })
+
+        # Get the current block number once for the whole batch
+        block_number = rpc_cache.block_number() if pending else None
+        timestamp = datetime.datetime.now().isoformat()
+        rows = []
+
+        for start in range(0, len(pending), PREDICT_BATCH_CHUNK_SIZE):
+            chunk = pending[start:start + PREDICT_BATCH_CHUNK_SIZE]
+            try:
+                _predict_batch_chunk(chunk)
+            except Exception as e:
+                print(f"Error in /predict/batch chunk starting at {start}: {str(e)}")
+                for item in chunk:
+                    results[item['index']] = {'contractAddress': item['contract_address'], 'error': 'RPC request failed'}
+                continue
+
+            for item in chunk:
+                balance_in_eth = web3.from_wei(item['balance'], 'ether')
+                results[item['index']] = {
+                    'contractAddress': item['contract_address'],
+                    'nonce': item['nonce'],
+                    'predictedAddress': item['predicted_address'],
+                    'balance': float(balance_in_eth)
+                }
+                if balance_in_eth > 1.5:
+                    rows.append({
+                        'contract_address': item['contract_address'],
+                        'predicted_address': item['predicted_address'],
+                        'block_number': block_number,
+                        'timestamp': timestamp,
+                        'nonce': item['nonce'],
+                        'balance': float(balance_in_eth)
+                    })
+
+        dropped = sum(not prediction_writes.put(row) for row in rows)
+        if dropped:
+            print(f"Prediction write queue full, dropped {dropped} rows")
+
+        return jsonify({'blockNumber': block_number, 'results': results})
+
+    except Exception as e:
+        print(f"Error in /predict/batch endpoint: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/balances', methods=['POST'])
+def get_balances():
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Invalid JSON'}), 400
+        addresses = data.get('addresses')
+        tokens = data.get('tokens') or []
+        if not isinstance(addresses, list) or not addresses or not isinstance(tokens, list):
+            return jsonify({'error': 'Expected a non-empty list of addresses and an optional list of tokens'}), 400
+        if len(addresses) > BALANCES_MAX_ADDRESSES:
+            return jsonify({'error': f'Too many addresses: maximum is {BALANCES_MAX_ADDRESSES}'}), 413
+        if len(tokens) > BALANCES_MAX_TOKENS:
+            return jsonify({'error': f'Too many tokens: maximum is {BALANCES_MAX_TOKENS}'}), 413
+        invalid = [address for address in addresses + tokens if not isinstance(address, str) or not Web3.is_address(address)]
+        if invalid:
+            return jsonify({'error': 'Invalid address', 'invalid': invalid}), 400
+
+        token_info = balance_engine.token_info(tokens)
+        block_number, balances = balance_engine.balances(addresses, tokens)
+        # Raw amounts as strings: token balances overflow JSON numbers
+        return jsonify({
+            'blockNumber': block_number,
+            'tokens': token_info,
+            'balances': {
+                holder: {asset: str(amount) if amount is not None else None for asset, amount in assets.items()}
+                for holder, assets in balances.items()
             }
-            print("Entered this case")
-            response = supabase.table('predictions').insert(data).execute()
-            print(f"Supabase insert response: {response}")
+        })
+
+    except Exception as e:
+        print(f"Error in /balances endpoint: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/reverse/<address>', methods=['GET'])
+def reverse_lookup(address):
+    if not Web3.is_address(address):
+        return jsonify({'error': 'Invalid address'}), 400
+    result = reverse_index.lookup(address)
+    if result is None and not reverse_index.ready.is_set():
+        return jsonify({'error': 'Reverse index is warming up, try again shortly'}), 503
+    if result is None:
+        return jsonify({'error': 'Address not found in reverse index', 'nonceHorizon': reverse_index.horizon}), 404
+    sender, nonce = result
+    return jsonify({'contractAddress': Web3.to_checksum_address(address), 'deployer': sender, 'nonce': nonce})
+
+def _create2_code_hash(data):
+    if data.get('initCodeHash'):
+        return data['initCodeHash']
+    if data.get('initCode'):
+        return prediction.init_code_hash(data['initCode'])
+    return None
+
+@app.route('/create2', methods=['POST'])
+def predict_create2_address():
+    try:
+        data = request.get_json(silent=True)
+        if data is None:
+            return jsonify({'error': 'Invalid JSON'}), 400
+
+        deployer = data.get('deployer')
+        code_hash = _create2_code_hash(data)
+        if not deployer or not Web3.is_address(deployer):
+            return jsonify({'error': 'Missing or invalid deployer parameter'}), 400
+        if code_hash is None:
+            return jsonify({'error': 'Missing initCodeHash or initCode parameter'}), 400
+
+        if data.get('salts') is not None:
+            salts = data['salts']
+            if not isinstance(salts, list) or len(salts) > CREATE2_MAX_SALTS:
+                return jsonify({'error': f'salts must be a list of at most {CREATE2_MAX_SALTS} items'}), 400
+            return jsonify({'predictedAddresses': prediction.predict_create2_addresses(deployer, salts, code_hash)})
 
-        return jsonify({'predictedAddress': predicted_address, 'balance': float(balance_in_eth)})  # Convert balance to float
+        if data.get('salt') is None:
+            return jsonify({'error': 'Missing salt or salts parameter'}), 400
+        return jsonify({'predictedAddress': prediction.predict_create2_address(deployer, data['salt'], code_hash)})
 
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"Error in /predict endpoint: {str(e)}")
+        print(f"Error in /create2 endpoint: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/create2/search', methods=['POST'])
+def start_create2_search():
+    try:
+        data = request.get_json(silent=True)
+        if data is None:
+            return jsonify({'error': 'Invalid JSON'}), 400
+
+        deployer = data.get('deployer')
+        code_hash = _create2_code_hash(data)
+        if not deployer or not Web3.is_address(deployer):
+            return jsonify({'error': 'Missing or invalid deployer parameter'}), 400
+        if code_hash is None:
+            return jsonify({'error': 'Missing initCodeHash or initCode parameter'}), 400
+
+        prefix, suffix = str(data.get('prefix', '')), str(data.get('suffix', ''))
+        if len(prefix.removeprefix('0x')) + len(suffix) > CREATE2_MAX_PATTERN_LENGTH:
+            return jsonify({'error': f'Prefix and suffix may total at most {CREATE2_MAX_PATTERN_LENGTH} hex characters'}), 400
+        processes = min(int(data.get('processes') or CREATE2_MAX_PROCESSES), CREATE2_MAX_PROCESSES)
+
+        expire_salt_searches()
+        search = SaltSearch(deployer, code_hash, prefix, suffix, processes)
+        # Each search keeps its cores busy, so only one may run at a time
+        salt_searches[search.id] = search.start()
+        return jsonify(search.progress()), 202
+
+    except SearchBusy as e:
+        return jsonify({'error': str(e)}), 429
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error in /create2/search endpoint: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/create2/search/<search_id>', methods=['GET', 'DELETE'])
+def create2_search_status(search_id):
+    expire_salt_searches()
+    search = salt_searches.get(search_id)
+    if search is None:
+        return jsonify({'error': 'Unknown search id'}), 404
+    if request.method == 'DELETE':
+        search.cancel()
+    return jsonify(search.progress())
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({**rpc_cache.stats(), 'balances': balance_engine.stats()})
+
+@app.route('/rpc/stats', methods=['GET'])
+def rpc_stats():
+    return jsonify(web3.provider.stats())
+
+@app.route('/writes/stats', methods=['GET'])
+def write_stats():
+    return jsonify({'predictions': prediction_writes.stats(), 'senderIndexing': sender_indexing.stats()})
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'Server is running'}), 200
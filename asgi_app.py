@@ -0,0 +1,113 @@
+from quart import Quart, request, jsonify
+from quart_cors import cors
+from web3 import AsyncWeb3, Web3
+from supabase import create_client, Client
+import asyncio
+import atexit
+from dotenv import load_dotenv
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'telegram-bot'))
+import prediction
+import predict_api
+from rpc_cache import BlockAwareCache
+
+# Async serving mode for the prediction API. Serves only /predict and /health;
+# /predict handles requests exactly like app.py (both go through predict_api),
+# but on an async web3 provider so the block number, nonce and balance lookups
+# run concurrently and many requests share one process. Everything else
+# (batch, reverse lookup, CREATE2, balances, write stats) stays on app.py.
+# Run with: uvicorn asgi_app:app --port 5000
+app = cors(Quart(__name__))
+load_dotenv()
+# Supabase configuration
+supabase_url = os.environ.get('SUPABASE_URL')
+supabase_key = os.environ.get('SUPABASE_KEY')
+supabase: Client = create_client(supabase_url, supabase_key)
+# Web3 configuration
+alchemy_api_key = os.environ.get('ALCHEMY_API_KEY')
+rpc_url = os.environ.get('ETH_RPC_URL') or f'https://eth-mainnet.g.alchemy.com/v2/{alchemy_api_key}'
+web3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(rpc_url))
+
+async def get_block_number():
+    return await web3.eth.block_number
+
+# Block-aware cache for RPC lookups and pure predictions
+rpc_cache = BlockAwareCache(
+    get_block_number,
+    predict_api.cache_network(rpc_url, lambda: Web3(Web3.HTTPProvider(rpc_url)).eth.chain_id),
+    block_interval=float(os.environ.get('RPC_CACHE_BLOCK_INTERVAL', '1.0')),
+    lru_size=int(os.environ.get('PREDICTION_CACHE_SIZE', '10000'))
+)
+# Prediction rows are written to Supabase in the background, in multi-row inserts
+def insert_predictions(rows):
+    response = supabase.table('predictions').insert(rows).execute()
+    print(f"Supabase insert of {len(rows)} predictions: {len(response.data)} rows")
+
+prediction_writes = predict_api.make_prediction_writes(insert_predictions)
+atexit.register(prediction_writes.close)
+
+def get_transaction_count(address):
+    return rpc_cache.aget('eth_getTransactionCount', address,
+                          lambda: web3.eth.get_transaction_count(Web3.to_checksum_address(address)))
+
+def get_balance(address):
+    return rpc_cache.aget('eth_getBalance', address,
+                          lambda: web3.eth.get_balance(Web3.to_checksum_address(address)))
+
+async def iter_range_json(contract_address, nonce_start, count):
+    for chunk in predict_api.iter_range_json(contract_address, nonce_start, count):
+        yield chunk
+
+@app.route('/predict', methods=['POST'])
+async def predict_contract_address():
+    # Request handling is shared with app.py through predict_api
+    try:
+        contract_address, nonce, nonce_range = predict_api.parse_predict_request(
+            request.content_type, await request.get_json(silent=True))
+
+        if nonce_range is not None:
+            nonce_start, count, stream = nonce_range
+            if nonce_start is None:
+                nonce_start = await get_transaction_count(contract_address)
+            predict_api.check_range(nonce_start, count, stream)
+            if not stream:
+                return jsonify(predict_api.range_body(contract_address, nonce_start, count))
+            return app.response_class(iter_range_json(contract_address, nonce_start, count),
+                                      mimetype='application/json')
+
+        # Issue the block number, balance and (if needed) nonce lookups at the same time
+        lookups = [rpc_cache.ablock_number(), get_balance(contract_address)]
+        if nonce is None:
+            lookups.append(get_transaction_count(contract_address))
+        block_number, balance, *current_nonce = await asyncio.gather(*lookups)
+
+        if nonce is not None:
+            predicted_address = rpc_cache.memoize(
+                (contract_address.lower(), nonce),
+                lambda: prediction.predict_contract_address(contract_address, nonce)
+            )
+        else:
+            nonce = current_nonce[0]
+            predicted_address = prediction.predict_contract_address(contract_address, nonce)
+        balance_in_eth = Web3.from_wei(balance, 'ether')
+
+        row = predict_api.prediction_row(contract_address, predicted_address, block_number, nonce, balance_in_eth)
+        if row is not None and not prediction_writes.put(row):
+            print(f"Prediction write queue full, dropped row for {contract_address}")
+
+        return jsonify(predict_api.predict_response(predicted_address, balance_in_eth))
+
+    except predict_api.PredictRequestError as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        print(f"Error in /predict endpoint: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/health', methods=['GET'])
+async def health_check():
+    return jsonify({'status': 'Server is running'}), 200
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, port=5000)
@@ -0,0 +1,141 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+from aiohttp import web
+
+# Compares /predict throughput of the Flask app (app.py) and the async ASGI app
+# (asgi_app.py). Both are pointed at a local stub JSON-RPC node that answers
+# every call after a fixed delay, so the numbers reflect how each server waits
+# on the network rather than the speed of a real provider.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def run_stub_rpc(port: int, delay: float) -> None:
+    async def handle(request):
+        body = await request.json()
+        await asyncio.sleep(delay)
+
+        def reply(call):
+            method = call['method']
+            if method == 'eth_blockNumber':
+                result = hex(19_000_000)
+            elif method == 'eth_chainId':
+                result = '0x1'
+            elif method == 'eth_getTransactionCount':
+                result = hex(42)
+            elif method == 'eth_getBalance':
+                result = hex(10 ** 17)
+            else:
+                return {'jsonrpc': '2.0', 'id': call['id'],
+                        'error': {'code': -32601, 'message': 'Method not found'}}
+            return {'jsonrpc': '2.0', 'id': call['id'], 'result': result}
+
+        payload = [reply(call) for call in body] if isinstance(body, list) else reply(body)
+        return web.json_response(payload)
+
+    async def serve():
+        stub = web.Application()
+        stub.router.add_post('/', handle)
+        runner = web.AppRunner(stub, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', port).start()
+        await asyncio.Event().wait()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+
+def start_server(kind: str, port: int, rpc_port: int) -> subprocess.Popen:
+    env = dict(os.environ,
+               ETH_RPC_URL=f'http://127.0.0.1:{rpc_port}',
+               SUPABASE_URL=os.environ.get('SUPABASE_URL', 'http://127.0.0.1:9'),
+               SUPABASE_KEY=os.environ.get('SUPABASE_KEY', 'load-test-key'),
+               # Disable the block cache so both servers hit the RPC node on every request
+               RPC_CACHE_BLOCK_INTERVAL='0')
+    if kind == 'flask':
+        command = [sys.executable, '-c',
+                   f'import app; app.app.run(port={port}, threaded=True)']
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'asgi_app:app',
+                   '--port', str(port), '--log-level', 'warning']
+    return subprocess.Popen(command, cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+async def wait_until_healthy(client: httpx.AsyncClient, url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(f'{url}/health')).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f'Server at {url} did not become healthy')
+
+async def run_load(url: str, requests: int, concurrency: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        await wait_until_healthy(client, url)
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        errors = 0
+
+        async def one(i):
+            nonlocal errors
+            address = '0x' + f'{i:040x}'
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(f'{url}/predict', json={'contractAddress': address})
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'errors': errors,
+        'elapsed': elapsed,
+        'rps': requests / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Load test Flask vs ASGI /predict')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--rpc-delay', type=float, default=0.05, help='stub RPC latency in seconds')
+    parser.add_argument('--rpc-port', type=int, default=8645)
+    parser.add_argument('--flask-port', type=int, default=5101)
+    parser.add_argument('--asgi-port', type=int, default=5102)
+    args = parser.parse_args()
+
+    run_stub_rpc(args.rpc_port, args.rpc_delay)
+    results = {}
+    for kind, port in (('flask', args.flask_port), ('asgi', args.asgi_port)):
+        server = start_server(kind, port, args.rpc_port)
+        try:
+            results[kind] = asyncio.run(
+                run_load(f'http://127.0.0.1:{port}', args.requests, args.concurrency)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+    for kind, result in results.items():
+        print(f"{kind:<6} {result['rps']:8.1f} req/s  p50 {result['p50_ms']:7.1f} ms  "
+              f"p99 {result['p99_ms']:7.1f} ms  errors {result['errors']}")
+    print(f"\nSpeedup: {results['asgi']['rps'] / results['flask']['rps']:.1f}x")
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
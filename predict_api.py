@@ -0,0 +1,115 @@
+import datetime
+import os
+
+from web3 import Web3
+
+from config import config
+import prediction
+from write_behind import WriteBehindQueue
+
+# Request handling for /predict shared by the Flask (app.py) and async ASGI
+# (asgi_app.py) front ends, so both parse, validate, answer and store the same
+# way. Each front end does its own RPC lookups (through its BlockAwareCache)
+# and calls in here for everything else.
+
+# Nonce-range prediction limits (buffered response / streamed response)
+PREDICT_RANGE_MAX_COUNT = int(os.environ.get('PREDICT_RANGE_MAX_COUNT', '1000'))
+PREDICT_RANGE_MAX_STREAM_COUNT = int(os.environ.get('PREDICT_RANGE_MAX_STREAM_COUNT', '1000000'))
+# Predictions are only stored for senders holding more than this
+STORE_MIN_BALANCE_ETH = 1.5
+
+class PredictRequestError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+def parse_predict_request(content_type, data):
+    # Returns (contract_address, nonce, range) where range is None or
+    # (nonce_start, count, stream); nonce_start is None when it must be looked up
+    if content_type != 'application/json':
+        raise PredictRequestError("Unsupported Media Type: Content-Type must be 'application/json'", 415)
+    if not isinstance(data, dict):
+        raise PredictRequestError('Invalid JSON')
+
+    contract_address = data.get('contractAddress')
+    if not contract_address:
+        raise PredictRequestError('Missing contractAddress parameter')
+    # Checked up front: a streamed range has already sent its 200 when the address is used
+    if not isinstance(contract_address, str) or not Web3.is_address(contract_address):
+        raise PredictRequestError('Invalid contractAddress parameter')
+
+    try:
+        nonce = int(data['nonce']) if data.get('nonce') is not None else None
+        if data.get('count') is None:
+            return contract_address, nonce, None
+        # Range mode: predict `count` consecutive addresses starting at nonceStart
+        # (or the current nonce when omitted) without balance lookup or storage.
+        count = int(data['count'])
+        nonce_start = data.get('nonceStart', nonce)
+        nonce_start = None if nonce_start is None else int(nonce_start)
+    except (TypeError, ValueError):
+        raise PredictRequestError('nonce, count and nonceStart must be integers')
+    return contract_address, nonce, (nonce_start, count, data.get('stream') in (True, 'true', '1'))
+
+def check_range(nonce_start, count, stream):
+    if count <= 0 or nonce_start < 0:
+        raise PredictRequestError('nonceStart must be >= 0 and count must be > 0')
+    limit = PREDICT_RANGE_MAX_STREAM_COUNT if stream else PREDICT_RANGE_MAX_COUNT
+    if count > limit:
+        raise PredictRequestError(f'count too large: maximum is {limit}', 413)
+
+def range_body(contract_address, nonce_start, count):
+    return {
+        'nonceStart': nonce_start,
+        'count': count,
+        'predictedAddresses': list(prediction.iter_contract_addresses(contract_address, nonce_start, count))
+    }
+
+def iter_range_json(contract_address, nonce_start, count):
+    # The same document as range_body, a piece at a time
+    yield f'{{"nonceStart": {nonce_start}, "count": {count}, "predictedAddresses": ['
+    for i, address in enumerate(prediction.iter_contract_addresses(contract_address, nonce_start, count)):
+        yield f'"{address}"' if i == 0 else f', "{address}"'
+    yield ']}'
+
+def prediction_row(contract_address, predicted_address, block_number, nonce, balance_in_eth):
+    # The predictions row to store, or None when the balance is too low to keep
+    if balance_in_eth <= STORE_MIN_BALANCE_ETH:
+        return None
+    return {
+        'contract_address': contract_address,
+        'predicted_address': predicted_address,
+        'block_number': block_number,
+        'timestamp': datetime.datetime.now().isoformat(),
+        'nonce': nonce,
+        'balance': float(balance_in_eth)
+    }
+
+def predict_response(predicted_address, balance_in_eth):
+    return {'predictedAddress': predicted_address, 'balance': float(balance_in_eth)}
+
+def cache_network(rpc_url, get_chain_id):
+    # Namespace for cached RPC results: ETH_NETWORK when set, else the name of
+    # the node's chain, else the RPC URL, so results from two chains never mix
+    network = os.environ.get('ETH_NETWORK')
+    if network:
+        return network
+    try:
+        chain_id = get_chain_id()
+    except Exception as e:
+        print(f"Could not read the chain ID from {rpc_url}, caching under the URL: {e}")
+        return rpc_url
+    names = {number: name for name, number in config.CHAIN_IDS.items()}
+    return names.get(chain_id, f'chain-{chain_id}')
+
+def make_prediction_writes(write):
+    # Prediction rows are written to Supabase in the background, in multi-row inserts
+    return WriteBehindQueue(
+        write,
+        batch_size=int(os.environ.get('PREDICTION_WRITE_BATCH_SIZE', '100')),
+        flush_interval=float(os.environ.get('PREDICTION_WRITE_FLUSH_INTERVAL', '1.0')),
+        max_backlog=int(os.environ.get('PREDICTION_WRITE_MAX_BACKLOG', '10000')),
+        overflow=os.environ.get('PREDICTION_WRITE_OVERFLOW', 'drop_oldest'),
+        name='prediction-writes'
+    )
@@ -0,0 +1,168 @@
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from eth_abi import decode, encode
+from eth_hash.auto import keccak
+from web3 import Web3
+
+from config import config
+from rpc_cache import BlockAwareCache
+from web3_pool import get_web3
+
+logger = logging.getLogger(__name__)
+
+# Multicall3 has the same address on mainnet, Sepolia and most other chains
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+ETH = "ETH"
+
+def _selector(signature: str) -> bytes:
+    return keccak(signature.encode())[:4]
+
+AGGREGATE3 = _selector("aggregate3((address,bool,bytes)[])")
+GET_ETH_BALANCE = _selector("getEthBalance(address)")
+BALANCE_OF = _selector("balanceOf(address)")
+DECIMALS = _selector("decimals()")
+SYMBOL = _selector("symbol()")
+
+def _address_arg(address: str) -> bytes:
+    return bytes(12) + bytes.fromhex(address[2:])
+
+def _decode_symbol(data: bytes) -> Optional[str]:
+    try:
+        return decode(["string"], data)[0]
+    except Exception:
+        # Some older tokens (e.g. MKR) return bytes32
+        return data[:32].rstrip(b"\0").decode(errors="ignore") or None
+
+# Answers ETH and ERC-20 balances for many holders with one eth_call per
+# `chunk_size` lookups, aggregated through Multicall3 and pinned to a single
+# block. Results are cached until a newer block number is seen, and token
+# symbols and decimals are cached for good. When the chain has no Multicall3
+# the same lookups go out as a JSON-RPC batch instead.
+class BalanceEngine:
+    def __init__(self, w3: Web3, get_block_number: Callable[[], int],
+                 multicall_address: str = MULTICALL3_ADDRESS, chunk_size: int = 500):
+        self.w3 = w3
+        self.get_block_number = get_block_number
+        self.multicall_address = Web3.to_checksum_address(multicall_address)
+        self.chunk_size = chunk_size
+        self.use_multicall = True
+        self._block_number = None
+        self._balances: Dict[Tuple[str, str], int] = {}
+        self._token_info: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "calls": 0}
+
+    def _aggregate(self, calls: List[Tuple[str, bytes]], block_number: int) -> List[Optional[bytes]]:
+        # Returns each call's return data, or None where it reverted
+        results: List[Optional[bytes]] = []
+        for start in range(0, len(calls), self.chunk_size):
+            chunk = calls[start:start + self.chunk_size]
+            data = AGGREGATE3 + encode(["(address,bool,bytes)[]"], [[(target, True, call_data) for target, call_data in chunk]])
+            raw = self.w3.eth.call({"to": self.multicall_address, "data": data}, block_number)
+            with self._lock:
+                self._stats["calls"] += 1
+            results.extend(return_data if success else None
+                           for success, return_data in decode(["(bool,bytes)[]"], raw)[0])
+        return results
+
+    def _batch(self, calls: List[Tuple[str, bytes]], block_number: int) -> List[Optional[bytes]]:
+        # Sent through the provider directly so a reverting call only fails
+        # its own entry instead of the whole batch
+        results: List[Optional[bytes]] = []
+        for start in range(0, len(calls), self.chunk_size):
+            requests = []
+            for target, call_data in calls[start:start + self.chunk_size]:
+                if call_data[:4] == GET_ETH_BALANCE:
+                    requests.append(("eth_getBalance", ["0x" + call_data[-20:].hex(), hex(block_number)]))
+                else:
+                    requests.append(("eth_call", [{"to": target, "data": "0x" + call_data.hex()}, hex(block_number)]))
+            responses = self.w3.provider.make_batch_request(requests)
+            if not isinstance(responses, list):
+                raise ValueError(f"Batch request failed: {responses.get('error')}")
+            with self._lock:
+                self._stats["calls"] += 1
+            for (method, _), response in zip(requests, responses):
+                result = response.get("result")
+                if not result or result == "0x":
+                    results.append(None)
+                elif method == "eth_getBalance":
+                    results.append(int(result, 16).to_bytes(32, "big"))
+                else:
+                    results.append(bytes.fromhex(result[2:]))
+        return results
+
+    def _call_all(self, calls: List[Tuple[str, bytes]], block_number: int) -> List[Optional[bytes]]:
+        if self.use_multicall:
+            try:
+                return self._aggregate(calls, block_number)
+            except Exception as e:
+                if self.w3.eth.get_code(self.multicall_address, block_number):
+                    raise
+                logger.warning(f"No Multicall3 at {self.multicall_address}, using JSON-RPC batches: {e}")
+                self.use_multicall = False
+        return self._batch(calls, block_number)
+
+    def token_info(self, tokens: Iterable[str]) -> Dict[str, Dict]:
+        tokens = [Web3.to_checksum_address(token) for token in tokens]
+        missing = [token for token in tokens if token not in self._token_info]
+        if missing:
+            calls = [(token, selector) for token in missing for selector in (SYMBOL, DECIMALS)]
+            results = iter(self._call_all(calls, self.get_block_number()))
+            for token in missing:
+                symbol, decimals = next(results), next(results)
+                self._token_info[token] = {
+                    "symbol": (_decode_symbol(symbol) if symbol else None) or token[:8],
+                    "decimals": decode(["uint8"], decimals)[0] if decimals else 18,
+                }
+        return {token: self._token_info[token] for token in tokens}
+
+    def balances(self, holders: Iterable[str], tokens: Iterable[str] = ()) -> Tuple[int, Dict[str, Dict[str, Optional[int]]]]:
+        # {holder: {"ETH": wei, token: raw balance or None if balanceOf reverted}}
+        holders = list(dict.fromkeys(Web3.to_checksum_address(holder) for holder in holders))
+        assets = [ETH] + list(dict.fromkeys(Web3.to_checksum_address(token) for token in tokens))
+        block_number = self.get_block_number()
+        with self._lock:
+            if self._block_number is None or block_number > self._block_number:
+                self._balances.clear()
+                self._block_number = block_number
+            block_number = self._block_number
+            cached = {key: self._balances[key] for key in
+                      ((holder, asset) for holder in holders for asset in assets) if key in self._balances}
+            self._stats["hits"] += len(cached)
+
+        missing = [(holder, asset) for holder in holders for asset in assets if (holder, asset) not in cached]
+        if missing:
+            calls = [(self.multicall_address, GET_ETH_BALANCE + _address_arg(holder)) if asset == ETH
+                     else (asset, BALANCE_OF + _address_arg(holder)) for holder, asset in missing]
+            results = self._call_all(calls, block_number)
+            fetched = {key: int.from_bytes(result[:32], "big") if result else None
+                       for key, result in zip(missing, results)}
+            with self._lock:
+                self._stats["misses"] += len(missing)
+                if self._block_number == block_number:
+                    self._balances.update(fetched)
+            cached.update(fetched)
+
+        return block_number, {holder: {asset: cached[(holder, asset)] for asset in assets} for holder in holders}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "blockNumber": self._block_number,
+                "entries": len(self._balances),
+                "multicall": self.use_multicall,
+                **self._stats,
+            }
+
+_engines: Dict[str, BalanceEngine] = {}
+
+def get_balance_engine(rpc_url: str) -> BalanceEngine:
+    if rpc_url not in _engines:
+        w3 = get_web3(rpc_url)
+        # Polled at most once per BLOCK_NUMBER_CACHE_INTERVAL however often balances are asked for
+        blocks = BlockAwareCache(lambda: w3.eth.block_number, rpc_url,
+                                 block_interval=config.BLOCK_NUMBER_CACHE_INTERVAL)
+        _engines[rpc_url] = BalanceEngine(w3, blocks.block_number, chunk_size=config.BALANCE_CHUNK_SIZE)
+    return _engines[rpc_url]
@@ -0,0 +1,69 @@
+import argparse
+import os
+import random
+import time
+
+import rlp
+from web3 import Web3
+
+import prediction
+
+def reference_address(sender: str, nonce: int) -> str:
+    encoded = Web3.keccak(rlp.encode([Web3.to_bytes(hexstr=sender), nonce]))[12:]
+    return Web3.to_checksum_address(encoded)
+
+def make_pairs(count: int, senders: int, seed: int):
+    rng = random.Random(seed)
+    sender_pool = ["0x" + os.urandom(20).hex() for _ in range(senders)]
+    # Mix small nonces with ones that cross the 1/2/3-byte RLP boundaries
+    nonce_pool = [0, 1, 0x7f, 0x80, 0xff, 0x100, 0xffff, 0x10000, 2**32, 2**64 - 1]
+    return [
+        (rng.choice(sender_pool),
+         rng.choice(nonce_pool) if rng.random() < 0.1 else rng.randrange(0, 2**20))
+        for _ in range(count)
+    ]
+
+def bench(label: str, func, pairs) -> float:
+    start = time.perf_counter()
+    for sender, nonce in pairs:
+        func(sender, nonce)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.3f}s  {len(pairs) / elapsed:12,.0f} addr/s")
+    return elapsed
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark CREATE address prediction")
+    parser.add_argument("--pairs", type=int, default=1_000_000, help="(sender, nonce) pairs to verify")
+    parser.add_argument("--bench-pairs", type=int, default=100_000, help="pairs to time per implementation")
+    parser.add_argument("--senders", type=int, default=1_000, help="distinct senders")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pairs = make_pairs(args.pairs, args.senders, args.seed)
+    print(f"Verifying {len(pairs):,} (sender, nonce) pairs against the Web3/rlp path...")
+    for i, (sender, nonce) in enumerate(pairs):
+        expected = reference_address(sender, nonce)
+        actual = prediction.predict_contract_address(sender, nonce)
+        if actual != expected:
+            raise SystemExit(f"Mismatch at pair {i}: sender={sender} nonce={nonce} "
+                             f"expected={expected} got={actual}")
+    print("All results match.\n")
+
+    sample = pairs[:args.bench_pairs]
+    sender = sample[0][0]
+    baseline = bench("web3 + rlp (current)", reference_address, sample)
+    fast = bench("engine, checksummed", prediction.predict_contract_address, sample)
+    raw = bench("engine, no checksum",
+                lambda s, n: prediction.predict_contract_address(s, n, checksum=False), sample)
+
+    start = time.perf_counter()
+    for _ in prediction.iter_contract_address_bytes(sender, 0, len(sample)):
+        pass
+    ranged = time.perf_counter() - start
+    print(f"{'engine, range (bytes)':<28} {ranged:8.3f}s  {len(sample) / ranged:12,.0f} addr/s")
+
+    print(f"\nSpeedup: {baseline / fast:.1f}x checksummed, {baseline / raw:.1f}x raw, "
+          f"{baseline / ranged:.1f}x range")
+
+if __name__ == "__main__":
+    main()
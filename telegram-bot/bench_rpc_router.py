@@ -0,0 +1,209 @@
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from aiohttp import web
+from web3 import Web3
+
+from rpc_router import MultiEndpointProvider
+
+# Measures read latency through MultiEndpointProvider against local stub
+# JSON-RPC servers with injected delays. Each stub answers after `delay`
+# seconds, or `tail_delay` seconds for a `tail` fraction of requests, and
+# answers HTTP 503 while marked down. eth_call is answered with HTTP 400 and a
+# JSON-RPC error, as some providers do for reverted calls. Each stub also serves empty blocks up to
+# `head` and a newHeads subscription at /ws, so it can stand in for a node in
+# the block follower tests. Scenarios:
+#   tail    - the fastest stub alone vs all stubs with latency routing and hedging
+#   outage  - the fastest stub goes down halfway through; no call should fail
+
+class StubNode:
+    def __init__(self, port: int, delay: float, tail: float, tail_delay: float):
+        self.port = port
+        self.delay = delay
+        self.tail = tail
+        self.tail_delay = tail_delay
+        self.down = False
+        self.head = 100
+        # HTTP serves blocks only up to head - lag, like a node behind the one pushing heads
+        self.lag = 0
+        # While set, WebSocket upgrades are refused
+        self.ws_down = False
+        self._sockets = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}/ws"
+
+    def block(self, number: int) -> Optional[Dict]:
+        if number > self.head:
+            return None
+        zero = lambda size: "0x" + "00" * size
+        return {
+            "number": hex(number), "hash": f"0x{number:064x}", "parentHash": f"0x{number - 1:064x}",
+            "timestamp": hex(number), "transactions": [], "uncles": [], "gasLimit": "0x1", "gasUsed": "0x0",
+            "miner": zero(20), "difficulty": "0x0", "extraData": "0x", "logsBloom": zero(256), "nonce": zero(8),
+            "receiptsRoot": zero(32), "sha3Uncles": zero(32), "stateRoot": zero(32),
+            "transactionsRoot": zero(32), "size": "0x1",
+        }
+
+    def answer(self, call: Dict) -> Dict:
+        results = {"eth_chainId": "0x1", "eth_blockNumber": hex(self.head), "eth_getBalance": "0xde0b6b3a7640000"}
+        if call["method"] == "eth_getTransactionCount":
+            # Derived from the address, so callers can check they got their own answer
+            return {"jsonrpc": "2.0", "id": call["id"], "result": hex(int(call["params"][0], 16) % 1000)}
+        if call["method"] == "eth_getBlockByNumber":
+            number = self.head if call["params"][0] == "latest" else int(call["params"][0], 16)
+            served = self.block(number) if number <= self.head - self.lag else None
+            return {"jsonrpc": "2.0", "id": call["id"], "result": served}
+        return {"jsonrpc": "2.0", "id": call["id"], "result": results.get(call["method"], "0x")}
+
+    async def handle(self, request):
+        await asyncio.sleep(self.tail_delay if random.random() < self.tail else self.delay)
+        if self.down:
+            return web.Response(status=503)
+        body = await request.json()
+        if isinstance(body, dict) and body["method"] == "eth_call":
+            error = {"jsonrpc": "2.0", "id": body["id"], "error": {"code": -32000, "message": "execution reverted"}}
+            return web.Response(status=400, text=json.dumps(error), content_type="application/json")
+        answer = [self.answer(call) for call in body] if isinstance(body, list) else self.answer(body)
+        return web.Response(text=json.dumps(answer), content_type="application/json")
+
+    async def handle_ws(self, request):
+        if self.ws_down:
+            return web.Response(status=503)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._sockets.add(ws)
+        try:
+            async for message in ws:
+                call = json.loads(message.data)
+                if call["method"] == "eth_subscribe":
+                    answer = {"jsonrpc": "2.0", "id": call["id"], "result": "0x1"}
+                else:
+                    answer = self.answer(call)
+                await ws.send_str(json.dumps(answer))
+        finally:
+            self._sockets.discard(ws)
+        return ws
+
+    async def _push_head(self) -> None:
+        message = {"jsonrpc": "2.0", "method": "eth_subscription",
+                   "params": {"subscription": "0x1", "result": self.block(self.head)}}
+        for ws in list(self._sockets):
+            await ws.send_str(json.dumps(message))
+
+    async def _drop_sockets(self) -> None:
+        for ws in list(self._sockets):
+            await ws.close()
+
+    # Called from other threads: both run on the stub's own event loop
+    def push_head(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._push_head(), self._loop).result()
+
+    def drop_sockets(self) -> None:
+        self.ws_down = True
+        asyncio.run_coroutine_threadsafe(self._drop_sockets(), self._loop).result()
+
+def run_stub_nodes(nodes: List[StubNode]) -> None:
+    async def serve():
+        for node in nodes:
+            node._loop = asyncio.get_running_loop()
+            stub = web.Application()
+            stub.router.add_post("/", node.handle)
+            stub.router.add_get("/ws", node.handle_ws)
+            runner = web.AppRunner(stub, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, "127.0.0.1", node.port).start()
+        await asyncio.Event().wait()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+
+def run_reads(w3: Web3, reads: int, concurrency: int, on_progress=None) -> Dict:
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    address = "0x" + "11" * 20
+
+    def one(i):
+        nonlocal errors
+        if on_progress:
+            on_progress(i)
+        start = time.perf_counter()
+        try:
+            w3.eth.get_balance(address)
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(reads)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000 if latencies else float("nan")
+    return {"rps": reads / elapsed, "p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99),
+            "max": pick(1.0), "errors": errors}
+
+def print_result(label: str, result: Dict, provider: MultiEndpointProvider) -> None:
+    print(f"{label:<22} {result['rps']:7.1f} req/s  p50 {result['p50']:6.1f} ms  p95 {result['p95']:6.1f} ms  "
+          f"p99 {result['p99']:6.1f} ms  max {result['max']:6.1f} ms  errors {result['errors']}")
+    stats = provider.stats()
+    print(f"{'':<22} hedges {stats['hedges']}  hedge wins {stats['hedgeWins']}  failovers {stats['failovers']}  "
+          f"ejections {stats['ejections']}  per endpoint "
+          f"{', '.join(str(endpoint['requests']) for endpoint in stats['endpoints'])}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark multi-endpoint RPC routing against delayed stub nodes")
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--tail", type=float, default=0.02, help="fraction of slow answers per stub")
+    parser.add_argument("--tail-delay", type=float, default=0.5, help="slow answer delay in seconds")
+    parser.add_argument("--port", type=int, default=8660)
+    args = parser.parse_args()
+
+    nodes = [
+        StubNode(args.port, 0.010, args.tail, args.tail_delay),
+        StubNode(args.port + 1, 0.020, args.tail, args.tail_delay),
+        StubNode(args.port + 2, 0.040, args.tail, args.tail_delay),
+    ]
+    run_stub_nodes(nodes)
+    time.sleep(0.5)
+
+    def provider(urls: List[str], **kwargs) -> MultiEndpointProvider:
+        return MultiEndpointProvider(urls, pool_size=args.concurrency, timeout=5, **kwargs)
+
+    print("tail scenario")
+    single = provider([nodes[0].url])
+    print_result("fastest stub alone", run_reads(Web3(single), args.reads, args.concurrency), single)
+    routed = provider([node.url for node in nodes])
+    print_result("routed + hedged", run_reads(Web3(routed), args.reads, args.concurrency), routed)
+
+    print("\noutage scenario (fastest stub down halfway)")
+
+    def outage_at_half(i):
+        if i == args.reads // 2:
+            nodes[0].down = True
+
+    for label, make in (("fastest stub alone", lambda: provider([nodes[0].url])),
+                        ("routed + hedged", lambda: provider([node.url for node in nodes]))):
+        nodes[0].down = False
+        routed = make()
+        print_result(label, run_reads(Web3(routed), args.reads, args.concurrency, outage_at_half), routed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from web3 import Web3
+
+from bench_rpc_router import StubNode, run_stub_nodes
+from rpc_router import MultiEndpointProvider
+from single_flight import SingleFlight
+
+# Hammers SingleFlight and the coalescing in MultiEndpointProvider with
+# thousands of concurrent callers against a local stub node, and checks that
+# every caller gets its own key's answer, that failures reach every waiter,
+# and that cancelled waiters don't affect the others. Prints how many node
+# requests were saved and exits non-zero if a check fails.
+
+def provider(node: StubNode, coalesce: bool = True) -> MultiEndpointProvider:
+    return MultiEndpointProvider([node.url], pool_size=32, timeout=5, hedge=False, coalesce=coalesce)
+
+def node_requests(rpc: MultiEndpointProvider) -> int:
+    return sum(endpoint["requests"] for endpoint in rpc.stats()["endpoints"])
+
+def senders(count: int):
+    return [Web3.to_checksum_address(f"0x{i:040x}") for i in range(1, count + 1)]
+
+async def hammer_coroutines(node: StubNode, callers: int, keys: int, coalesce: bool) -> dict:
+    # The bot's pattern: coroutines looking up nonces through the default executor
+    rpc = provider(node, coalesce)
+    w3 = Web3(rpc)
+    flights = SingleFlight()
+    addresses = senders(keys)
+    loop = asyncio.get_running_loop()
+
+    async def one(i):
+        address = addresses[i % keys]
+        lookup = lambda: loop.run_in_executor(None, w3.eth.get_transaction_count, address)
+        nonce = await (flights.acall(("eth_getTransactionCount", "mainnet", address), lookup) if coalesce else lookup())
+        assert nonce == int(address, 16) % 1000, f"{address} got nonce {nonce}"
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(callers)))
+    return {"elapsed": time.perf_counter() - start, "requests": node_requests(rpc), "flights": flights.stats()}
+
+def hammer_threads(node: StubNode, threads: int, rounds: int, coalesce: bool) -> dict:
+    # app.py's pattern: request threads reading the head block number at once
+    rpc = provider(node, coalesce)
+    w3 = Web3(rpc)
+    barrier = threading.Barrier(threads)
+
+    def one(_):
+        for _ in range(rounds):
+            barrier.wait()
+            assert w3.eth.block_number == 100
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(threads)))
+    return {"elapsed": time.perf_counter() - start, "requests": node_requests(rpc), "flights": rpc.flights.stats()}
+
+async def check_failures(node: StubNode, callers: int) -> None:
+    flights = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(node.delay)
+        raise ConnectionError("node down")
+
+    results = await asyncio.gather(*(flights.acall("down", failing) for _ in range(callers)), return_exceptions=True)
+    assert all(isinstance(result, ConnectionError) for result in results), "a waiter missed the failure"
+    stats = flights.stats()
+    assert stats["executed"] == 1 and stats["errors"] == 1 and stats["inFlight"] == 0, stats
+
+    # The next call after a failure runs again
+    async def recovered():
+        return "ok"
+    assert await flights.acall("down", recovered) == "ok"
+    print(f"failure check: 1 call failed for {callers} waiters, next call ran again")
+
+async def check_cancellation(callers: int) -> None:
+    flights = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return 42
+
+    waiters = [asyncio.ensure_future(flights.acall("slow", slow)) for _ in range(callers)]
+    await asyncio.sleep(0)
+    for waiter in waiters[::2]:
+        waiter.cancel()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert all(isinstance(result, asyncio.CancelledError) for result in results[::2])
+    assert all(result == 42 for result in results[1::2]), "cancelling some waiters broke the others"
+    assert flights.stats()["executed"] == 1
+    print(f"cancellation check: {callers // 2} waiters cancelled, {callers - callers // 2} got the result")
+
+def print_result(label: str, result: dict, callers: int) -> None:
+    print(f"{label:<34} {callers:6d} calls -> {result['requests']:5d} node requests  "
+          f"{result['elapsed'] * 1000:8.1f} ms  saved {result['flights']['coalesced']}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hammer single-flight RPC coalescing with concurrent callers")
+    parser.add_argument("--coroutines", type=int, default=5000)
+    parser.add_argument("--keys", type=int, default=20, help="distinct senders among the coroutines")
+    parser.add_argument("--threads", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--node-delay", type=float, default=0.02)
+    parser.add_argument("--port", type=int, default=8670)
+    args = parser.parse_args()
+
+    node = StubNode(args.port, args.node_delay, 0.0, 0.0)
+    run_stub_nodes([node])
+    time.sleep(0.5)
+
+    for coalesce in (False, True):
+        result = asyncio.run(hammer_coroutines(node, args.coroutines, args.keys, coalesce))
+        print_result(f"coroutines, coalesce={coalesce}", result, args.coroutines)
+        if coalesce:
+            assert result["requests"] < args.coroutines // 10, result
+    for coalesce in (False, True):
+        result = hammer_threads(node, args.threads, args.rounds, coalesce)
+        print_result(f"threads, coalesce={coalesce}", result, args.threads * args.rounds)
+        if coalesce:
+            assert result["requests"] < args.threads * args.rounds // 10, result
+    asyncio.run(check_failures(node, args.coroutines))
+    asyncio.run(check_cancellation(args.coroutines))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import argparse
+import asyncio
+import threading
+import time
+
+from aiohttp import web
+
+from database import AsyncSupabaseDB, SupabaseDB
+
+# Measures how many /start-style updates per second the bot can handle with the
+# blocking SupabaseDB versus AsyncSupabaseDB. Both talk to a local stub of the
+# PostgREST API that answers every request after a fixed delay. Updates are
+# dispatched concurrently, as the bot does with concurrent_updates enabled.
+
+STUB_KEY = "bench.stub.key"
+
+def run_stub_postgrest(port: int, delay: float) -> None:
+    async def handle(request):
+        await asyncio.sleep(delay)
+        if request.method == "GET":
+            return web.json_response([{"telegram_id": 1, "is_active": True, "expiry_date": None}])
+        return web.json_response([], status=201)
+
+    async def serve():
+        stub = web.Application()
+        stub.router.add_route("*", "/rest/v1/{table}", handle)
+        runner = web.AppRunner(stub, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        await asyncio.Event().wait()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+
+async def start_update_sync(db: SupabaseDB, telegram_id: int) -> None:
+    # What the start handler did before: blocking calls on the event loop
+    db.add_user(telegram_id=telegram_id, username="bench")
+    db.get_subscription(telegram_id=telegram_id)
+
+async def start_update_async(db: AsyncSupabaseDB, telegram_id: int) -> None:
+    await db.add_user(telegram_id=telegram_id, username="bench")
+    await db.get_subscription(telegram_id=telegram_id)
+
+async def run_updates(handler, db, updates: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    # A ticker shows how long the event loop stays blocked between updates
+    max_stall = 0.0
+    stop = asyncio.Event()
+
+    async def ticker():
+        nonlocal max_stall
+        last = time.perf_counter()
+        while not stop.is_set():
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            max_stall = max(max_stall, now - last - 0.01)
+            last = now
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await handler(db, i)
+            latencies.append(time.perf_counter() - start)
+
+    ticker_task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(updates)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker_task
+
+    latencies.sort()
+    return {
+        "elapsed": elapsed,
+        "ups": updates / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "max_stall_ms": max_stall * 1000,
+    }
+
+async def bench(url: str, updates: int, concurrency: int) -> dict:
+    sync_db = SupabaseDB(url, STUB_KEY)
+    async_db = await AsyncSupabaseDB.create(url, STUB_KEY, max_connections=concurrency,
+                                            max_concurrency=concurrency)
+    try:
+        # Warm up both connection pools
+        await start_update_async(async_db, 0)
+        await start_update_sync(sync_db, 0)
+        return {
+            "sync": await run_updates(start_update_sync, sync_db, updates, concurrency),
+            "async": await run_updates(start_update_async, async_db, updates, concurrency),
+        }
+    finally:
+        await async_db.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark bot update throughput with sync vs async Supabase access")
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--db-delay", type=float, default=0.05, help="stub PostgREST latency in seconds")
+    parser.add_argument("--port", type=int, default=8654)
+    args = parser.parse_args()
+
+    run_stub_postgrest(args.port, args.db_delay)
+    time.sleep(0.5)
+    results = asyncio.run(bench(f"http://127.0.0.1:{args.port}", args.updates, args.concurrency))
+
+    for label, result in results.items():
+        print(f"{label:<6} {result['ups']:8.1f} updates/s  p50 {result['p50_ms']:7.1f} ms  "
+              f"max loop stall {result['max_stall_ms']:7.1f} ms")
+    print(f"\nSpeedup: {results['async']['ups'] / results['sync']['ups']:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+from collections import OrderedDict
+from typing import Optional
+
+from web3.types import BlockData
+
+from config import config
+
+# Remembers (number, hash) for the most recent `depth` blocks processed, so a
+# new block can be checked against its parent hash and a reorg detected as soon
+# as the chain we followed stops being canonical.
+class BlockCursor:
+    def __init__(self, depth: int = config.REORG_DEPTH):
+        self.depth = depth
+        self._hashes: "OrderedDict[int, bytes]" = OrderedDict()
+
+    @property
+    def head(self) -> Optional[int]:
+        return next(reversed(self._hashes)) if self._hashes else None
+
+    @property
+    def oldest(self) -> Optional[int]:
+        return next(iter(self._hashes)) if self._hashes else None
+
+    def hash_at(self, number: int) -> Optional[bytes]:
+        return self._hashes.get(number)
+
+    def reset(self, number: int, block_hash: Optional[bytes] = None) -> None:
+        self._hashes.clear()
+        if block_hash is not None:
+            self._hashes[number] = bytes(block_hash)
+
+    def extends(self, block: BlockData) -> bool:
+        head = self.head
+        if head is None:
+            return True
+        return block["number"] == head + 1 and bytes(block["parentHash"]) == self._hashes[head]
+
+    def append(self, block: BlockData) -> None:
+        self._hashes[block["number"]] = bytes(block["hash"])
+        while len(self._hashes) > self.depth:
+            self._hashes.popitem(last=False)
+
+    def rewind(self, number: int) -> None:
+        while self._hashes and self.head > number:
+            self._hashes.popitem()
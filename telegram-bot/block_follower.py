@@ -0,0 +1,208 @@
+import asyncio
+import itertools
+import logging
+from collections import deque
+from contextlib import aclosing
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from web3 import AsyncWeb3, WebSocketProvider
+from web3.exceptions import BlockNotFound
+from web3.types import BlockData
+
+from config import config
+from block_cursor import BlockCursor
+from web3_pool import get_web3
+
+logger = logging.getLogger(__name__)
+
+class BlockWatcher:
+    def __init__(self, watcher_id: int, start_block: int):
+        self.id = watcher_id
+        self.start_block = start_block
+        # Unbounded so the follower never waits on a slow watcher
+        self.queue: "asyncio.Queue[Optional[BlockData]]" = asyncio.Queue()
+
+    def close(self) -> None:
+        self.queue.put_nowait(None)
+
+# Follows the chain head of one network and downloads every new block exactly
+# once, then hands it to all registered watchers. The polling task only runs
+# while at least one watcher is registered. With a `ws_url` the follower also
+# subscribes to newHeads and wakes up as soon as a block lands; while the
+# socket is down it falls back to polling every `poll_interval` seconds.
+# Without `full_transactions` only headers and transaction hashes are fetched.
+class BlockFollower:
+    def __init__(self, rpc_url: str, ws_url: Optional[str] = None,
+                 poll_interval: float = config.POLL_INTERVAL, full_transactions: bool = True):
+        self.rpc_url = rpc_url
+        self.ws_url = ws_url
+        self.w3 = get_web3(rpc_url)
+        self.poll_interval = poll_interval
+        self.full_transactions = full_transactions
+        self.current_block: Optional[int] = None
+        self.cursor = BlockCursor()
+        self.ws_connected = False
+        self._ws_head: Optional[int] = None
+        self._new_head = asyncio.Event()
+        self._ws_task: Optional[asyncio.Task] = None
+        self._watchers: Dict[int, BlockWatcher] = {}
+        self._ids = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def watcher_count(self) -> int:
+        return len(self._watchers)
+
+    async def _call(self, func, *args, **kwargs):
+        return await asyncio.get_event_loop().run_in_executor(None, lambda: func(*args, **kwargs))
+
+    async def register(self) -> BlockWatcher:
+        async with self._start_lock:
+            if self._task is None or self._task.done():
+                latest = await self._call(self.w3.eth.get_block, "latest")
+                self.cursor.reset(latest["number"], latest["hash"])
+                self.current_block = latest["number"]
+                self._task = asyncio.create_task(self._run())
+            watcher = BlockWatcher(next(self._ids), self.current_block)
+            self._watchers[watcher.id] = watcher
+        logger.debug(f"Registered block watcher {watcher.id} from block {watcher.start_block} "
+                     f"({len(self._watchers)} active)")
+        return watcher
+
+    def unregister(self, watcher: BlockWatcher) -> None:
+        if self._watchers.pop(watcher.id, None) is not None:
+            watcher.close()
+            logger.debug(f"Unregistered block watcher {watcher.id} ({len(self._watchers)} active)")
+
+    async def fetch_blocks(self, start: int, end: int, window: int = config.CATCHUP_WINDOW,
+                           full_transactions: Optional[bool] = None) -> AsyncIterator[BlockData]:
+        # Keeps up to `window` block downloads in flight and yields blocks in
+        # order as soon as the lowest outstanding one arrives. Stops at the first
+        # block the node cannot serve yet (its reported head can run ahead of
+        # the blocks it serves, e.g. behind a load balancer). Closing the iterator cancels the fetches still pending.
+        if full_transactions is None:
+            full_transactions = self.full_transactions
+        pending: Deque[asyncio.Future] = deque()
+        next_number = start
+        try:
+            while next_number <= end or pending:
+                while next_number <= end and len(pending) < window:
+                    pending.append(asyncio.ensure_future(
+                        self._call(self.w3.eth.get_block, next_number, full_transactions=full_transactions)
+                    ))
+                    next_number += 1
+                try:
+                    block = await pending.popleft()
+                except BlockNotFound:
+                    return
+                yield block
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _dispatch(self, block: BlockData) -> None:
+        for watcher in list(self._watchers.values()):
+            watcher.queue.put_nowait(block)
+
+    async def _subscribe_heads(self) -> None:
+        while True:
+            try:
+                async with AsyncWeb3(WebSocketProvider(self.ws_url)) as ws:
+                    await ws.eth.subscribe("newHeads")
+                    self.ws_connected = True
+                    logger.info(f"Subscribed to newHeads on {self.ws_url}")
+                    async for message in ws.socket.process_subscriptions():
+                        self._ws_head = message["result"]["number"]
+                        self._new_head.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"newHeads subscription lost, polling every {self.poll_interval}s: {e}")
+            finally:
+                self.ws_connected = False
+                self._ws_head = None
+                # Wake the follower so it switches to the polling interval
+                self._new_head.set()
+            await asyncio.sleep(config.WS_RECONNECT_DELAY)
+
+    async def _wait_for_head(self, caught_up: bool) -> None:
+        # A pushed head wakes us immediately. The timeout is the polling
+        # interval while the socket is down (or the HTTP node lags behind the
+        # pushed head), and only a safety net while it is up.
+        timeout = config.WS_HEAD_TIMEOUT if self.ws_connected and caught_up else self.poll_interval
+        try:
+            await asyncio.wait_for(self._new_head.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._new_head.clear()
+
+    async def _latest_block_number(self) -> int:
+        if self.ws_connected and self._ws_head is not None:
+            return self._ws_head
+        return await self._call(self.w3.eth.get_block_number)
+
+    async def _run(self) -> None:
+        logger.info(f"Block follower started at block {self.current_block}")
+        if self.ws_url:
+            self._ws_task = asyncio.create_task(self._subscribe_heads())
+        try:
+            await self._follow()
+        finally:
+            if self._ws_task:
+                self._ws_task.cancel()
+                self._ws_task = None
+        logger.info(f"Block follower stopped at block {self.current_block}")
+
+    async def _find_fork_point(self, number: int) -> int:
+        # Walk back until the canonical hash matches what we dispatched
+        oldest = self.cursor.oldest
+        while number >= oldest:
+            canonical = await self._call(self.w3.eth.get_block, number)
+            if canonical and bytes(canonical["hash"]) == self.cursor.hash_at(number):
+                return number
+            number -= 1
+        return oldest - 1
+
+    async def _handle_reorg(self, block: BlockData) -> None:
+        fork_point = await self._find_fork_point(min(block["number"] - 1, self.cursor.head))
+        logger.warning(f"Reorg detected at block {block['number']}: rescanning from block {fork_point + 1} "
+                       f"(previous head {self.cursor.head})")
+        self.cursor.rewind(fork_point)
+        # Watchers see block numbers repeat and drop state from the replaced blocks
+        self.current_block = fork_point
+
+    async def _follow(self) -> None:
+        while self._watchers:
+            caught_up = True
+            reorged = False
+            try:
+                latest_block = await self._latest_block_number()
+                if latest_block > self.current_block:
+                    async with aclosing(self.fetch_blocks(self.current_block + 1, latest_block)) as blocks:
+                        async for block in blocks:
+                            if not self._watchers:
+                                break
+                            if not self.cursor.extends(block):
+                                await self._handle_reorg(block)
+                                reorged = True
+                                break
+                            self._dispatch(block)
+                            self.cursor.append(block)
+                            self.current_block = block["number"]
+                    caught_up = self.current_block >= latest_block
+                    if reorged:
+                        # Rescan the replaced range straight away
+                        self._new_head.set()
+            except Exception as e:
+                caught_up = False
+                logger.error(f"Error following blocks after {self.current_block}: {e}")
+            await self._wait_for_head(caught_up)
+
+_followers: Dict[str, BlockFollower] = {}
+
+def get_block_follower(rpc_url: str) -> BlockFollower:
+    if rpc_url not in _followers:
+        _followers[rpc_url] = BlockFollower(rpc_url, config.ws_url_for(rpc_url),
+                                            full_transactions=not config.PAYMENT_PROBE)
+    return _followers[rpc_url]
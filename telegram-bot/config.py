@@ -6,29 +6,85 @@ load_dotenv()
 class Config:
     MAINNET_RPC_URL = os.getenv("MAINNET_RPC_URL", "https://mainnet.infura.io/v3/111dffff7e304bb6ac87dfa3eedda096")
     SEPOLIA_RPC_URL = os.getenv("SEPOLIA_RPC_URL", "https://sepolia.infura.io/v3/111dffff7e304bb6ac87dfa3eedda096")
+    # Comma-separated extra endpoints per network, used next to the URL above
+    MAINNET_RPC_EXTRA_URLS = [url for url in os.getenv("MAINNET_RPC_EXTRA_URLS", "").split(",") if url]
+    SEPOLIA_RPC_EXTRA_URLS = [url for url in os.getenv("SEPOLIA_RPC_EXTRA_URLS", "").split(",") if url]
+    MAINNET_WS_URL = os.getenv("MAINNET_WS_URL")
+    SEPOLIA_WS_URL = os.getenv("SEPOLIA_WS_URL")
+    NETWORKS = ("mainnet", "sepolia")
+    CHAIN_IDS = {"mainnet": 1, "sepolia": 11155111}
+    DEFAULT_NETWORK = os.getenv("DEFAULT_NETWORK", "mainnet")
+    RPC_POOL_SIZE = int(os.getenv("RPC_POOL_SIZE", "20"))
+    RPC_TIMEOUT = float(os.getenv("RPC_TIMEOUT", "10"))
+    RPC_HEDGE = os.getenv("RPC_HEDGE", "true").lower() == "true"
+    RPC_HEDGE_MIN_DELAY = float(os.getenv("RPC_HEDGE_MIN_DELAY", "0.05"))
+    RPC_EJECT_AFTER = int(os.getenv("RPC_EJECT_AFTER", "3"))
+    RPC_EJECT_SECONDS = float(os.getenv("RPC_EJECT_SECONDS", "5"))
+    MEMPOOL_WATCH = os.getenv("MEMPOOL_WATCH", "false").lower() == "true"
     RECIPIENT_ADDRESS = os.getenv("RECIPIENT_ADDRESS", "0x2650e3934F9AA7a3f9E8a5E9c2404Cc628674346")
     EXPECTED_AMOUNT = float(os.getenv("EXPECTED_AMOUNT", "0.01"))
     MAX_BLOCKS_TO_WAIT = int(os.getenv("MAX_BLOCKS_TO_WAIT", "100"))
     CONFIRMATIONS = int(os.getenv("CONFIRMATIONS", "3"))
+    SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+    SUPABASE_MAX_CONCURRENCY = int(os.getenv("SUPABASE_MAX_CONCURRENCY", "20"))
+    SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+    SUBSCRIPTION_CACHE_TTL = float(os.getenv("SUBSCRIPTION_CACHE_TTL", "60"))
+    SUBSCRIPTION_CACHE_SIZE = int(os.getenv("SUBSCRIPTION_CACHE_SIZE", "10000"))
+    CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "32"))
+    MAX_CONCURRENT_MONITORS = int(os.getenv("MAX_CONCURRENT_MONITORS", "50"))
+    POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", "5"))
+    PAYMENT_PROBE = os.getenv("PAYMENT_PROBE", "false").lower() == "true"
+    PROBE_BATCH_BLOCKS = int(os.getenv("PROBE_BATCH_BLOCKS", "50"))
+    REORG_DEPTH = int(os.getenv("REORG_DEPTH", "64"))
+    CATCHUP_WINDOW = int(os.getenv("CATCHUP_WINDOW", "8"))
+    WS_HEAD_TIMEOUT = float(os.getenv("WS_HEAD_TIMEOUT", "30"))
+    WS_RECONNECT_DELAY = float(os.getenv("WS_RECONNECT_DELAY", "5"))
+    DEPLOY_WATCH_NETWORK = os.getenv("DEPLOY_WATCH_NETWORK", "mainnet")
+    DEPLOY_CHECK_BATCH_SIZE = int(os.getenv("DEPLOY_CHECK_BATCH_SIZE", "500"))
+    DEPLOY_WATCH_REFRESH_INTERVAL = float(os.getenv("DEPLOY_WATCH_REFRESH_INTERVAL", "60"))
+    BALANCE_CHUNK_SIZE = int(os.getenv("BALANCE_CHUNK_SIZE", "500"))
+    BLOCK_NUMBER_CACHE_INTERVAL = float(os.getenv("BLOCK_NUMBER_CACHE_INTERVAL", "1.0"))
+    # Comma-separated ERC-20 token addresses shown next to ETH balances
+    MAINNET_BALANCE_TOKENS = [token for token in os.getenv(
+        "MAINNET_BALANCE_TOKENS",
+        "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48,"  # USDC
+        "0xdAC17F958D2ee523a2206206994597C13D831ec7,"  # USDT
+        "0x6B175474E89094C44Da98b954EedeAC495271d0F"   # DAI
+    ).split(",") if token]
+    SEPOLIA_BALANCE_TOKENS = [token for token in os.getenv("SEPOLIA_BALANCE_TOKENS", "").split(",") if token]
+    PREDICT_RANGE_COUNT = int(os.getenv("PREDICT_RANGE_COUNT", "10"))
+    REVERSE_INDEX_NONCE_HORIZON = int(os.getenv("REVERSE_INDEX_NONCE_HORIZON", "1000"))
+    REVERSE_INDEX_PATH = os.getenv("REVERSE_INDEX_PATH")
+    # About 200 bytes of memory per entry
+    REVERSE_INDEX_MAX_ENTRIES = int(os.getenv("REVERSE_INDEX_MAX_ENTRIES", "2000000"))
+    VANITY_MAX_PATTERN_LENGTH = int(os.getenv("VANITY_MAX_PATTERN_LENGTH", "6"))
+    VANITY_PROGRESS_INTERVAL = int(os.getenv("VANITY_PROGRESS_INTERVAL", "10"))
+    VANITY_MAX_PROCESSES = int(os.getenv("VANITY_MAX_PROCESSES", "2"))
     
-    def __init__(self):
-        self.current_network = "mainnet"
-        self._rpc_url = self.MAINNET_RPC_URL
+    def rpc_url_for(self, network: str) -> str:
+        return self.MAINNET_RPC_URL if network == "mainnet" else self.SEPOLIA_RPC_URL
     
-    @property
-    def rpc_url(self):
-        return self._rpc_url
+    def rpc_urls_for(self, rpc_url: str):
+        # Every endpoint of the network whose primary URL is `rpc_url`
+        extra_urls = {
+            self.MAINNET_RPC_URL: self.MAINNET_RPC_EXTRA_URLS,
+            self.SEPOLIA_RPC_URL: self.SEPOLIA_RPC_EXTRA_URLS,
+        }.get(rpc_url, [])
+        return [rpc_url] + extra_urls
     
-    def toggle_network(self):
-        if self.current_network == "mainnet":
-            self.current_network = "sepolia"
-            self._rpc_url = self.SEPOLIA_RPC_URL
-        else:
-            self.current_network = "mainnet"
-            self._rpc_url = self.MAINNET_RPC_URL
-        return self.current_network
+    def balance_tokens_for(self, network: str):
+        return self.MAINNET_BALANCE_TOKENS if network == "mainnet" else self.SEPOLIA_BALANCE_TOKENS
     
-    def get_network_indicator(self):
-        return "🟢 Mainnet" if self.current_network == "mainnet" else "🔴 Sepolia"
+    def ws_url_for(self, rpc_url: str):
+        return {
+            self.MAINNET_RPC_URL: self.MAINNET_WS_URL,
+            self.SEPOLIA_RPC_URL: self.SEPOLIA_WS_URL,
+        }.get(rpc_url)
+    
+    def other_network(self, network: str) -> str:
+        return "sepolia" if network == "mainnet" else "mainnet"
+    
+    def get_network_indicator(self, network: str):
+        return "🟢 Mainnet" if network == "mainnet" else "🔴 Sepolia"
 
 config = Config()
\ No newline at end of file
@@ -26,7 +26,7 @@ class Messages:
         "• *🔮 Predict Contract*: Generate future contract addresses based on sender and nonce.\n"
         "• *💸 Monitor Payment*: Track Ethereum transactions in real-time.\n"
         "• *📋 View Watchlist*: Save and manage predicted addresses.\n"
-        "• *💰 Check Balance*: Check wallet balances (coming soon).\n"
+        "• *💰 Check Balance*: Check ETH and token balances of your watchlist.\n"
         "• *ℹ️ Token Info*: Get token details (coming soon).\n"
         "• *⚙️ Settings*: Customize your experience (coming soon).\n\n"
         "💎 *Subscribe now for just 0.01 ETH/month* to access all features!\n"
@@ -43,9 +43,11 @@ class Messages:
         "• *🔮 Predict Contract*: Generate a predicted contract address.\n"
         "• *💸 Monitor Payment*: Monitor Ethereum transactions from a sender.\n"
         "• *📋 View Watchlist*: See your saved predictions.\n"
-        "• *💰 Check Balance*: Coming soon!\n"
+        "• *💰 Check Balance*: ETH and token balances of your watchlist addresses.\n"
         "• *ℹ️ Token Info*: Coming soon!\n"
         "• *⚙️ Settings*: Coming soon!\n"
         "• *📝 Check Subscription*: Use /subscription to view your subscription status.\n"
+        "• *🔎 Reverse Lookup*: Use /reverse 0x... to find who deploys a contract address.\n"
+        "• *🏭 CREATE2*: Use /create2 to predict a factory deployment, /vanity to search for a salt.\n"
         "\nUse /start to return to the main menu."
     )
\ No newline at end of file
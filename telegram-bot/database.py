@@ -1,24 +1,30 @@
-from supabase import create_client
+from postgrest.types import ReturnMethod
+from supabase import AsyncClient, AsyncClientOptions, acreate_client, create_client
 from datetime import datetime
+import asyncio
 import logging
+import httpx
 from typing import List, Dict, Optional
+from config import config
+from subscription_cache import SubscriptionCache
 
 logger = logging.getLogger(__name__)
 
+WATCHLIST_COLUMNS = ("id", "sender_address", "nonce", "predicted_address", "created_at")
+SUBSCRIPTION_COLUMNS = ("telegram_id", "is_active", "expiry_date")
+
 class SupabaseDB:
     def __init__(self, url: str, key: str):
         self.client = create_client(url, key)
 
     def add_user(self, telegram_id: int, username: str) -> bool:
         try:
-            existing_user = (self.client.table("users")
-                           .select("*")
-                           .eq("telegram_id", telegram_id)
-                           .execute().data)
-
-            if not existing_user:
-                data = {"telegram_id": telegram_id, "username": username}
-                self.client.table("users").insert(data).execute()
+            response = (self.client.table("users")
+                        .upsert({"telegram_id": telegram_id, "username": username},
+                                on_conflict="telegram_id", ignore_duplicates=True)
+                        .select("telegram_id")
+                        .execute())
+            if response.data:
                 logger.info(f"Added new user: {telegram_id}")
             return True
         except Exception as e:
@@ -28,7 +34,7 @@ class SupabaseDB:
     def get_watchlist(self, telegram_id: int) -> List[Dict]:
         try:
             response = (self.client.table("watchlist")
-                       .select("*")
+                       .select(*WATCHLIST_COLUMNS)
                        .eq("telegram_id", telegram_id)
                        .execute())
             return response.data
@@ -39,16 +45,6 @@ class SupabaseDB:
     def add_watchlist_entry(self, telegram_id: int, sender_address: str, 
                           nonce: int, predicted_address: str) -> bool:
         try:
-            existing_entry = (self.client.table("watchlist")
-                            .select("*")
-                            .eq("telegram_id", telegram_id)
-                            .eq("predicted_address", predicted_address)
-                            .execute().data)
-            
-            if existing_entry:
-                logger.info(f"Watchlist entry already exists for user {telegram_id}")
-                return False
-
             data = {
                 "telegram_id": telegram_id,
                 "sender_address": sender_address,
@@ -56,8 +52,15 @@ class SupabaseDB:
                 "predicted_address": predicted_address,
                 "created_at": datetime.now().isoformat()
             }
-            
-            self.client.table("watchlist").insert(data).execute()
+            response = (self.client.table("watchlist")
+                        .upsert(data, on_conflict="telegram_id,predicted_address", ignore_duplicates=True)
+                        .select("id")
+                        .execute())
+
+            if not response.data:
+                logger.info(f"Watchlist entry already exists for user {telegram_id}")
+                return False
+
             logger.info(f"Added watchlist entry for user {telegram_id}")
             return True
         except Exception as e:
@@ -79,21 +82,19 @@ class SupabaseDB:
 
     def add_subscription(self, telegram_id: int, recipient_address: str) -> bool:
         try:
-            existing_sub = (self.client.table("subscriptions")
-                          .select("*")
-                          .eq("telegram_id", telegram_id)
-                          .execute().data)
-            
-            if existing_sub:
+            response = (self.client.table("subscriptions")
+                        .upsert({
+                            "telegram_id": telegram_id,
+                            "recipient_address": recipient_address,
+                            "is_active": False
+                        }, on_conflict="telegram_id", ignore_duplicates=True)
+                        .select("telegram_id")
+                        .execute())
+
+            if not response.data:
                 logger.info(f"Subscription already exists for user {telegram_id}")
                 return False
 
-            self.client.table("subscriptions").insert({
-                "telegram_id": telegram_id,
-                "recipient_address": recipient_address,
-                "is_active": False
-            }).execute()
-            
             logger.info(f"Added subscription for user {telegram_id}")
             return True
         except Exception as e:
@@ -119,13 +120,342 @@ class SupabaseDB:
             logger.error(f"Error updating subscription for user {telegram_id}: {e}")
             return False
 
+    def activate_subscription(self, telegram_id: int, recipient_address: str, expiry_date: str,
+                              payment_tx_hash: Optional[str] = None) -> Optional[str]:
+        # Creates or updates the row in one write and returns the expiry in
+        # effect. A payment that was already applied keeps its expiry.
+        try:
+            if payment_tx_hash:
+                response = (self.client.table("subscriptions")
+                            .select("expiry_date", "payment_tx_hash")
+                            .eq("telegram_id", telegram_id)
+                            .execute())
+                if response.data and response.data[0].get("payment_tx_hash") == payment_tx_hash:
+                    logger.info(f"Payment {payment_tx_hash} already applied for user {telegram_id}")
+                    return response.data[0]["expiry_date"]
+            (self.client.table("subscriptions")
+             .upsert({
+                 "telegram_id": telegram_id,
+                 "recipient_address": recipient_address,
+                 "is_active": True,
+                 "expiry_date": expiry_date,
+                 "payment_tx_hash": payment_tx_hash
+             }, on_conflict="telegram_id", returning=ReturnMethod.minimal)
+             .execute())
+            logger.info(f"Activated subscription for user {telegram_id} until {expiry_date}")
+            return expiry_date
+        except Exception as e:
+            logger.error(f"Error activating subscription for user {telegram_id}: {e}")
+            return None
+
     def get_subscription(self, telegram_id: int) -> Optional[Dict]:
         try:
             response = (self.client.table("subscriptions")
-                       .select("*")
+                       .select(*SUBSCRIPTION_COLUMNS)
                        .eq("telegram_id", telegram_id)
                        .execute())
             return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"Error fetching subscription for user {telegram_id}: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def add_payment_job(self, telegram_id: int, chat_id: int, sender_address: str,
+                        kind: str, network: str,
+                        start_block: Optional[int] = None) -> Optional[Dict]:
+        try:
+            now = datetime.now().isoformat()
+            response = self.client.table("payment_jobs").insert({
+                "telegram_id": telegram_id,
+                "chat_id": chat_id,
+                "sender_address": sender_address,
+                "kind": kind,
+                "network": network,
+                "start_block": start_block,
+                "state": "queued",
+                "created_at": now,
+                "updated_at": now
+            }).execute()
+            logger.info(f"Added {kind} payment job for user {telegram_id}")
+            return response.data[0] if response.data else None
+        except Exception as e:
+            logger.error(f"Error adding payment job for user {telegram_id}: {e}")
+            return None
+
+    def update_payment_job(self, job_id: int, **fields) -> bool:
+        try:
+            fields["updated_at"] = datetime.now().isoformat()
+            (self.client.table("payment_jobs")
+             .update(fields)
+             .eq("id", job_id)
+             .execute())
+            return True
+        except Exception as e:
+            logger.error(f"Error updating payment job {job_id}: {e}")
+            return False
+
+    def get_active_payment_jobs(self) -> List[Dict]:
+        try:
+            response = (self.client.table("payment_jobs")
+                       .select("*")
+                       .in_("state", ["queued", "running"])
+                       .order("id")
+                       .execute())
+            return response.data
+        except Exception as e:
+            logger.error(f"Error fetching active payment jobs: {e}")
+            return []
+
+# Async counterpart of SupabaseDB with the same methods, for use on the bot's
+# event loop. All requests share one keep-alive connection pool, time out after
+# SUPABASE_TIMEOUT seconds and at most `max_concurrency` run at once.
+# Subscriptions are read through a short-lived cache, and users already added
+# by this process are not looked up again.
+class AsyncSupabaseDB:
+    def __init__(self, client: AsyncClient, http_client: httpx.AsyncClient, max_concurrency: int):
+        self.client = client
+        self._http_client = http_client
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.subscriptions = SubscriptionCache(config.SUBSCRIPTION_CACHE_TTL, config.SUBSCRIPTION_CACHE_SIZE)
+        self._known_users = set()
+
+    @classmethod
+    async def create(cls, url: str, key: str,
+                     max_connections: int = config.SUPABASE_MAX_CONNECTIONS,
+                     max_concurrency: int = config.SUPABASE_MAX_CONCURRENCY,
+                     timeout: float = config.SUPABASE_TIMEOUT) -> "AsyncSupabaseDB":
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout
+        )
+        client = await acreate_client(url, key, AsyncClientOptions(
+            httpx_client=http_client,
+            postgrest_client_timeout=timeout
+        ))
+        return cls(client, http_client, max_concurrency)
+
+    async def close(self) -> None:
+        await self._http_client.aclose()
+
+    async def _execute(self, query):
+        async with self._semaphore:
+            return await query.execute()
+
+    async def add_user(self, telegram_id: int, username: str) -> bool:
+        if telegram_id in self._known_users:
+            return True
+        try:
+            response = await self._execute(self.client.table("users")
+                                           .upsert({"telegram_id": telegram_id, "username": username},
+                                                   on_conflict="telegram_id", ignore_duplicates=True)
+                                           .select("telegram_id"))
+            if response.data:
+                logger.info(f"Added new user: {telegram_id}")
+            self._known_users.add(telegram_id)
+            return True
+        except Exception as e:
+            logger.error(f"Error adding user {telegram_id}: {e}")
+            return False
+
+    async def get_watchlist(self, telegram_id: int) -> List[Dict]:
+        try:
+            response = await self._execute(self.client.table("watchlist")
+                                           .select(*WATCHLIST_COLUMNS)
+                                           .eq("telegram_id", telegram_id))
+            return response.data
+        except Exception as e:
+            logger.error(f"Error fetching watchlist for user {telegram_id}: {e}")
+            return []
+
+    async def add_watchlist_entry(self, telegram_id: int, sender_address: str,
+                                  nonce: int, predicted_address: str) -> bool:
+        try:
+            data = {
+                "telegram_id": telegram_id,
+                "sender_address": sender_address,
+                "nonce": nonce,
+                "predicted_address": predicted_address,
+                "created_at": datetime.now().isoformat()
+            }
+            response = await self._execute(self.client.table("watchlist")
+                                           .upsert(data, on_conflict="telegram_id,predicted_address",
+                                                   ignore_duplicates=True)
+                                           .select("id"))
+
+            if not response.data:
+                logger.info(f"Watchlist entry already exists for user {telegram_id}")
+                return False
+
+            logger.info(f"Added watchlist entry for user {telegram_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Error adding watchlist entry for user {telegram_id}: {e}")
+            return False
+
+    async def delete_watchlist_entry(self, entry_id: int, telegram_id: int) -> bool:
+        try:
+            await self._execute(self.client.table("watchlist")
+                                .delete()
+                                .eq("id", entry_id)
+                                .eq("telegram_id", telegram_id))
+            logger.info(f"Deleted watchlist entry {entry_id} for user {telegram_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting watchlist entry {entry_id}: {e}")
+            return False
+
+    async def add_subscription(self, telegram_id: int, recipient_address: str) -> bool:
+        try:
+            response = await self._execute(self.client.table("subscriptions")
+                                           .upsert({
+                                               "telegram_id": telegram_id,
+                                               "recipient_address": recipient_address,
+                                               "is_active": False
+                                           }, on_conflict="telegram_id", ignore_duplicates=True)
+                                           .select("telegram_id"))
+
+            if not response.data:
+                logger.info(f"Subscription already exists for user {telegram_id}")
+                return False
+
+            self.subscriptions.invalidate(telegram_id)
+
+            logger.info(f"Added subscription for user {telegram_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Error adding subscription for user {telegram_id}: {e}")
+            return False
+
+    async def update_subscription(self, telegram_id: int, is_active: bool,
+                                  expiry_date: str = None) -> bool:
+        try:
+            data = {"is_active": is_active}
+            if expiry_date:
+                data["expiry_date"] = expiry_date
+
+            await self._execute(self.client.table("subscriptions")
+                                .update(data)
+                                .eq("telegram_id", telegram_id))
+            self.subscriptions.invalidate(telegram_id)
+
+            logger.info(f"Updated subscription for user {telegram_id}: "
+                        f"active={is_active}, expires={expiry_date}")
+            return True
+        except Exception as e:
+            logger.error(f"Error updating subscription for user {telegram_id}: {e}")
+            return False
+
+    async def activate_subscription(self, telegram_id: int, recipient_address: str, expiry_date: str,
+                                    payment_tx_hash: Optional[str] = None) -> Optional[str]:
+        # Creates or updates the row in one write and returns the expiry in
+        # effect. The payment's hash is stored with the row, so a job resumed
+        # after a crash that followed this write does not extend it again.
+        try:
+            if payment_tx_hash:
+                response = await self._execute(self.client.table("subscriptions")
+                                               .select("expiry_date", "payment_tx_hash")
+                                               .eq("telegram_id", telegram_id))
+                if response.data and response.data[0].get("payment_tx_hash") == payment_tx_hash:
+                    logger.info(f"Payment {payment_tx_hash} already applied for user {telegram_id}")
+                    return response.data[0]["expiry_date"]
+            await self._execute(self.client.table("subscriptions")
+                                .upsert({
+                                    "telegram_id": telegram_id,
+                                    "recipient_address": recipient_address,
+                                    "is_active": True,
+                                    "expiry_date": expiry_date,
+                                    "payment_tx_hash": payment_tx_hash
+                                }, on_conflict="telegram_id", returning=ReturnMethod.minimal))
+            self.subscriptions.invalidate(telegram_id)
+            logger.info(f"Activated subscription for user {telegram_id} until {expiry_date}")
+            return expiry_date
+        except Exception as e:
+            logger.error(f"Error activating subscription for user {telegram_id}: {e}")
+            return None
+
+    async def get_subscription(self, telegram_id: int) -> Optional[Dict]:
+        cached, subscription = self.subscriptions.get(telegram_id)
+        if cached:
+            return subscription
+        generation = self.subscriptions.generation(telegram_id)
+        try:
+            response = await self._execute(self.client.table("subscriptions")
+                                           .select(*SUBSCRIPTION_COLUMNS)
+                                           .eq("telegram_id", telegram_id))
+            return self.subscriptions.put(telegram_id, response.data[0] if response.data else None, generation)
+        except Exception as e:
+            logger.error(f"Error fetching subscription for user {telegram_id}: {e}")
+            return None
+
+    async def add_payment_job(self, telegram_id: int, chat_id: int, sender_address: str,
+                              kind: str, network: str,
+                              start_block: Optional[int] = None) -> Optional[Dict]:
+        try:
+            now = datetime.now().isoformat()
+            response = await self._execute(self.client.table("payment_jobs").insert({
+                "telegram_id": telegram_id,
+                "chat_id": chat_id,
+                "sender_address": sender_address,
+                "kind": kind,
+                "network": network,
+                "start_block": start_block,
+                "state": "queued",
+                "created_at": now,
+                "updated_at": now
+            }))
+            logger.info(f"Added {kind} payment job for user {telegram_id}")
+            return response.data[0] if response.data else None
+        except Exception as e:
+            logger.error(f"Error adding payment job for user {telegram_id}: {e}")
+            return None
+
+    async def update_payment_job(self, job_id: int, **fields) -> bool:
+        try:
+            fields["updated_at"] = datetime.now().isoformat()
+            await self._execute(self.client.table("payment_jobs")
+                                .update(fields)
+                                .eq("id", job_id))
+            return True
+        except Exception as e:
+            logger.error(f"Error updating payment job {job_id}: {e}")
+            return False
+
+    async def get_active_payment_jobs(self) -> List[Dict]:
+        try:
+            response = await self._execute(self.client.table("payment_jobs")
+                                           .select("*")
+                                           .in_("state", ["queued", "running"])
+                                           .order("id"))
+            return response.data
+        except Exception as e:
+            logger.error(f"Error fetching active payment jobs: {e}")
+            return []
+
+    async def get_undeployed_watchlist_entries(self, after_id: int, limit: int) -> List[Dict]:
+        # Keyset-paged across all users, oldest first
+        try:
+            response = await self._execute(self.client.table("watchlist")
+                                           .select("id", "telegram_id", "sender_address", "nonce",
+                                                   "predicted_address")
+                                           .is_("deployed_block", "null")
+                                           .gt("id", after_id)
+                                           .order("id")
+                                           .limit(limit))
+            return response.data
+        except Exception as e:
+            logger.error(f"Error fetching watchlist entries after {after_id}: {e}")
+            return []
+
+    async def mark_watchlist_deployed(self, entry_ids: List[int], block_number: int) -> List[Dict]:
+        # Returns only rows this call marked, so deleted or already marked
+        # entries are not reported twice
+        try:
+            response = await self._execute(self.client.table("watchlist")
+                                           .update({"deployed_block": block_number})
+                                           .in_("id", entry_ids)
+                                           .is_("deployed_block", "null")
+                                           .select("id", "telegram_id", "sender_address", "nonce",
+                                                   "predicted_address"))
+            return response.data
+        except Exception as e:
+            logger.error(f"Error marking watchlist entries deployed at block {block_number}: {e}")
+            return []
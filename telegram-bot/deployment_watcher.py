@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import time
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from telegram import Bot
+
+from config import config
+from block_follower import BlockWatcher, get_block_follower
+from database import AsyncSupabaseDB
+from keyboards import KeyboardFactory
+from payment_matcher import address_bytes
+
+logger = logging.getLogger(__name__)
+
+class WatchedAddress(NamedTuple):
+    id: int
+    telegram_id: int
+    sender: bytes
+    nonce: int
+    address: str
+
+# Notices when predicted watchlist addresses get deployed. A CREATE address
+# (sender, nonce) can only come into existence in the transaction that uses
+# that nonce, so each block is matched against the watched (sender, nonce)
+# pairs in O(transactions), and eth_getCode is only asked for the few
+# candidates. Senders that are contracts don't send transactions; their nonces
+# are read in one batch per block instead. New watchlist rows are picked up
+# every DEPLOY_WATCH_REFRESH_INTERVAL seconds with one eth_getCode sweep.
+class DeploymentWatcher:
+    def __init__(self, supabase: AsyncSupabaseDB, rpc_url: str,
+                 batch_size: int = config.DEPLOY_CHECK_BATCH_SIZE,
+                 refresh_interval: float = config.DEPLOY_WATCH_REFRESH_INTERVAL):
+        self.supabase = supabase
+        self.follower = get_block_follower(rpc_url)
+        self.w3 = self.follower.w3
+        self.batch_size = batch_size
+        self.refresh_interval = refresh_interval
+        self.bot: Optional[Bot] = None
+        # sender -> nonce -> watchlist rows waiting for that deployment
+        self._active: Dict[bytes, Dict[int, List[WatchedAddress]]] = {}
+        self._contract_senders: Set[bytes] = set()
+        self._last_id = 0
+        self._refreshed_at = 0.0
+        self._watcher: Optional[BlockWatcher] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def active_count(self) -> int:
+        return sum(len(entries) for nonces in self._active.values() for entries in nonces.values())
+
+    async def start(self, bot: Bot) -> None:
+        self.bot = bot
+        self._watcher = await self.follower.register()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._watcher:
+            self.follower.unregister(self._watcher)
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _batched(self, method: str, calls: List[tuple]) -> list:
+        # One JSON-RPC batch per `batch_size` calls of w3.eth.<method>
+        results = []
+        for start in range(0, len(calls), self.batch_size):
+            chunk = calls[start:start + self.batch_size]
+
+            def query():
+                with self.w3.batch_requests() as batch:
+                    for args in chunk:
+                        batch.add(getattr(self.w3.eth, method)(*args))
+                    return batch.execute()
+
+            results.extend(await self.follower._call(query))
+        return results
+
+    async def _run(self) -> None:
+        while True:
+            block = await self._watcher.queue.get()
+            if block is None:
+                break
+            try:
+                if time.monotonic() - self._refreshed_at >= self.refresh_interval:
+                    await self._refresh(block["number"])
+            except Exception as e:
+                logger.error(f"Error loading watchlist entries: {e}")
+            # Retry rather than skip: a deployment in a skipped block is never seen
+            while True:
+                try:
+                    await self._check_block(block)
+                    break
+                except Exception as e:
+                    logger.error(f"Error checking deployments in block {block['number']}: {e}")
+                    await asyncio.sleep(self.follower.poll_interval)
+
+    async def _refresh(self, block_number: int) -> None:
+        self._refreshed_at = time.monotonic()
+        entries = []
+        while True:
+            rows = await self.supabase.get_undeployed_watchlist_entries(self._last_id, self.batch_size)
+            for row in rows:
+                entries.append(WatchedAddress(row["id"], row["telegram_id"], address_bytes(row["sender_address"]),
+                                              row["nonce"], row["predicted_address"]))
+            if rows:
+                self._last_id = rows[-1]["id"]
+            if len(rows) < self.batch_size:
+                break
+        if entries:
+            await self._sweep(entries, block_number)
+            logger.info(f"Deployment watcher: {len(entries)} new entries, {self.active_count} active")
+
+    async def _sweep(self, entries: List[WatchedAddress], block_number: int) -> None:
+        # Entries whose nonce is already used are settled now; the rest wait
+        # for the transaction that uses their nonce
+        senders = list({entry.sender for entry in entries})
+        sender_codes = await self._batched("get_code", [(sender, block_number) for sender in senders])
+        sender_nonces = await self._batched("get_transaction_count", [(sender, block_number) for sender in senders])
+        self._contract_senders.update(sender for sender, code in zip(senders, sender_codes) if code)
+        nonces = dict(zip(senders, sender_nonces))
+
+        used = []
+        for entry in entries:
+            nonce = nonces.get(entry.sender)
+            if nonce is not None and entry.nonce < nonce:
+                used.append(entry)
+            else:
+                self._active.setdefault(entry.sender, {}).setdefault(entry.nonce, []).append(entry)
+        await self._settle(used, block_number)
+
+    async def _check_block(self, block) -> None:
+        candidates: List[WatchedAddress] = []
+        transactions = block.get("transactions") or []
+        if transactions and not isinstance(transactions[0], Mapping):
+            # The follower runs in header-only (probe) mode
+            block = await self.follower._call(self.w3.eth.get_block, block["hash"], full_transactions=True)
+            transactions = block["transactions"]
+        for tx in transactions:
+            nonces = self._active.get(address_bytes(tx["from"]))
+            if nonces and tx["nonce"] in nonces:
+                candidates.extend(nonces[tx["nonce"]])
+
+        if self._contract_senders:
+            senders = list(self._contract_senders)
+            for sender, nonce in zip(senders, await self._batched(
+                    "get_transaction_count", [(sender, block["number"]) for sender in senders])):
+                for entry_nonce in [n for n in self._active.get(sender, {}) if n < nonce]:
+                    candidates.extend(self._active[sender][entry_nonce])
+
+        if candidates:
+            await self._settle(candidates, block["number"])
+
+    def _forget(self, entries: Iterable[WatchedAddress]) -> None:
+        for entry in entries:
+            nonces = self._active.get(entry.sender)
+            if nonces is None:
+                continue
+            nonces.pop(entry.nonce, None)
+            if not nonces:
+                del self._active[entry.sender]
+                self._contract_senders.discard(entry.sender)
+
+    async def _settle(self, entries: List[WatchedAddress], block_number: int) -> None:
+        # Their nonce is used: either the contract is there now, or that nonce
+        # went to another transaction and the address can no longer be deployed
+        codes = await self._batched("get_code", [(entry.address, block_number) for entry in entries])
+        deployed = [entry for entry, code in zip(entries, codes) if code]
+        self._forget(entries)
+        if not deployed:
+            return
+        rows = await self.supabase.mark_watchlist_deployed([entry.id for entry in deployed], block_number)
+        by_user: Dict[int, List[Dict]] = {}
+        for row in rows:
+            by_user.setdefault(row["telegram_id"], []).append(row)
+        for telegram_id, user_rows in by_user.items():
+            await self._notify(telegram_id, user_rows, block_number)
+        logger.info(f"Deployment watcher: {len(deployed)} addresses deployed by block {block_number}, "
+                    f"{len(by_user)} users notified")
+
+    async def _notify(self, telegram_id: int, rows: List[Dict], block_number: int) -> None:
+        message = "🚀 *Predicted Contract Deployed!*\n\n"
+        for row in rows:
+            message += (
+                f"• `{row['predicted_address']}`\n"
+                f"  Sender `{row['sender_address']}`, nonce `{row['nonce']}`\n"
+            )
+        message += f"\nSeen at block `{block_number}`."
+        try:
+            await self.bot.send_message(
+                chat_id=telegram_id,
+                text=message,
+                parse_mode="Markdown",
+                reply_markup=KeyboardFactory.back_to_main()
+            )
+        except Exception as e:
+            logger.error(f"Error notifying user {telegram_id} about deployments: {e}")
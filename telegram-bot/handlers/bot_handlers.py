@@ -1,26 +1,46 @@
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 from web3 import Web3
-from datetime import datetime, timedelta
 import logging
 
-from utils import predict_contract_address, is_subscribed, validate_eth_address
+import asyncio
+
+from prediction import predict_contract_address, predict_contract_addresses
+from utils import is_subscribed, validate_eth_address
 from constants import (WAITING_FOR_ADDRESS, WAITING_FOR_SENDER, 
-                      WAITING_FOR_SUBSCRIPTION_ADDRESS, Messages, TransactionState)
+                      WAITING_FOR_SUBSCRIPTION_ADDRESS, Messages)
 from keyboards import KeyboardFactory
 from config import config
-from transaction_monitor import TransactionMonitor
-from database import SupabaseDB
+from payment_jobs import PaymentJobScheduler
+from database import AsyncSupabaseDB
+from balance_engine import ETH, get_balance_engine
+from web3_pool import get_network_web3
+from single_flight import rpc_flights
 
 logger = logging.getLogger(__name__)
 
+def user_network(context: ContextTypes.DEFAULT_TYPE) -> str:
+    # Each user's selected network lives in their user_data; toggling it
+    # changes nothing for anyone else and reuses the pooled client
+    return context.user_data.get("network", config.DEFAULT_NETWORK)
+
+async def _get_nonce(network: str, sender: str) -> int:
+    # Users confirming the same popular deployer at once share one lookup,
+    # before it even queues for an executor thread
+    web3 = get_network_web3(network)
+    address = Web3.to_checksum_address(sender)
+    return await rpc_flights.acall(
+        ("eth_getTransactionCount", network, address),
+        lambda: asyncio.get_event_loop().run_in_executor(None, web3.eth.get_transaction_count, address)
+    )
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    supabase: SupabaseDB = context.bot_data["supabase"]
+    supabase: AsyncSupabaseDB = context.bot_data["supabase"]
     user = update.effective_user
     
-    supabase.add_user(telegram_id=user.id, username=user.username or "unknown")
-    subscription = supabase.get_subscription(telegram_id=user.id)
-    network_indicator = config.get_network_indicator()
+    await supabase.add_user(telegram_id=user.id, username=user.username or "unknown")
+    subscription = await supabase.get_subscription(telegram_id=user.id)
+    network_indicator = config.get_network_indicator(user_network(context))
     
     if is_subscribed(subscription):
         keyboard = KeyboardFactory.main_menu_subscribed(network_indicator)
@@ -37,20 +57,20 @@ async def button(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
     
-    supabase: SupabaseDB = context.bot_data["supabase"]
+    supabase: AsyncSupabaseDB = context.bot_data["supabase"]
     user_id = query.from_user.id
     data = query.data
     
     logger.info(f"Button callback: user_id={user_id}, data={data}")
     
-    subscription = supabase.get_subscription(telegram_id=user_id)
-    network_indicator = config.get_network_indicator()
+    subscription = await supabase.get_subscription(telegram_id=user_id)
+    network_indicator = config.get_network_indicator(user_network(context))
     
     if data == "main_menu":
         return await _handle_main_menu(query, subscription, network_indicator)
     
     if data == "toggle_network":
-        return await _handle_network_toggle(query, subscription)
+        return await _handle_network_toggle(query, context, subscription)
     
     if not is_subscribed(subscription) and data not in ["subscribe", "help"] and not data.startswith("confirm_subscribe_"):
         await query.edit_message_text(
@@ -73,9 +93,10 @@ async def _handle_main_menu(query, subscription, network_indicator):
     await query.edit_message_text(text, reply_markup=keyboard, parse_mode="Markdown")
     return ConversationHandler.END
 
-async def _handle_network_toggle(query, subscription):
-    new_network = config.toggle_network()
-    network_indicator = config.get_network_indicator()
+async def _handle_network_toggle(query, context, subscription):
+    new_network = config.other_network(user_network(context))
+    context.user_data["network"] = new_network
+    network_indicator = config.get_network_indicator(new_network)
     
     if is_subscribed(subscription):
         keyboard = KeyboardFactory.main_menu_subscribed(network_indicator)
@@ -97,12 +118,18 @@ async def _handle_button_actions(query, context, data, supabase, user_id):
         return await _handle_monitor(query)
     elif data == "watchlist":
         return await _handle_watchlist(query, supabase, user_id)
+    elif data == "balance":
+        return await _handle_balance(query, context, supabase, user_id)
     elif data.startswith("delete_"):
         return await _handle_delete_entry(query, supabase, user_id, data)
     elif data == "help":
         return await _handle_help(query)
+    elif data == "cancel_vanity":
+        return await _handle_cancel_vanity(query, context, user_id)
+    elif data.startswith("predict_range_"):
+        return await _handle_predict_range(query, context, data)
     elif data.startswith("confirm_predict_"):
-        return await _handle_confirm_predict(query, supabase, user_id, data)
+        return await _handle_confirm_predict(query, context, supabase, user_id, data)
     elif data.startswith("confirm_monitor_"):
         return await _handle_confirm_monitor(query, context, user_id, data)
     elif data.startswith("confirm_subscribe_"):
@@ -115,7 +142,7 @@ async def _handle_subscribe(query, context):
         await query.edit_message_text(
             "💎 *Subscribe to Contract Predictor Bot*\n\n"
             f"Please send the sender address (0x...) to initiate a payment of 0.01 ETH to `{config.RECIPIENT_ADDRESS}`.\n"
-            "⚠️ *Do not close this window* until payment confirmation is received.\n"
+            "🔔 You'll get a message when the payment is confirmed, even if you close this window.\n"
             f"Monitoring will timeout after {config.MAX_BLOCKS_TO_WAIT} blocks (~{config.MAX_BLOCKS_TO_WAIT * 12 // 60} minutes).",
             parse_mode="Markdown",
             reply_markup=KeyboardFactory.cancel_action()
@@ -149,7 +176,7 @@ async def _handle_monitor(query):
     return WAITING_FOR_SENDER
 
 async def _handle_watchlist(query, supabase, user_id):
-    watchlist = supabase.get_watchlist(telegram_id=user_id)
+    watchlist = await supabase.get_watchlist(telegram_id=user_id)
     if not watchlist:
         await query.edit_message_text(
             "📋 *Your Watchlist*\n\n"
@@ -173,9 +200,77 @@ async def _handle_watchlist(query, supabase, user_id):
     await query.edit_message_text(response, reply_markup=keyboard, parse_mode="Markdown")
     return ConversationHandler.END
 
+def _format_amount(raw, decimals):
+    if raw is None:
+        return "unavailable"
+    amount = Web3.from_wei(raw, "ether") if decimals == 18 else raw / 10 ** decimals
+    return f"{amount:,.6f}".rstrip("0").rstrip(".")
+
+# Telegram rejects messages over 4096 characters
+MESSAGE_LIMIT = 4096
+
+def _chunk_message(header, blocks, limit=MESSAGE_LIMIT):
+    chunks = [header]
+    for block in blocks:
+        if len(chunks[-1]) + len(block) > limit:
+            chunks.append("")
+        chunks[-1] += block
+    return chunks
+
+async def _handle_balance(query, context, supabase, user_id):
+    watchlist = await supabase.get_watchlist(telegram_id=user_id)
+    if not watchlist:
+        await query.edit_message_text(
+            "💰 *Balances*\n\n"
+            "No addresses in your watchlist yet. Predict a contract address first.",
+            parse_mode="Markdown",
+            reply_markup=KeyboardFactory.back_to_main()
+        )
+        return ConversationHandler.END
+
+    addresses = list(dict.fromkeys(
+        Web3.to_checksum_address(entry[key]) for entry in watchlist
+        for key in ("sender_address", "predicted_address")
+    ))
+    network = user_network(context)
+    tokens = config.balance_tokens_for(network)
+    engine = get_balance_engine(config.rpc_url_for(network))
+    try:
+        # All addresses and tokens in one multicall, off the event loop
+        token_info = await asyncio.get_event_loop().run_in_executor(None, engine.token_info, tokens)
+        block_number, balances = await asyncio.get_event_loop().run_in_executor(
+            None, engine.balances, addresses, tokens)
+
+        blocks = []
+        for address in addresses:
+            block = f"🔹 `{address}`\n  • ETH: `{_format_amount(balances[address][ETH], 18)}`\n"
+            for token, info in token_info.items():
+                # None (balanceOf reverted) shows as "unavailable", a zero balance as 0
+                raw = balances[address][token]
+                block += f"  • {info['symbol']}: `{_format_amount(raw, info['decimals'])}`\n"
+            blocks.append(block + "\n")
+        chunks = _chunk_message(
+            f"💰 *Balances* ({config.get_network_indicator(network)}, block `{block_number}`)\n\n", blocks)
+
+        # The first chunk replaces the menu; the rest follow as new messages
+        for i, chunk in enumerate(chunks):
+            keyboard = KeyboardFactory.back_to_main() if i == len(chunks) - 1 else None
+            if i == 0:
+                await query.edit_message_text(chunk, parse_mode="Markdown", reply_markup=keyboard)
+            else:
+                await query.message.reply_text(chunk, parse_mode="Markdown", reply_markup=keyboard)
+    except Exception as e:
+        logger.error(f"Error fetching balances for user {user_id}: {e}")
+        await query.message.reply_text(
+            "❌ *Error*: Could not fetch balances. Please try again later.",
+            parse_mode="Markdown",
+            reply_markup=KeyboardFactory.retry_or_back("balance")
+        )
+    return ConversationHandler.END
+
 async def _handle_delete_entry(query, supabase, user_id, data):
     entry_id = int(data.split("_")[1])
-    success = supabase.delete_watchlist_entry(entry_id=entry_id, telegram_id=user_id)
+    success = await supabase.delete_watchlist_entry(entry_id=entry_id, telegram_id=user_id)
     text = "✅ *Entry deleted successfully!*" if success else "❌ *Failed to delete entry.*"
     
     await query.edit_message_text(
@@ -193,19 +288,21 @@ async def _handle_help(query):
     )
     return ConversationHandler.END
 
-async def _handle_confirm_predict(query, supabase, user_id, data):
+async def _handle_confirm_predict(query, context, supabase, user_id, data):
     sender = data.split("confirm_predict_")[1]
     try:
-        web3 = Web3(Web3.HTTPProvider(config.rpc_url))
-        nonce = web3.eth.get_transaction_count(web3.to_checksum_address(sender))
+        nonce = await _get_nonce(user_network(context), sender)
         address = predict_contract_address(sender, nonce)
         
-        added = supabase.add_watchlist_entry(
+        added = await supabase.add_watchlist_entry(
             telegram_id=user_id,
             sender_address=sender,
             nonce=nonce,
             predicted_address=address
         )
+        if added:
+            # Up to a horizon's worth of keccaks; keep them off the event loop
+            await asyncio.get_event_loop().run_in_executor(None, context.bot_data["reverse_index"].add_sender, sender)
         
         message = (
             f"✅ *Prediction Complete!*\n\n"
@@ -218,7 +315,7 @@ async def _handle_confirm_predict(query, supabase, user_id, data):
         await query.edit_message_text(
             message,
             parse_mode="Markdown",
-            reply_markup=KeyboardFactory.retry_or_back("watchlist")
+            reply_markup=KeyboardFactory.prediction_actions(sender, config.PREDICT_RANGE_COUNT)
         )
     except Exception as e:
         logger.error(f"Error in predict confirmation: {e}")
@@ -229,122 +326,104 @@ async def _handle_confirm_predict(query, supabase, user_id, data):
         )
     return ConversationHandler.END
 
-async def _handle_confirm_monitor(query, context, user_id, data):
-    sender = data.split("confirm_monitor_")[1]
+async def _handle_predict_range(query, context, data):
+    sender = data.split("predict_range_")[1]
+    count = config.PREDICT_RANGE_COUNT
     try:
-        monitor = TransactionMonitor(config.rpc_url)
-        context.bot_data["monitor"] = monitor
+        nonce = await _get_nonce(user_network(context), sender)
+        addresses = predict_contract_addresses(sender, nonce, count)
         
-        await query.edit_message_text(
-            f"🔍 *Monitoring Payment*\n\n"
-            f"Monitoring transactions from `{sender}` to `{config.RECIPIENT_ADDRESS}`.\n"
-            f"Expected amount: `{config.EXPECTED_AMOUNT} ETH`.\n"
-            f"Will monitor for {config.MAX_BLOCKS_TO_WAIT} blocks (~{config.MAX_BLOCKS_TO_WAIT * 12 // 60} minutes).\n\n"
-            f"⚠️ *Do not close this window* until confirmation is received.",
-            parse_mode="Markdown",
-            reply_markup=KeyboardFactory.cancel_action()
+        message = (
+            f"🔢 *Next {count} Contract Addresses*\n\n"
+            f"• Sender: `{sender}`\n\n"
         )
+        for offset, address in enumerate(addresses):
+            message += f"`{nonce + offset}`: `{address}`\n"
         
-        result = await monitor.monitor_transaction(sender)
-        await monitor.destroy()
-        del context.bot_data["monitor"]
-        
-        message = _format_monitor_result(result, monitor)
-        await query.message.reply_text(
+        await query.edit_message_text(
             message,
             parse_mode="Markdown",
-            reply_markup=KeyboardFactory.retry_or_back("monitor")
+            reply_markup=KeyboardFactory.back_to_main()
         )
     except Exception as e:
-        logger.error(f"Error in monitor confirmation: {e}")
+        logger.error(f"Error in predict range: {e}")
         await query.edit_message_text(
-            f"❌ *Error*: {e}",
+            f"❌ *Error*: {e}\n\nTry again or return to the main menu.",
             parse_mode="Markdown",
             reply_markup=KeyboardFactory.back_to_main()
         )
-        if "monitor" in context.bot_data:
-            await context.bot_data["monitor"].destroy()
-            del context.bot_data["monitor"]
     return ConversationHandler.END
 
+async def _handle_cancel_vanity(query, context, user_id):
+    search = context.bot_data.get("salt_searches", {}).get(user_id)
+    if search:
+        await asyncio.get_event_loop().run_in_executor(None, search.cancel)
+        logger.info(f"User {user_id} cancelled vanity search {search.id}")
+    else:
+        await query.edit_message_text(
+            "⛏️ *Vanity Salt Search*\n\nNo search is running.",
+            parse_mode="Markdown",
+            reply_markup=KeyboardFactory.back_to_main()
+        )
+    return ConversationHandler.END
+
+async def _handle_confirm_monitor(query, context, user_id, data):
+    sender = data.split("confirm_monitor_")[1]
+    return await _submit_payment_job(
+        query, context, user_id, sender, "monitor",
+        f"🔍 *Monitoring Payment*\n\n"
+        f"Monitoring transactions from `{sender}` to `{config.RECIPIENT_ADDRESS}`.\n"
+        f"Expected amount: `{config.EXPECTED_AMOUNT} ETH`.\n"
+        f"Will monitor for {config.MAX_BLOCKS_TO_WAIT} blocks (~{config.MAX_BLOCKS_TO_WAIT * 12 // 60} minutes).\n\n"
+        f"You'll get a message here as soon as the result is in."
+    )
+
 async def _handle_confirm_subscribe(query, context, supabase, user_id, data):
     sender = data.split("confirm_subscribe_")[1]
+    return await _submit_payment_job(
+        query, context, user_id, sender, "subscribe",
+        f"🔍 *Monitoring Subscription Payment*\n\n"
+        f"Monitoring transactions from `{sender}` to `{config.RECIPIENT_ADDRESS}`.\n"
+        "Expected amount: `0.01 ETH`.\n"
+        f"Will monitor for {config.MAX_BLOCKS_TO_WAIT} blocks (~{config.MAX_BLOCKS_TO_WAIT * 12 // 60} minutes).\n\n"
+        f"You'll get a message here as soon as your subscription is confirmed."
+    )
+
+async def _submit_payment_job(query, context, user_id, sender, kind, text):
+    scheduler: PaymentJobScheduler = context.bot_data["payment_jobs"]
     try:
-        monitor = TransactionMonitor(config.rpc_url)
-        context.bot_data["monitor"] = monitor
-        
-        await query.edit_message_text(
-            f"🔍 *Monitoring Subscription Payment*\n\n"
-            f"Monitoring transactions from `{sender}` to `{config.RECIPIENT_ADDRESS}`.\n"
-            "Expected amount: `0.01 ETH`.\n"
-            f"Will monitor for {config.MAX_BLOCKS_TO_WAIT} blocks (~{config.MAX_BLOCKS_TO_WAIT * 12 // 60} minutes).\n\n"
-            f"⚠️ *Do not close this window* until confirmation is received.",
-            parse_mode="Markdown",
-            reply_markup=KeyboardFactory.cancel_action()
+        queued = scheduler.is_full
+        job = await scheduler.submit(
+            telegram_id=user_id,
+            chat_id=query.message.chat_id,
+            sender_address=sender,
+            kind=kind,
+            network=user_network(context)
         )
-        
-        result = await monitor.monitor_transaction(sender)
-        await monitor.destroy()
-        del context.bot_data["monitor"]
-        
-        if result == TransactionState.FOUND_CORRECT_AMOUNT:
-            expiry_date = (datetime.now() + timedelta(days=30)).isoformat()
-            
-            if not supabase.get_subscription(telegram_id=user_id):
-                supabase.add_subscription(telegram_id=user_id, recipient_address=config.RECIPIENT_ADDRESS)
-            
-            supabase.update_subscription(telegram_id=user_id, is_active=True, expiry_date=expiry_date)
-            
-            message = (
-                f"✅ *Subscription Activated!*\n\n"
-                "You now have full access to all features for 30 days!\n"
-                f"Expiry: `{expiry_date}`\n\n"
-                "Use /start to access the main menu."
+        if not job:
+            raise RuntimeError("Could not start payment monitoring")
+        if queued:
+            text = (
+                f"⏳ *Payment Monitoring Queued*\n\n"
+                f"All monitors are busy right now. Monitoring of `{sender}` starts as soon as one is free.\n"
+                f"Blocks from `{job['start_block']}` on will be checked, so a payment you make now is still found.\n\n"
+                f"You'll get a message here as soon as the result is in."
             )
-        else:
-            message = _format_monitor_result(result, monitor)
         
-        await query.message.reply_text(
-            message,
+        await query.edit_message_text(
+            text,
             parse_mode="Markdown",
-            reply_markup=KeyboardFactory.retry_or_back("subscribe")
+            reply_markup=KeyboardFactory.back_to_main()
         )
     except Exception as e:
-        logger.error(f"Error in confirm_subscribe: {e}")
+        logger.error(f"Error in confirm_{kind}: {e}")
         await query.edit_message_text(
             f"❌ *Error*: {e}",
             parse_mode="Markdown",
-            reply_markup=KeyboardFactory.retry_or_back("subscribe")
+            reply_markup=KeyboardFactory.retry_or_back(kind)
         )
-        if "monitor" in context.bot_data:
-            await context.bot_data["monitor"].destroy()
-            del context.bot_data["monitor"]
     return ConversationHandler.END
 
-def _format_monitor_result(result: TransactionState, monitor: TransactionMonitor) -> str:
-    if result == TransactionState.FOUND_CORRECT_AMOUNT:
-        return (
-            f"✅ *Payment Confirmed!*\n\n"
-            f"Expected amount of `{config.EXPECTED_AMOUNT} ETH` or more received."
-        )
-    elif result == TransactionState.FOUND_INCORRECT_AMOUNT:
-        message = (
-            f"⚠️ *Incorrect Payment Amount!*\n\n"
-            f"Found transactions, but none met the expected amount of `{config.EXPECTED_AMOUNT} ETH`.\n"
-            f"Details:\n"
-        )
-        for tx in monitor.found_transactions:
-            message += f"• Hash: `{tx['hash']}`\n  Amount: `{tx['amount']} ETH`\n"
-        return message
-    elif result == TransactionState.TIMEOUT:
-        return (
-            f"⏰ *Monitoring Timeout!*\n\n"
-            f"No matching transactions found within {config.MAX_BLOCKS_TO_WAIT} blocks.\n"
-            "If you have paid, please contact support."
-        )
-    else:
-        return "❓ *Unexpected Result*\n\nPlease try again or contact support."
-
 async def get_address(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     sender = update.message.text.strip()
     
@@ -1,18 +1,23 @@
 from telegram import Update
 from telegram.ext import ContextTypes
+import asyncio
 import logging
 
-from utils import is_subscribed, format_watchlist_entry
+from utils import is_subscribed, format_watchlist_entry, validate_eth_address
 from constants import Messages
 from keyboards import KeyboardFactory
-from database import SupabaseDB
+from database import AsyncSupabaseDB
+from reverse_index import ReverseIndex
+from prediction import predict_create2_address
+from salt_search import SaltSearch, SearchBusy
+from config import config
 
 logger = logging.getLogger(__name__)
 
 async def watchlist_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    supabase: SupabaseDB = context.bot_data["supabase"]
+    supabase: AsyncSupabaseDB = context.bot_data["supabase"]
     user_id = update.effective_user.id
-    subscription = supabase.get_subscription(telegram_id=user_id)
+    subscription = await supabase.get_subscription(telegram_id=user_id)
 
     if not is_subscribed(subscription):
         await update.message.reply_text(
@@ -23,7 +28,7 @@ async def watchlist_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         logger.info(f"User {user_id} attempted watchlist without subscription")
         return
 
-    watchlist = supabase.get_watchlist(telegram_id=user_id)
+    watchlist = await supabase.get_watchlist(telegram_id=user_id)
     if not watchlist:
         await update.message.reply_text(
             "📋 *Your Watchlist*\n\n"
@@ -51,8 +56,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     logger.info(f"User {update.effective_user.id} viewed help menu")
 
 async def subscription_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    supabase: SupabaseDB = context.bot_data["supabase"]
-    subscription = supabase.get_subscription(telegram_id=update.effective_user.id)
+    supabase: AsyncSupabaseDB = context.bot_data["supabase"]
+    subscription = await supabase.get_subscription(telegram_id=update.effective_user.id)
     
     if is_subscribed(subscription):
         expiry_date = subscription.get("expiry_date", "N/A")
@@ -75,4 +80,176 @@ async def subscription_command(update: Update, context: ContextTypes.DEFAULT_TYP
     keyboard = (KeyboardFactory.back_to_main() if is_subscribed(subscription) 
                else KeyboardFactory.subscription_required())
     
-    await update.message.reply_text(text, parse_mode="Markdown", reply_markup=keyboard)
\ No newline at end of file
+    await update.message.reply_text(text, parse_mode="Markdown", reply_markup=keyboard)
+
+async def _require_subscription(update: Update, supabase: AsyncSupabaseDB, feature: str) -> bool:
+    user_id = update.effective_user.id
+    if is_subscribed(await supabase.get_subscription(telegram_id=user_id)):
+        return True
+    await update.message.reply_text(
+        Messages.SUBSCRIPTION_REQUIRED,
+        parse_mode="Markdown",
+        reply_markup=KeyboardFactory.subscription_required()
+    )
+    logger.info(f"User {user_id} attempted {feature} without subscription")
+    return False
+
+async def reverse_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    supabase: AsyncSupabaseDB = context.bot_data["supabase"]
+    reverse_index: ReverseIndex = context.bot_data["reverse_index"]
+    user_id = update.effective_user.id
+    if not await _require_subscription(update, supabase, "reverse lookup"):
+        return
+
+    if not context.args or not validate_eth_address(context.args[0]):
+        await update.message.reply_text(
+            "🔎 *Reverse Lookup*\n\n"
+            "Usage: `/reverse 0x...`\n"
+            "Finds the deployer and nonce behind a contract address.",
+            parse_mode="Markdown",
+            reply_markup=KeyboardFactory.back_to_main()
+        )
+        return
+
+    address = context.args[0]
+    result = reverse_index.lookup(address)
+    if result:
+        sender, nonce = result
+        text = (
+            "🔎 *Reverse Lookup*\n\n"
+            f"• Contract: `{address}`\n"
+            f"• Deployer: `{sender}`\n"
+            f"• Nonce: `{nonce}`"
+        )
+    elif not reverse_index.ready.is_set():
+        text = "🔎 *Reverse Lookup*\n\nThe reverse index is still warming up. Try again in a minute."
+    else:
+        text = (
+            "🔎 *Reverse Lookup*\n\n"
+            f"No known deployer for `{address}` within the first "
+            f"{reverse_index.horizon} nonces of tracked senders."
+        )
+    await update.message.reply_text(text, parse_mode="Markdown", reply_markup=KeyboardFactory.back_to_main())
+    logger.info(f"User {user_id} reverse-looked up {address}: {'found' if result else 'not found'}")
+
+
+async def create2_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    supabase: AsyncSupabaseDB = context.bot_data["supabase"]
+    if not await _require_subscription(update, supabase, "create2"):
+        return
+
+    try:
+        deployer, salt, code_hash = context.args
+        if not validate_eth_address(deployer):
+            raise ValueError("Invalid deployer address")
+        address = predict_create2_address(deployer, salt, code_hash)
+    except ValueError as e:
+        await update.message.reply_text(
+            "🏭 *CREATE2 Prediction*\n\n"
+            "Usage: `/create2 <deployer> <salt> <init_code_hash>`\n"
+            "Salt and init code hash are 32-byte hex values."
+            + (f"\n\n❌ {e}" if context.args else ""),
+            parse_mode="Markdown",
+            reply_markup=KeyboardFactory.back_to_main()
+        )
+        return
+
+    await update.message.reply_text(
+        f"🏭 *CREATE2 Prediction*\n\n"
+        f"• Deployer: `{deployer}`\n"
+        f"• Salt: `{salt}`\n"
+        f"• Predicted: `{address}`",
+        parse_mode="Markdown",
+        reply_markup=KeyboardFactory.back_to_main()
+    )
+    logger.info(f"User {update.effective_user.id} predicted CREATE2 address {address}")
+
+def _format_vanity_progress(progress: dict) -> str:
+    text = (
+        f"⛏️ *Vanity Salt Search*\n\n"
+        f"• State: *{progress['state']}*\n"
+        f"• Attempts: `{progress['attempts']:,}` (expected ~`{progress['expectedAttempts']:,}`)\n"
+        f"• Hash rate: `{progress['hashRate']:,}/s`\n"
+        f"• Elapsed: `{progress['elapsed']}s`\n"
+    )
+    if progress["state"] == "found":
+        text += f"\n✅ Salt: `{progress['salt']}`\n✅ Address: `{progress['address']}`"
+    return text
+
+async def vanity_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    supabase: AsyncSupabaseDB = context.bot_data["supabase"]
+    user_id = update.effective_user.id
+    if not await _require_subscription(update, supabase, "vanity search"):
+        return
+
+    searches = context.bot_data.setdefault("salt_searches", {})
+    if user_id in searches:
+        await update.message.reply_text(
+            "⛏️ *Vanity Salt Search*\n\nYou already have a search running.",
+            parse_mode="Markdown",
+            reply_markup=KeyboardFactory.cancel_vanity_search()
+        )
+        return
+
+    try:
+        if len(context.args) not in (3, 4):
+            raise ValueError("Wrong number of arguments")
+        deployer, code_hash, prefix = context.args[:3]
+        suffix = context.args[3] if len(context.args) == 4 else ""
+        if not validate_eth_address(deployer):
+            raise ValueError("Invalid deployer address")
+        if len(prefix.removeprefix("0x")) + len(suffix) > config.VANITY_MAX_PATTERN_LENGTH:
+            raise ValueError(f"Prefix and suffix may total at most {config.VANITY_MAX_PATTERN_LENGTH} hex characters")
+        search = SaltSearch(deployer, code_hash, prefix, suffix, config.VANITY_MAX_PROCESSES)
+    except ValueError as e:
+        await update.message.reply_text(
+            "⛏️ *Vanity Salt Search*\n\n"
+            "Usage: `/vanity <deployer> <init_code_hash> <prefix> [suffix]`\n"
+            "Use `0x` as the prefix to search by suffix only."
+            + (f"\n\n❌ {e}" if context.args else ""),
+            parse_mode="Markdown",
+            reply_markup=KeyboardFactory.back_to_main()
+        )
+        return
+
+    # One search at a time across all users; each one keeps several cores busy
+    try:
+        searches[user_id] = search.start()
+    except SearchBusy:
+        await update.message.reply_text(
+            "⛏️ *Vanity Salt Search*\n\nAnother search is running. Try again in a few minutes.",
+            parse_mode="Markdown",
+            reply_markup=KeyboardFactory.back_to_main()
+        )
+        return
+    logger.info(f"User {user_id} started vanity search {search.id}")
+
+    # Collecting a finished search joins its worker processes, so it runs in an executor
+    loop = asyncio.get_event_loop()
+    progress = await loop.run_in_executor(None, search.progress)
+    try:
+        message = await update.message.reply_text(
+            _format_vanity_progress(progress),
+            parse_mode="Markdown",
+            reply_markup=KeyboardFactory.cancel_vanity_search()
+        )
+        while progress["state"] == "running":
+            await asyncio.sleep(config.VANITY_PROGRESS_INTERVAL)
+            progress = await loop.run_in_executor(None, search.progress)
+            if progress["state"] != "running":
+                break
+            await message.edit_text(
+                _format_vanity_progress(progress),
+                parse_mode="Markdown",
+                reply_markup=KeyboardFactory.cancel_vanity_search()
+            )
+    finally:
+        if search.finished_at is None:
+            await loop.run_in_executor(None, search.cancel)
+        searches.pop(user_id, None)
+
+    await message.edit_text(
+        _format_vanity_progress(progress),
+        parse_mode="Markdown",
+        reply_markup=KeyboardFactory.back_to_main()
+    )
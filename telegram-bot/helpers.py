@@ -1,6 +1,4 @@
-from web3 import Web3
-import rlp
+# Kept for callers of the old module; the implementation lives in prediction
+from prediction import predict_contract_address
 
-def predict_contract_address(sender: str, nonce: int) -> str:
-    encoded = Web3.keccak(rlp.encode([Web3.to_bytes(hexstr=sender), nonce]))[12:]
-    return Web3.to_checksum_address(encoded)
+__all__ = ["predict_contract_address"]
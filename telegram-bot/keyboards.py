@@ -55,6 +55,20 @@ class KeyboardFactory:
             [InlineKeyboardButton("⬅️ Back to Main Menu", callback_data="main_menu")]
         ])
     
+    @staticmethod
+    def prediction_actions(sender: str, count: int) -> InlineKeyboardMarkup:
+        return InlineKeyboardMarkup([
+            [InlineKeyboardButton(f"🔢 Predict Next {count}", callback_data=f"predict_range_{sender}")],
+            [InlineKeyboardButton("📋 View Watchlist", callback_data="watchlist")],
+            [InlineKeyboardButton("⬅️ Back to Main Menu", callback_data="main_menu")]
+        ])
+    
+    @staticmethod
+    def cancel_vanity_search() -> InlineKeyboardMarkup:
+        return InlineKeyboardMarkup([
+            [InlineKeyboardButton("⏹️ Cancel Search", callback_data="cancel_vanity")]
+        ])
+    
     @staticmethod
     def watchlist_actions(entries: List[dict]) -> InlineKeyboardMarkup:
         keyboard = []
@@ -3,8 +3,15 @@ import os
 from dotenv import load_dotenv
 from telegram.ext import Application, CommandHandler, ConversationHandler, CallbackQueryHandler, MessageHandler, filters
 from handlers.bot_handlers import start, button, get_address, get_sender, get_subscription_address
-from handlers.commands import help_command, watchlist_command, subscription_command
-from database import SupabaseDB
+from handlers.commands import (help_command, watchlist_command, subscription_command, reverse_command,
+                               create2_command, vanity_command)
+from database import AsyncSupabaseDB, SupabaseDB
+from reverse_index import build_reverse_index
+from payment_jobs import PaymentJobScheduler
+from deployment_watcher import DeploymentWatcher
+from web3_pool import rpc_stats, validate_networks
+from single_flight import rpc_flights
+from config import config
 from constants import WAITING_FOR_ADDRESS, WAITING_FOR_SENDER, WAITING_FOR_SUBSCRIPTION_ADDRESS
 
 logging.basicConfig(
@@ -24,9 +31,43 @@ def main() -> None:
         logger.error(f"Missing environment variables: {missing}")
         return
 
-    supabase = SupabaseDB(url=env_vars["SUPABASE_URL"], key=env_vars["SUPABASE_KEY"])
-    application = Application.builder().token(env_vars["TELEGRAM_TOKEN"]).build()
-    application.bot_data["supabase"] = supabase
+    async def post_init(application: Application) -> None:
+        # The async client's connection pool belongs to the bot's event loop
+        supabase = await AsyncSupabaseDB.create(env_vars["SUPABASE_URL"], env_vars["SUPABASE_KEY"])
+        payment_jobs = PaymentJobScheduler(supabase, config.MAX_CONCURRENT_MONITORS)
+        application.bot_data["supabase"] = supabase
+        application.bot_data["payment_jobs"] = payment_jobs
+        await payment_jobs.start(application.bot)
+        deployment_watcher = DeploymentWatcher(supabase, config.rpc_url_for(config.DEPLOY_WATCH_NETWORK))
+        application.bot_data["deployment_watcher"] = deployment_watcher
+        await deployment_watcher.start(application.bot)
+
+    async def post_shutdown(application: Application) -> None:
+        await application.bot_data["deployment_watcher"].stop()
+        await application.bot_data["payment_jobs"].stop()
+        supabase = application.bot_data["supabase"]
+        logger.info(f"Subscription cache: {supabase.subscriptions.stats()}")
+        logger.info(f"RPC endpoints: {rpc_stats()}")
+        logger.info(f"Coalesced RPC calls: {rpc_flights.stats()}")
+        await supabase.close()
+
+    application = (Application.builder()
+                   .token(env_vars["TELEGRAM_TOKEN"])
+                   .concurrent_updates(config.CONCURRENT_UPDATES)
+                   .post_init(post_init)
+                   .post_shutdown(post_shutdown)
+                   .build())
+    # One-off startup checks, done before the event loop starts
+    try:
+        validate_networks()
+    except ValueError as e:
+        logger.error(str(e))
+        return
+    startup_db = SupabaseDB(url=env_vars["SUPABASE_URL"], key=env_vars["SUPABASE_KEY"])
+    application.bot_data["reverse_index"] = build_reverse_index(
+        startup_db.client, config.REVERSE_INDEX_NONCE_HORIZON, config.REVERSE_INDEX_PATH,
+        config.REVERSE_INDEX_MAX_ENTRIES
+    )
 
     conv_handler = ConversationHandler(
         entry_points=[CallbackQueryHandler(button)],
@@ -52,6 +93,10 @@ def main() -> None:
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("watchlist", watchlist_command))
     application.add_handler(CommandHandler("subscription", subscription_command))
+    application.add_handler(CommandHandler("reverse", reverse_command))
+    application.add_handler(CommandHandler("create2", create2_command))
+    # Searches run for minutes; don't block other updates (including the cancel button)
+    application.add_handler(CommandHandler("vanity", vanity_command, block=False))
 
     logger.info("Bot started and polling...")
     application.run_polling()
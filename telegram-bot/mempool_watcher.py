@@ -0,0 +1,91 @@
+import asyncio
+import itertools
+import logging
+from typing import Dict, Optional, Tuple
+
+from web3 import AsyncWeb3, WebSocketProvider
+from web3.types import TxData
+
+from config import config
+from payment_matcher import address_bytes
+
+logger = logging.getLogger(__name__)
+
+class PendingSession:
+    def __init__(self, session_id: int, sender: bytes):
+        self.id = session_id
+        self.sender = sender
+        self.queue: "asyncio.Queue[TxData]" = asyncio.Queue()
+
+# Streams pending transactions over a WebSocket newPendingTransactions
+# subscription and hands transfers to the recipient to the sessions waiting on
+# their sender. The subscription only stays open while a session is
+# registered. Nodes that only push transaction hashes are ignored: looking up
+# every pending transaction would cost far more than it saves.
+class MempoolWatcher:
+    def __init__(self, ws_url: str, recipient: str):
+        self.ws_url = ws_url
+        self.recipient = address_bytes(recipient)
+        self.connected = False
+        self._sessions: Dict[int, PendingSession] = {}
+        self._ids = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        self._warned_hashes_only = False
+
+    def register(self, sender: str) -> PendingSession:
+        session = PendingSession(next(self._ids), address_bytes(sender))
+        self._sessions[session.id] = session
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return session
+
+    def unregister(self, session: PendingSession) -> None:
+        if self._sessions.pop(session.id, None) is None:
+            return
+        if not self._sessions and self._task:
+            self._task.cancel()
+            self._task = None
+
+    def _dispatch(self, tx: TxData) -> None:
+        to = tx.get("to")
+        if not to or address_bytes(to) != self.recipient:
+            return
+        sender = address_bytes(tx["from"])
+        for session in list(self._sessions.values()):
+            if session.sender == sender:
+                session.queue.put_nowait(tx)
+
+    async def _run(self) -> None:
+        while self._sessions:
+            try:
+                async with AsyncWeb3(WebSocketProvider(self.ws_url)) as ws:
+                    await ws.eth.subscribe("newPendingTransactions", True)
+                    self.connected = True
+                    logger.info(f"Subscribed to pending transactions on {self.ws_url}")
+                    async for message in ws.socket.process_subscriptions():
+                        tx = message["result"]
+                        if isinstance(tx, (bytes, str)):
+                            if not self._warned_hashes_only:
+                                logger.warning(f"{self.ws_url} only sends pending transaction hashes, "
+                                               "mempool watching has no effect")
+                                self._warned_hashes_only = True
+                            continue
+                        self._dispatch(tx)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Pending transaction subscription lost: {e}")
+            finally:
+                self.connected = False
+            await asyncio.sleep(config.WS_RECONNECT_DELAY)
+
+_watchers: Dict[Tuple[str, bytes], MempoolWatcher] = {}
+
+def get_mempool_watcher(rpc_url: str, recipient: str = config.RECIPIENT_ADDRESS) -> Optional[MempoolWatcher]:
+    ws_url = config.ws_url_for(rpc_url)
+    if not config.MEMPOOL_WATCH or not ws_url:
+        return None
+    key = (ws_url, address_bytes(recipient))
+    if key not in _watchers:
+        _watchers[key] = MempoolWatcher(ws_url, recipient)
+    return _watchers[key]
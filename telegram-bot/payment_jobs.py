@@ -0,0 +1,174 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from telegram import Bot
+from web3 import Web3
+
+from config import config
+from constants import TransactionState
+from database import AsyncSupabaseDB
+from keyboards import KeyboardFactory
+from transaction_monitor import TransactionMonitor
+from web3_pool import get_network_web3
+
+logger = logging.getLogger(__name__)
+
+def format_monitor_result(result: TransactionState, monitor: TransactionMonitor) -> str:
+    if result == TransactionState.FOUND_CORRECT_AMOUNT:
+        return (
+            f"✅ *Payment Confirmed!*\n\n"
+            f"Expected amount of `{config.EXPECTED_AMOUNT} ETH` or more received."
+        )
+    elif result == TransactionState.FOUND_INCORRECT_AMOUNT:
+        message = (
+            f"⚠️ *Incorrect Payment Amount!*\n\n"
+            f"Found transactions, but none met the expected amount of `{config.EXPECTED_AMOUNT} ETH`.\n"
+            f"Details:\n"
+        )
+        for tx in monitor.found_transactions:
+            message += f"• Hash: `{tx['hash']}`\n  Amount: `{tx['amount']} ETH`\n"
+        return message
+    elif result == TransactionState.TIMEOUT:
+        return (
+            f"⏰ *Monitoring Timeout!*\n\n"
+            f"No matching transactions found within {config.MAX_BLOCKS_TO_WAIT} blocks.\n"
+            "If you have paid, please contact support."
+        )
+    else:
+        return "❓ *Unexpected Result*\n\nPlease try again or contact support."
+
+# Runs payment monitoring as persisted jobs. Each job row in `payment_jobs`
+# records the sender, the block monitoring started at and the last block that
+# was fully checked, so after a restart every unfinished job resumes from its
+# checkpoint. At most `max_concurrent` monitors run at once; the rest wait
+# their turn in the "queued" state.
+class PaymentJobScheduler:
+    def __init__(self, supabase: AsyncSupabaseDB, max_concurrent: int = config.MAX_CONCURRENT_MONITORS):
+        self.supabase = supabase
+        self.bot: Optional[Bot] = None
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    async def start(self, bot: Bot) -> None:
+        self.bot = bot
+        jobs = await self.supabase.get_active_payment_jobs()
+        for job in jobs:
+            self._spawn(job)
+        logger.info(f"Resumed {len(jobs)} payment jobs")
+
+    @property
+    def is_full(self) -> bool:
+        # A job submitted now waits in the queue until a monitor finishes
+        return self._semaphore.locked()
+
+    async def submit(self, telegram_id: int, chat_id: int, sender_address: str, kind: str,
+                     network: str = config.DEFAULT_NETWORK) -> Optional[Dict]:
+        # The scan starts at the head when the user asked, not when the job
+        # gets a monitor slot, so payments made while queued are still found
+        w3 = get_network_web3(network)
+        start_block = await asyncio.get_event_loop().run_in_executor(None, lambda: w3.eth.block_number)
+        job = await self.supabase.add_payment_job(
+            telegram_id=telegram_id,
+            chat_id=chat_id,
+            sender_address=sender_address,
+            kind=kind,
+            network=network,
+            start_block=start_block
+        )
+        if job:
+            self._spawn(job)
+        return job
+
+    def _spawn(self, job: Dict) -> None:
+        task = asyncio.create_task(self._run_job(job))
+        self._tasks[job["id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job["id"], None))
+
+    async def stop(self) -> None:
+        # Jobs keep their "running" state and checkpoint, so they resume on the next start
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def _run_job(self, job: Dict) -> None:
+        async with self._semaphore:
+            monitor = None
+            try:
+                monitor = TransactionMonitor(config.rpc_url_for(job["network"]))
+                await self.supabase.update_payment_job(job["id"], state="running")
+
+                async def checkpoint(block_number: int, block_hash: Optional[bytes]) -> None:
+                    if job.get("start_block") is None:
+                        job["start_block"] = monitor.start_block_number
+                        await self.supabase.update_payment_job(job["id"], start_block=job["start_block"])
+                    last_checked_hash = Web3.to_hex(block_hash) if block_hash else None
+                    if (block_number, last_checked_hash) != (job.get("last_checked_block"), job.get("last_checked_hash")):
+                        job["last_checked_block"] = block_number
+                        job["last_checked_hash"] = last_checked_hash
+                        await self.supabase.update_payment_job(job["id"],
+                                                               last_checked_block=block_number,
+                                                               last_checked_hash=last_checked_hash)
+
+                async def payment_seen(tx) -> None:
+                    await self._notify(job, (
+                        f"👀 *Payment Seen!*\n\n"
+                        f"Transaction `{Web3.to_hex(tx['hash'])}` is waiting to be mined.\n"
+                        f"You will be notified once it has {config.CONFIRMATIONS} confirmations."
+                    ), with_actions=False)
+
+                result = await monitor.monitor_transaction(
+                    job["sender_address"],
+                    start_block=job.get("start_block"),
+                    last_checked_block=job.get("last_checked_block"),
+                    last_checked_hash=job.get("last_checked_hash"),
+                    on_checkpoint=checkpoint,
+                    on_pending=payment_seen
+                )
+                await self._finish(job, result, monitor)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in payment job {job['id']}: {e}")
+                await self.supabase.update_payment_job(job["id"], state="failed")
+                await self._notify(job, f"❌ *Error*: {e}")
+            finally:
+                if monitor:
+                    await monitor.destroy()
+
+    async def _finish(self, job: Dict, result: TransactionState, monitor: TransactionMonitor) -> None:
+        if job["kind"] == "subscribe" and result == TransactionState.FOUND_CORRECT_AMOUNT:
+            # Keyed by the payment's hash: a job resumed after activating
+            # (crash before the state update below) does not extend it again
+            expiry_date = (datetime.now() + timedelta(days=30)).isoformat()
+            expiry_date = await self.supabase.activate_subscription(
+                telegram_id=job["telegram_id"],
+                recipient_address=config.RECIPIENT_ADDRESS,
+                expiry_date=expiry_date,
+                payment_tx_hash=monitor.confirmed_tx_hash
+            ) or expiry_date
+
+            message = (
+                f"✅ *Subscription Activated!*\n\n"
+                "You now have full access to all features for 30 days!\n"
+                f"Expiry: `{expiry_date}`\n\n"
+                "Use /start to access the main menu."
+            )
+        else:
+            message = format_monitor_result(result, monitor)
+
+        await self.supabase.update_payment_job(job["id"], state=result.value)
+        await self._notify(job, message)
+        logger.info(f"Payment job {job['id']} finished: {result.value}")
+
+    async def _notify(self, job: Dict, message: str, with_actions: bool = True) -> None:
+        try:
+            await self.bot.send_message(
+                chat_id=job["chat_id"],
+                text=message,
+                parse_mode="Markdown",
+                reply_markup=KeyboardFactory.retry_or_back(job["kind"]) if with_actions else None
+            )
+        except Exception as e:
+            logger.error(f"Error notifying user {job['telegram_id']} about job {job['id']}: {e}")
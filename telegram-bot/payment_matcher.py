@@ -0,0 +1,175 @@
+import asyncio
+import itertools
+import logging
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from web3 import Web3
+from web3.types import BlockData, TxData
+
+from config import config
+from block_follower import BlockFollower, BlockWatcher, get_block_follower
+
+logger = logging.getLogger(__name__)
+
+def address_bytes(address: str) -> bytes:
+    return bytes.fromhex(address[2:])
+
+class MatchedBlock(NamedTuple):
+    block: BlockData
+    payments: List[TxData]
+
+class PaymentSession:
+    def __init__(self, session_id: int, sender: bytes, start_block: int, watcher: BlockWatcher):
+        self.id = session_id
+        self.sender = sender
+        self.start_block = start_block
+        # The follower registration feeding this session
+        self.watcher = watcher
+        self.queue: "asyncio.Queue[Optional[MatchedBlock]]" = asyncio.Queue()
+
+    def close(self) -> None:
+        self.queue.put_nowait(None)
+
+# Sits between the block follower and the payment monitors of one recipient.
+# Each block is reduced once to the transfers sent to the recipient and grouped
+# by sender, so matching all open sessions costs O(transactions in the block)
+# plus one dict lookup per session.
+class PaymentMatcher:
+    def __init__(self, follower: BlockFollower, recipient: str):
+        self.follower = follower
+        self.recipient = address_bytes(recipient)
+        self._sessions: Dict[int, PaymentSession] = {}
+        self._ids = itertools.count()
+        self._watcher: Optional[BlockWatcher] = None
+        self._tasks = set()
+        self._start_lock = asyncio.Lock()
+
+    async def register(self, sender: str) -> PaymentSession:
+        async with self._start_lock:
+            if self._watcher is None:
+                self._watcher = await self.follower.register()
+                task = asyncio.create_task(self._run(self._watcher))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            session = PaymentSession(next(self._ids), address_bytes(sender), self.follower.current_block,
+                                     self._watcher)
+            self._sessions[session.id] = session
+        return session
+
+    def unregister(self, session: PaymentSession) -> None:
+        if self._sessions.pop(session.id, None) is None:
+            return
+        session.close()
+        if not self._sessions and self._watcher:
+            self.follower.unregister(self._watcher)
+            self._watcher = None
+
+    def match_block(self, block: BlockData) -> Dict[bytes, List[TxData]]:
+        payments: Dict[bytes, List[TxData]] = {}
+        recipient = self.recipient
+        for tx in block.get("transactions") or ():
+            to = tx.get("to")
+            if to and address_bytes(to) == recipient:
+                payments.setdefault(address_bytes(tx["from"]), []).append(tx)
+        return payments
+
+    async def backfill(self, sender: bytes, start: int, end: int) -> AsyncIterator[MatchedBlock]:
+        # Blocks a session missed, e.g. while its job was not running
+        async with aclosing(self.follower.fetch_blocks(start, end, full_transactions=True)) as blocks:
+            async for block in blocks:
+                yield MatchedBlock(block, self.match_block(block).get(sender, []))
+
+    async def _match(self, block: BlockData) -> Dict[bytes, List[TxData]]:
+        return self.match_block(block)
+
+    async def _run(self, watcher: BlockWatcher) -> None:
+        while True:
+            block = await watcher.queue.get()
+            if block is None:
+                break
+            if not any(self._wants(session, watcher, block) for session in self._sessions.values()):
+                continue
+            payments = await self._match(block)
+            for session in list(self._sessions.values()):
+                if self._wants(session, watcher, block):
+                    session.queue.put_nowait(MatchedBlock(block, payments.get(session.sender, [])))
+
+    @staticmethod
+    def _wants(session: PaymentSession, watcher: BlockWatcher, block: BlockData) -> bool:
+        # A session only gets blocks after its start block, from the watcher it
+        # registered under. Blocks already in flight when it registered (still
+        # queued, or being matched, for this watcher or one dropped when the
+        # last session left) were covered by its backfill; delivering them again
+        # would look like a reorg and count its payments twice.
+        return session.watcher is watcher and block["number"] > session.start_block
+
+# Probe mode: the follower only fetches block headers. Per block, one batch
+# request reads the nonce of every watched sender and the recipient's balance
+# and nonce before and after the block. The full block is downloaded only when
+# a watched sender's nonce moved and the recipient received something (its
+# balance rose, or it sent a transaction that could hide an incoming one).
+# Senders that pay from a contract do not bump their nonce and are not seen.
+class PaymentProber(PaymentMatcher):
+    async def _probe(self, senders: List[bytes], start: int, end: int) -> Dict[int, Set[bytes]]:
+        w3 = self.follower.w3
+        recipient = Web3.to_checksum_address(self.recipient)
+        accounts = [Web3.to_checksum_address(sender) for sender in senders]
+        moved: Dict[int, Set[bytes]] = {}
+
+        def query(numbers: range) -> list:
+            with w3.batch_requests() as batch:
+                for number in numbers:
+                    batch.add(w3.eth.get_balance(recipient, number))
+                    batch.add(w3.eth.get_transaction_count(recipient, number))
+                    for account in accounts:
+                        batch.add(w3.eth.get_transaction_count(account, number))
+                return batch.execute()
+
+        for chunk_start in range(start, end + 1, config.PROBE_BATCH_BLOCKS):
+            numbers = range(chunk_start - 1, min(chunk_start + config.PROBE_BATCH_BLOCKS, end + 1))
+            results = iter(await self.follower._call(query, numbers))
+            states = [(next(results), next(results), [next(results) for _ in accounts]) for _ in numbers]
+            for number, before, after in zip(numbers[1:], states, states[1:]):
+                if after[0] <= before[0] and after[1] == before[1]:
+                    continue
+                changed = {sender for sender, old, new in zip(senders, before[2], after[2]) if old != new}
+                if changed:
+                    moved[number] = changed
+        return moved
+
+    async def _full_block(self, block: BlockData) -> BlockData:
+        # By hash, so a reorg in between cannot swap in a different block
+        return await self.follower._call(self.follower.w3.eth.get_block, block["hash"], full_transactions=True)
+
+    async def backfill(self, sender: bytes, start: int, end: int) -> AsyncIterator[MatchedBlock]:
+        moved = await self._probe([sender], start, end)
+        async with aclosing(self.follower.fetch_blocks(start, end)) as blocks:
+            async for block in blocks:
+                payments = []
+                if block["number"] in moved:
+                    payments = self.match_block(await self._full_block(block)).get(sender, [])
+                yield MatchedBlock(block, payments)
+
+    async def _match(self, block: BlockData) -> Dict[bytes, List[TxData]]:
+        senders = list({session.sender for session in self._sessions.values()})
+        if not senders:
+            return {}
+        # Retry rather than skip: a block that is never matched could hide a payment
+        while True:
+            try:
+                if await self._probe(senders, block["number"], block["number"]):
+                    return self.match_block(await self._full_block(block))
+                return {}
+            except Exception as e:
+                logger.error(f"Error probing block {block['number']}: {e}")
+                await asyncio.sleep(self.follower.poll_interval)
+
+_matchers: Dict[Tuple[str, bytes], PaymentMatcher] = {}
+
+def get_payment_matcher(rpc_url: str, recipient: str = config.RECIPIENT_ADDRESS) -> PaymentMatcher:
+    key = (rpc_url, address_bytes(recipient))
+    if key not in _matchers:
+        matcher_class = PaymentProber if config.PAYMENT_PROBE else PaymentMatcher
+        _matchers[key] = matcher_class(get_block_follower(rpc_url), recipient)
+    return _matchers[key]
@@ -0,0 +1,92 @@
+from eth_hash.auto import keccak
+from typing import Iterable, Iterator, List, Union
+
+# RLP list header for [sender, nonce]: 0xc0 + payload length. The payload is the
+# 20-byte sender (0x94 + 20 bytes = 21 bytes) followed by the encoded nonce.
+_SENDER_PREFIX = b"\x94"
+_SENDER_PAYLOAD_LENGTH = 21
+
+def sender_to_bytes(sender: Union[str, bytes]) -> bytes:
+    if isinstance(sender, str):
+        sender = bytes.fromhex(sender[2:] if sender[:2] in ("0x", "0X") else sender)
+    if len(sender) != 20:
+        raise ValueError(f"Sender must be a 20-byte address, got {len(sender)} bytes")
+    return sender
+
+def encode_nonce(nonce: int) -> bytes:
+    if nonce < 0:
+        raise ValueError("Nonce must be non-negative")
+    if nonce == 0:
+        return b"\x80"
+    if nonce < 0x80:
+        return bytes((nonce,))
+    raw = nonce.to_bytes((nonce.bit_length() + 7) // 8, "big")
+    return bytes((0x80 + len(raw),)) + raw
+
+def to_checksum_address(address: bytes) -> str:
+    hex_address = address.hex()
+    address_hash = keccak(hex_address.encode("ascii")).hex()
+    return "0x" + "".join(
+        char.upper() if int(hash_char, 16) >= 8 else char
+        for char, hash_char in zip(hex_address, address_hash)
+    )
+
+def contract_address_bytes(sender: bytes, nonce: int) -> bytes:
+    nonce_rlp = encode_nonce(nonce)
+    header = bytes((0xc0 + _SENDER_PAYLOAD_LENGTH + len(nonce_rlp),))
+    return keccak(header + _SENDER_PREFIX + sender + nonce_rlp)[12:]
+
+def predict_contract_address(sender: Union[str, bytes], nonce: int, checksum: bool = True) -> str:
+    address = contract_address_bytes(sender_to_bytes(sender), nonce)
+    return to_checksum_address(address) if checksum else "0x" + address.hex()
+
+def iter_contract_address_bytes(sender: Union[str, bytes], nonce_start: int,
+                                count: int) -> Iterator[bytes]:
+    sender_rlp = _SENDER_PREFIX + sender_to_bytes(sender)
+    for nonce in range(nonce_start, nonce_start + count):
+        nonce_rlp = encode_nonce(nonce)
+        yield keccak(bytes((0xc0 + _SENDER_PAYLOAD_LENGTH + len(nonce_rlp),)) + sender_rlp + nonce_rlp)[12:]
+
+def iter_contract_addresses(sender: Union[str, bytes], nonce_start: int, count: int,
+                            checksum: bool = True) -> Iterator[str]:
+    for address in iter_contract_address_bytes(sender, nonce_start, count):
+        yield to_checksum_address(address) if checksum else "0x" + address.hex()
+
+def predict_contract_addresses(sender: Union[str, bytes], nonce_start: int, count: int,
+                               checksum: bool = True) -> List[str]:
+    return list(iter_contract_addresses(sender, nonce_start, count, checksum))
+
+def to_bytes32(value: Union[str, bytes, int], name: str) -> bytes:
+    if isinstance(value, int):
+        return value.to_bytes(32, "big")
+    if isinstance(value, str):
+        value = bytes.fromhex(value[2:] if value[:2] in ("0x", "0X") else value)
+    if len(value) != 32:
+        raise ValueError(f"{name} must be 32 bytes, got {len(value)} bytes")
+    return value
+
+def init_code_hash(init_code: Union[str, bytes]) -> bytes:
+    if isinstance(init_code, str):
+        init_code = bytes.fromhex(init_code[2:] if init_code[:2] in ("0x", "0X") else init_code)
+    return keccak(init_code)
+
+def create2_address_bytes(deployer: bytes, salt: bytes, code_hash: bytes) -> bytes:
+    return keccak(b"\xff" + deployer + salt + code_hash)[12:]
+
+def predict_create2_address(deployer: Union[str, bytes], salt: Union[str, bytes, int],
+                            code_hash: Union[str, bytes], checksum: bool = True) -> str:
+    address = create2_address_bytes(
+        sender_to_bytes(deployer), to_bytes32(salt, "Salt"), to_bytes32(code_hash, "Init code hash")
+    )
+    return to_checksum_address(address) if checksum else "0x" + address.hex()
+
+def predict_create2_addresses(deployer: Union[str, bytes], salts: Iterable[Union[str, bytes, int]],
+                              code_hash: Union[str, bytes], checksum: bool = True) -> List[str]:
+    # The 0xff marker, deployer and init code hash are fixed; only the salt varies.
+    prefix = b"\xff" + sender_to_bytes(deployer)
+    code_hash = to_bytes32(code_hash, "Init code hash")
+    addresses = []
+    for salt in salts:
+        address = keccak(prefix + to_bytes32(salt, "Salt") + code_hash)[12:]
+        addresses.append(to_checksum_address(address) if checksum else "0x" + address.hex())
+    return addresses
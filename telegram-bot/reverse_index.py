@@ -0,0 +1,133 @@
+import logging
+import os
+import threading
+from typing import Dict, Iterable, Optional, Set, Tuple, Union
+
+from prediction import iter_contract_address_bytes, sender_to_bytes, to_checksum_address
+
+logger = logging.getLogger(__name__)
+
+# On-disk record: predicted address (20 bytes) + sender (20 bytes) + nonce (8 bytes, big-endian)
+_RECORD_SIZE = 48
+_PAGE_SIZE = 1000
+
+# Maps predicted CREATE addresses back to the (sender, nonce) that deploys them.
+# Every sender is expanded for nonces 0..horizon-1. When `path` is set the index is
+# loaded from that file by `load` and new entries are appended to it. At most
+# `max_entries` addresses are indexed (roughly 200 bytes of memory each); a
+# sender that would go past that is refused, which bounds both memory and the
+# file. Only senders from persisted rows should be added. `ready` is set once
+# the startup build has finished; lookups before that may miss.
+class ReverseIndex:
+    def __init__(self, horizon: int, path: Optional[str] = None, max_entries: Optional[int] = None):
+        self.horizon = horizon
+        self.path = path
+        self.max_entries = max_entries
+        self.refused = 0
+        self.ready = threading.Event()
+        self._entries: Dict[bytes, Tuple[bytes, int]] = {}
+        self._horizons: Dict[bytes, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, sender: Union[str, bytes]) -> bool:
+        return sender_to_bytes(sender) in self._horizons
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            data = f.read()
+        usable = len(data) - len(data) % _RECORD_SIZE
+        if self.max_entries is not None:
+            usable = min(usable, self.max_entries * _RECORD_SIZE)
+        with self._lock:
+            for offset in range(0, usable, _RECORD_SIZE):
+                address = data[offset:offset + 20]
+                sender = data[offset + 20:offset + 40]
+                nonce = int.from_bytes(data[offset + 40:offset + 48], "big")
+                self._entries[address] = (sender, nonce)
+                if nonce >= self._horizons.get(sender, 0):
+                    self._horizons[sender] = nonce + 1
+        logger.info(f"Loaded {len(self._entries)} reverse index entries "
+                    f"for {len(self._horizons)} senders from {self.path}")
+
+    def add_sender(self, sender: Union[str, bytes], horizon: Optional[int] = None) -> int:
+        sender_bytes = sender_to_bytes(sender)
+        horizon = self.horizon if horizon is None else horizon
+        with self._lock:
+            start = self._horizons.get(sender_bytes, 0)
+            if start >= horizon:
+                return 0
+            if self.max_entries is not None and len(self._entries) + horizon - start > self.max_entries:
+                self.refused += 1
+                if self.refused == 1:
+                    logger.warning(f"Reverse index is full ({self.max_entries} entries); refusing new senders")
+                return 0
+        # The keccaks run outside the lock; entries are only added if no other
+        # thread extended this sender meanwhile
+        computed = list(enumerate(iter_contract_address_bytes(sender_bytes, start, horizon - start), start))
+        with self._lock:
+            if self._horizons.get(sender_bytes, 0) != start:
+                return 0
+            for nonce, address in computed:
+                self._entries[address] = (sender_bytes, nonce)
+            self._horizons[sender_bytes] = horizon
+            if self.path:
+                with open(self.path, "ab") as f:
+                    f.write(b"".join(address + sender_bytes + nonce.to_bytes(8, "big") for nonce, address in computed))
+        return len(computed)
+
+    def add_senders(self, senders: Iterable[Union[str, bytes]]) -> int:
+        added = 0
+        for sender in senders:
+            try:
+                added += self.add_sender(sender)
+            except ValueError as e:
+                logger.warning(f"Skipping invalid sender {sender!r}: {e}")
+        return added
+
+    def lookup(self, address: Union[str, bytes]) -> Optional[Tuple[str, int]]:
+        entry = self._entries.get(sender_to_bytes(address))
+        if entry is None:
+            return None
+        sender, nonce = entry
+        return to_checksum_address(sender), nonce
+
+def fetch_known_senders(client) -> Set[str]:
+    senders: Set[str] = set()
+    for table, column in (("watchlist", "sender_address"), ("predictions", "contract_address")):
+        start = 0
+        while True:
+            rows = (client.table(table)
+                    .select(column)
+                    .range(start, start + _PAGE_SIZE - 1)
+                    .execute().data)
+            senders.update(row[column].lower() for row in rows if row.get(column))
+            if len(rows) < _PAGE_SIZE:
+                break
+            start += _PAGE_SIZE
+    return senders
+
+def build_reverse_index(client, horizon: int, path: Optional[str] = None,
+                        max_entries: Optional[int] = None) -> ReverseIndex:
+    # Returns at once; the file and the known senders are loaded on a
+    # background thread and `ready` is set when done
+    index = ReverseIndex(horizon, path, max_entries)
+
+    def build() -> None:
+        try:
+            index.load()
+            senders = fetch_known_senders(client)
+            added = index.add_senders(senders)
+            logger.info(f"Reverse index ready: {len(index)} entries for {len(senders)} senders "
+                        f"({added} computed, horizon {horizon})")
+        except Exception as e:
+            logger.error(f"Error building reverse index: {e}")
+        finally:
+            index.ready.set()
+
+    threading.Thread(target=build, name="reverse-index-build", daemon=True).start()
+    return index
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+# Caches per-address RPC results for the current block. State lookups (nonce,
+# balance, ...) are dropped as soon as a newer block number is observed, and the
+# block number itself is refreshed at most once per `block_interval` seconds.
+# Pure results that never change (e.g. a prediction for an explicit nonce) live
+# in a bounded LRU instead. On an event loop, pass a coroutine function as
+# `get_block_number` and use `ablock_number` / `aget` with coroutine fetches.
+class BlockAwareCache:
+    def __init__(self, get_block_number: Callable[[], int], network: str,
+                 block_interval: float = 1.0, lru_size: int = 10_000):
+        self.get_block_number = get_block_number
+        self.network = network
+        self.block_interval = block_interval
+        self.lru_size = lru_size
+        self._block_number = None
+        self._block_checked_at = 0.0
+        self._state: Dict[Tuple[str, str, str], Any] = {}
+        self._lru: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "block": {"hits": 0, "misses": 0},
+            "state": {"hits": 0, "misses": 0, "invalidations": 0},
+            "lru": {"hits": 0, "misses": 0, "evictions": 0},
+        }
+
+    def _fresh_block_number(self, now: float) -> Optional[int]:
+        with self._lock:
+            if self._block_number is not None and now - self._block_checked_at < self.block_interval:
+                self._stats["block"]["hits"] += 1
+                return self._block_number
+        return None
+
+    def block_number(self) -> int:
+        now = time.monotonic()
+        cached = self._fresh_block_number(now)
+        if cached is not None:
+            return cached
+        return self._observe_block(self.get_block_number(), now)
+
+    async def ablock_number(self) -> int:
+        now = time.monotonic()
+        cached = self._fresh_block_number(now)
+        if cached is not None:
+            return cached
+        return self._observe_block(await self.get_block_number(), now)
+
+    def _observe_block(self, block_number: int, now: float) -> int:
+        with self._lock:
+            self._stats["block"]["misses"] += 1
+            self._block_checked_at = now
+            if self._block_number is None or block_number > self._block_number:
+                if self._state:
+                    self._stats["state"]["invalidations"] += 1
+                self._state.clear()
+                self._block_number = block_number
+            return self._block_number
+
+    def _lookup(self, method: str, address: str) -> Tuple[Tuple[str, str, str], bool, Any]:
+        key = (self.network, method, address.lower())
+        with self._lock:
+            if key in self._state:
+                self._stats["state"]["hits"] += 1
+                return key, True, self._state[key]
+            self._stats["state"]["misses"] += 1
+            return key, False, self._block_number
+
+    def _store(self, key: Tuple[str, str, str], block_number: int, value: Any) -> None:
+        with self._lock:
+            # Don't store a value fetched for a block that has since been replaced
+            if self._block_number == block_number:
+                self._state[key] = value
+
+    def get(self, method: str, address: str, fetch: Callable[[], Any]) -> Any:
+        self.block_number()
+        key, hit, value = self._lookup(method, address)
+        if hit:
+            return value
+        block_number, value = value, fetch()
+        self._store(key, block_number, value)
+        return value
+
+    async def aget(self, method: str, address: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        await self.ablock_number()
+        key, hit, value = self._lookup(method, address)
+        if hit:
+            return value
+        block_number, value = value, await fetch()
+        self._store(key, block_number, value)
+        return value
+
+    def memoize(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self._stats["lru"]["hits"] += 1
+                return self._lru[key]
+            self._stats["lru"]["misses"] += 1
+        value = compute()
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+                self._stats["lru"]["evictions"] += 1
+        return value
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "network": self.network,
+                "blockNumber": self._block_number,
+                "stateEntries": len(self._state),
+                "lruEntries": len(self._lru),
+                **{name: dict(counters) for name, counters in self._stats.items()},
+            }
@@ -0,0 +1,268 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from web3._utils.batching import sort_batch_response_by_response_ids
+from web3._utils.encoding import Web3JsonEncoder
+from web3.providers.base import JSONBaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Calls with side effects go to one endpoint once: no hedge, retry or failover
+WRITE_METHODS = {"eth_sendRawTransaction", "eth_sendTransaction", "eth_sign", "eth_signTransaction"}
+
+class EndpointFailure(Exception):
+    pass
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+# One RPC endpoint with its rolling health: the median of its recent
+# latencies (robust to the slow tail that hedging works around), an EWMA of
+# its failure rate, recent latencies per method for the hedge threshold, and
+# the ejection state. Only transport problems (timeouts, refused connections, 429
+# and 5xx responses) count as failures; a JSON-RPC error is a valid answer, even
+# when a node sends it with another 4xx status.
+class Endpoint:
+    def __init__(self, url: str, pool_size: int, timeout: float, window: int):
+        self.url = url
+        # The path usually holds an API key; only the host shows up in logs and stats
+        self.name = urlsplit(url).netloc or url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.window = window
+        self.recent: Deque[float] = deque(maxlen=window)
+        self.error_rate = 0.0
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    def post(self, data: bytes, headers: Dict[str, str]) -> bytes:
+        response = self.session.post(self.url, data=data, headers=headers, timeout=self.timeout)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise EndpointFailure(f"{self.name} answered HTTP {response.status_code}")
+        # Other 4xx bodies usually hold the node's JSON-RPC error (invalid
+        # params, reverted call); web3 decodes and raises it for the caller
+        return response.content
+
+    def p95(self, key: str, min_samples: int) -> Optional[float]:
+        samples = self.latencies.get(key)
+        if not samples or len(samples) < min_samples:
+            return None
+        return _percentile(sorted(samples), 0.95)
+
+    def median(self) -> float:
+        return _percentile(sorted(self.recent), 0.5) if self.recent else 0.0
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        samples = sorted(self.recent)
+        return {
+            "endpoint": self.name,
+            "requests": self.requests,
+            "failures": self.failures,
+            "errorRate": round(self.error_rate, 4),
+            "p50Ms": round(_percentile(samples, 0.5) * 1000, 1) if samples else None,
+            "p95Ms": round(_percentile(samples, 0.95) * 1000, 1) if samples else None,
+            "ejected": self.ejected_until > now,
+        }
+
+# A web3 provider that spreads calls over several endpoints of the same
+# network. Each call goes to the endpoint with the best score (median recent
+# latency, inflated by its recent failure rate). If a read has no answer after that
+# endpoint's p95 latency for the method, a hedged duplicate goes to the next
+# best endpoint and whichever answers first wins. A failed call moves on to
+# the next endpoint. After `eject_after` failures in a row an endpoint is
+# left out for `eject_seconds`, doubling on each repeat up to
+# `max_eject_seconds`; when it comes back it gets traffic again and a success
+# clears its record. Identical reads (method and params) in flight at the same
+# time share one request; the provider is per network, so that is part of the key.
+class MultiEndpointProvider(JSONBaseProvider):
+    def __init__(self, urls: Sequence[str], pool_size: int = 20, timeout: float = 10.0,
+                 hedge: bool = True, hedge_min_delay: float = 0.05, hedge_default_delay: float = 1.0,
+                 min_samples: int = 20, window: int = 200, ewma_alpha: float = 0.1,
+                 eject_after: int = 3, eject_seconds: float = 5.0, max_eject_seconds: float = 60.0,
+                 coalesce: bool = True, **kwargs):
+        super().__init__(**kwargs)
+        if not urls:
+            raise ValueError("MultiEndpointProvider needs at least one endpoint URL")
+        self.endpoints = [Endpoint(url, pool_size, timeout, window) for url in dict.fromkeys(urls)]
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+        self.min_samples = min_samples
+        self.ewma_alpha = ewma_alpha
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self._headers = {"Content-Type": "application/json"}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=pool_size * len(self.endpoints),
+                                        thread_name_prefix="rpc-router")
+        self._stats = {"calls": 0, "hedges": 0, "hedgeWins": 0, "failovers": 0, "ejections": 0}
+        self.coalesce = coalesce
+        self.flights = SingleFlight()
+
+    def __str__(self) -> str:
+        return f"RPC endpoints {', '.join(endpoint.name for endpoint in self.endpoints)}"
+
+    def _ranked(self) -> List[Endpoint]:
+        # Healthy endpoints by score; ejected ones last, soonest back first.
+        # Endpoints without samples yet score 0 so they get tried, and each
+        # recent failure costs a share of the request timeout.
+        now = time.monotonic()
+        with self._lock:
+            healthy = [endpoint for endpoint in self.endpoints if endpoint.ejected_until <= now]
+            ejected = sorted((endpoint for endpoint in self.endpoints if endpoint.ejected_until > now),
+                             key=lambda endpoint: endpoint.ejected_until)
+            healthy.sort(key=lambda endpoint: endpoint.median() * (1 + 10 * endpoint.error_rate)
+                         + endpoint.error_rate * endpoint.timeout)
+        return healthy + ejected
+
+    def _hedge_delay(self, endpoint: Endpoint, key: str) -> float:
+        with self._lock:
+            p95 = endpoint.p95(key, self.min_samples)
+        return self.hedge_default_delay if p95 is None else max(self.hedge_min_delay, p95)
+
+    def _record(self, endpoint: Endpoint, key: str, latency: Optional[float]) -> None:
+        with self._lock:
+            endpoint.requests += 1
+            failed = latency is None
+            endpoint.error_rate += self.ewma_alpha * (float(failed) - endpoint.error_rate)
+            if not failed:
+                endpoint.recent.append(latency)
+                endpoint.latencies.setdefault(key, deque(maxlen=endpoint.window)).append(latency)
+                endpoint.consecutive_failures = 0
+                endpoint.ejections = 0
+                return
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= self.eject_after and endpoint.ejected_until <= time.monotonic():
+                duration = min(self.max_eject_seconds, self.eject_seconds * 2 ** endpoint.ejections)
+                endpoint.ejections += 1
+                endpoint.ejected_until = time.monotonic() + duration
+                # It comes back ranked on latency alone; one more failure ejects it again
+                endpoint.error_rate = 0.0
+                self._stats["ejections"] += 1
+                logger.warning(f"Ejecting RPC endpoint {endpoint.name} for {duration:.0f}s "
+                               f"after {endpoint.consecutive_failures} failures")
+
+    def _post(self, endpoint: Endpoint, key: str, data: bytes) -> bytes:
+        start = time.perf_counter()
+        try:
+            raw = endpoint.post(data, self._headers)
+        except Exception:
+            self._record(endpoint, key, None)
+            raise
+        self._record(endpoint, key, time.perf_counter() - start)
+        return raw
+
+    def _send(self, key: str, data: bytes, hedge: bool, write: bool = False) -> bytes:
+        candidates = self._ranked()
+        if write:
+            # A timed-out write may still have landed, so it is never sent again
+            candidates = candidates[:1]
+            hedge = False
+        elif len(candidates) == 1:
+            # A single endpoint gets one retry instead of a hedge
+            candidates = candidates * 2
+            hedge = False
+        with self._lock:
+            self._stats["calls"] += 1
+
+        pending: Dict[Future, Endpoint] = {}
+        last_error: Optional[Exception] = None
+
+        def launch() -> Future:
+            endpoint = candidates.pop(0)
+            future = self._pool.submit(self._post, endpoint, key, data)
+            pending[future] = endpoint
+            return future
+
+        first = launch()
+        hedged = False
+        timeout = self._hedge_delay(pending[first], key) if hedge else None
+        while pending:
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            timeout = None
+            if not done:
+                # The first endpoint is slower than its p95: hedge to the next one
+                if candidates:
+                    hedged = True
+                    with self._lock:
+                        self._stats["hedges"] += 1
+                    launch()
+                continue
+            for future in done:
+                endpoint = pending.pop(future)
+                try:
+                    raw = future.result()
+                except Exception as e:
+                    last_error = e
+                    logger.debug(f"RPC {key} failed on {endpoint.name}: {e}")
+                    if candidates and not pending:
+                        with self._lock:
+                            self._stats["failovers"] += 1
+                        launch()
+                    continue
+                if hedged and future is not first:
+                    with self._lock:
+                        self._stats["hedgeWins"] += 1
+                return raw
+        raise last_error
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        if method in WRITE_METHODS:
+            return self.decode_rpc_response(self._send(method, self.encode_rpc_request(method, params),
+                                                       False, write=True))
+        if not self.coalesce:
+            return self.decode_rpc_response(self._send(method, self.encode_rpc_request(method, params), self.hedge))
+        key = (method, json.dumps(params, cls=Web3JsonEncoder, sort_keys=True))
+        # Decoded per caller, so nobody shares a response object web3 may format in place
+        raw = self.flights.call(key, lambda: self._send(method, self.encode_rpc_request(method, params), self.hedge))
+        return self.decode_rpc_response(raw)
+
+    def make_batch_request(self, batch_requests: List[Tuple[RPCEndpoint, Any]]) -> List[RPCResponse] | RPCResponse:
+        write = any(method in WRITE_METHODS for method, _ in batch_requests)
+        response = self.decode_rpc_response(self._send("batch", self.encode_batch_rpc_request(batch_requests),
+                                                       self.hedge and not write, write=write))
+        if not isinstance(response, list):
+            return response
+        return sort_batch_response_by_response_ids(response)
+
+    def request_each(self, method: str, params: Any = None) -> Dict[str, Any]:
+        # Sends the call to every endpoint directly, bypassing routing and the
+        # health record; results are keyed by endpoint name, failures are the
+        # exception raised
+        results: Dict[str, Any] = {}
+        for endpoint in self.endpoints:
+            try:
+                response = self.decode_rpc_response(endpoint.post(self.encode_rpc_request(method, params), self._headers))
+                results[endpoint.name] = response["result"] if "result" in response else ValueError(response.get("error"))
+            except Exception as e:
+                results[endpoint.name] = e
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                **self._stats,
+                "coalesced": self.flights.stats(),
+                "endpoints": [endpoint.stats(now) for endpoint in self.endpoints],
+            }
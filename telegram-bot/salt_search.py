@@ -0,0 +1,151 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Union
+
+from eth_hash.auto import keccak
+
+from prediction import to_bytes32, sender_to_bytes, to_checksum_address
+
+logger = logging.getLogger(__name__)
+
+# Attempts between progress updates / cancellation checks in each worker
+_CHUNK_SIZE = 20_000
+# 16**8 attempts is already about an hour on a few cores
+MAX_PATTERN_LENGTH = 8
+
+# Each search keeps its cores busy, so only one may run per process at a time
+_active_lock = threading.Lock()
+_active: Optional["SaltSearch"] = None
+
+# Workers are spawned rather than forked: the bot and the Flask app run
+# threads (RPC pools, write-behind queues) whose locks a fork would copy mid-use
+_mp = multiprocessing.get_context("spawn")
+
+class SearchBusy(Exception):
+    pass
+
+def _grind(deployer: bytes, code_hash: bytes, prefix: str, suffix: str, counter,
+           stop_event, results) -> None:
+    # Each worker owns a random 24-byte salt prefix and walks an 8-byte counter,
+    # so workers never overlap.
+    head = b"\xff" + deployer
+    salt_base = os.urandom(24)
+    nonce = 0
+    while not stop_event.is_set():
+        for _ in range(_CHUNK_SIZE):
+            salt = salt_base + nonce.to_bytes(8, "big")
+            address = keccak(head + salt + code_hash)[12:].hex()
+            nonce += 1
+            if address.startswith(prefix) and address.endswith(suffix):
+                results.put(salt)
+                stop_event.set()
+                break
+        with counter.get_lock():
+            counter.value += _CHUNK_SIZE
+
+class SaltSearch:
+    def __init__(self, deployer: Union[str, bytes], code_hash: Union[str, bytes],
+                 prefix: str = "", suffix: str = "", processes: Optional[int] = None):
+        prefix = prefix.lower().removeprefix("0x")
+        suffix = suffix.lower()
+        if not prefix and not suffix:
+            raise ValueError("A prefix or suffix is required")
+        if len(prefix) + len(suffix) > MAX_PATTERN_LENGTH:
+            raise ValueError(f"Prefix and suffix may total at most {MAX_PATTERN_LENGTH} hex characters")
+        if any(char not in "0123456789abcdef" for char in prefix + suffix):
+            raise ValueError("Prefix and suffix must be hex characters")
+
+        self.id = uuid.uuid4().hex
+        self.deployer = sender_to_bytes(deployer)
+        self.code_hash = to_bytes32(code_hash, "Init code hash")
+        self.prefix = prefix
+        self.suffix = suffix
+        cores = os.cpu_count() or 1
+        self.processes = max(1, min(processes or cores, cores))
+        self.salt: Optional[bytes] = None
+        self.cancelled = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        self._counter = _mp.Value("Q", 0)
+        self._stop_event = _mp.Event()
+        self._results = _mp.Queue()
+        self._workers = []
+
+    @property
+    def expected_attempts(self) -> int:
+        return 16 ** (len(self.prefix) + len(self.suffix))
+
+    @property
+    def running(self) -> bool:
+        # Unlike `done` this never blocks: workers exit on their own once one finds a salt
+        return any(worker.is_alive() for worker in self._workers)
+
+    def start(self) -> "SaltSearch":
+        global _active
+        with _active_lock:
+            if _active is not None and _active.running:
+                raise SearchBusy("A salt search is already running")
+            _active = self
+            self.started_at = time.monotonic()
+            for _ in range(self.processes):
+                worker = _mp.Process(
+                    target=_grind,
+                    args=(self.deployer, self.code_hash, self.prefix, self.suffix,
+                          self._counter, self._stop_event, self._results),
+                    daemon=True,
+                )
+                worker.start()
+                self._workers.append(worker)
+        logger.info(f"Started salt search {self.id} on {self.processes} processes "
+                    f"(prefix={self.prefix!r}, suffix={self.suffix!r})")
+        return self
+
+    def _collect(self) -> None:
+        if self.finished_at is not None:
+            return
+        if self.salt is None and not self._results.empty():
+            self.salt = self._results.get()
+        if self.salt is not None or self.cancelled:
+            self._stop_event.set()
+            for worker in self._workers:
+                worker.join(timeout=1)
+                if worker.is_alive():
+                    worker.terminate()
+            self.finished_at = time.monotonic()
+
+    @property
+    def done(self) -> bool:
+        self._collect()
+        return self.finished_at is not None
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        self._collect()
+        logger.info(f"Cancelled salt search {self.id}")
+
+    def progress(self) -> Dict:
+        self._collect()
+        attempts = self._counter.value
+        end = self.finished_at or time.monotonic()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        result = {
+            "id": self.id,
+            "state": ("found" if self.salt is not None
+                      else "cancelled" if self.cancelled
+                      else "running"),
+            "attempts": attempts,
+            "expectedAttempts": self.expected_attempts,
+            "elapsed": round(elapsed, 2),
+            "hashRate": round(attempts / elapsed) if elapsed else 0,
+        }
+        if self.salt is not None:
+            result["salt"] = "0x" + self.salt.hex()
+            result["address"] = to_checksum_address(
+                keccak(b"\xff" + self.deployer + self.salt + self.code_hash)[12:]
+            )
+        return result
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+# Coalesces identical calls that are in flight at the same time: the first
+# caller for a key runs the call and everyone else arriving before it
+# finishes gets the same result (or exception). Nothing is cached; once the
+# call returns, the next caller runs it again. `call` is for threads (the web3
+# provider, Flask request threads), `acall` for coroutines on one event loop.
+# A cancelled coroutine only stops waiting; the shared call keeps running for
+# the others.
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "executed": 0, "coalesced": 0, "errors": 0}
+
+    def call(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self._stats["calls"] += 1
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self._stats["executed"] += 1
+            else:
+                self._stats["coalesced"] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._calls[key]
+                self._stats["errors"] += 1
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._calls[key]
+        future.set_result(result)
+        return result
+
+    async def acall(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        with self._lock:
+            self._stats["calls"] += 1
+            task = self._tasks.get(key)
+            if task is None:
+                task = self._tasks[key] = asyncio.ensure_future(factory())
+                task.add_done_callback(lambda done: self._finish(key, done))
+                self._stats["executed"] += 1
+            else:
+                self._stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Future) -> None:
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+            if not task.cancelled() and task.exception() is not None:
+                self._stats["errors"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "inFlight": len(self._calls) + len(self._tasks),
+                "savedRate": round(self._stats["coalesced"] / self._stats["calls"], 4) if self._stats["calls"] else None,
+            }
+
+# Shared by the bot's coroutines; keys carry the network
+rpc_flights = SingleFlight()
@@ -0,0 +1,60 @@
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+# Per-user subscription rows kept for `ttl` seconds in a bounded LRU, including
+# users without a subscription. Writes to a user's subscription must call
+# `invalidate`, which also bumps the user's generation: a lookup captures
+# `generation` before fetching and passes it to `put`, so a row read before
+# the write is not cached after it. Cached rows carry the expiry as a precomputed timestamp
+# (`expires_at`) so checking it doesn't parse the ISO date every time.
+class SubscriptionCache:
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, Tuple[float, Optional[Dict]]]" = OrderedDict()
+        self._generations: Dict[int, int] = {}
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0, "staleSkips": 0}
+
+    def get(self, telegram_id: int) -> Tuple[bool, Optional[Dict]]:
+        entry = self._entries.get(telegram_id)
+        if entry is None or entry[0] <= time.monotonic():
+            self._stats["misses"] += 1
+            return False, None
+        self._entries.move_to_end(telegram_id)
+        self._stats["hits"] += 1
+        return True, entry[1]
+
+    def generation(self, telegram_id: int) -> int:
+        return self._generations.get(telegram_id, 0)
+
+    def put(self, telegram_id: int, subscription: Optional[Dict],
+            generation: Optional[int] = None) -> Optional[Dict]:
+        if subscription is not None:
+            subscription = dict(subscription)
+            expiry_date = subscription.get("expiry_date")
+            subscription["expires_at"] = datetime.fromisoformat(expiry_date).timestamp() if expiry_date else None
+        if generation is not None and generation != self.generation(telegram_id):
+            # Invalidated while this row was being fetched; it may be stale
+            self._stats["staleSkips"] += 1
+            return subscription
+        self._entries[telegram_id] = (time.monotonic() + self.ttl, subscription)
+        self._entries.move_to_end(telegram_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+        return subscription
+
+    def invalidate(self, telegram_id: int) -> None:
+        self._generations[telegram_id] = self.generation(telegram_id) + 1
+        if self._entries.pop(telegram_id, None) is not None:
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> Dict:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "entries": len(self._entries),
+            **self._stats,
+            "hitRate": round(self._stats["hits"] / lookups, 4) if lookups else None,
+        }
@@ -0,0 +1,39 @@
+import os
+import socket
+import sys
+import time
+
+import pytest
+
+# The bot's modules import each other by top-level name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_rpc_router import StubNode, run_stub_nodes
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_for_port(port: int, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.02)
+
+# Starts one local stub node per delay, each on a free port, e.g.
+# `fast, slow = stub_nodes(0.001, 0.05)`
+@pytest.fixture
+def stub_nodes():
+    def start(*delays: float, tail: float = 0.0, tail_delay: float = 0.0):
+        nodes = [StubNode(free_port(), delay, tail, tail_delay) for delay in delays]
+        run_stub_nodes(nodes)
+        for node in nodes:
+            wait_for_port(node.port)
+        return nodes
+    return start
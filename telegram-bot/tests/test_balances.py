@@ -0,0 +1,53 @@
+import asyncio
+from types import SimpleNamespace
+
+import balance_engine
+from balance_engine import ETH
+from handlers import bot_handlers
+
+HOLDER = "0x" + "11" * 20
+REVERTED = "0x" + "22" * 20
+EMPTY = "0x" + "33" * 20
+
+class FakeEngine:
+    def token_info(self, tokens):
+        return {REVERTED: {"symbol": "BAD", "decimals": 6}, EMPTY: {"symbol": "NIL", "decimals": 6}}
+
+    def balances(self, holders, tokens):
+        return 100, {holder: {ETH: 10 ** 18, REVERTED: None, EMPTY: 0} for holder in holders}
+
+class FakeDB:
+    async def get_watchlist(self, telegram_id):
+        return [{"sender_address": HOLDER, "predicted_address": HOLDER}]
+
+class FakeQuery:
+    def __init__(self):
+        self.texts = []
+        self.message = SimpleNamespace(reply_text=self.edit_message_text)
+
+    async def edit_message_text(self, text, **kwargs):
+        self.texts.append(text)
+
+def test_reverted_and_zero_token_balances_are_both_shown(monkeypatch):
+    monkeypatch.setattr(bot_handlers, "get_balance_engine", lambda rpc_url: FakeEngine())
+    query = FakeQuery()
+    asyncio.run(bot_handlers._handle_balance(query, SimpleNamespace(user_data={}), FakeDB(), 1))
+    text, = query.texts
+    assert "BAD: `unavailable`" in text
+    assert "NIL: `0`" in text
+
+def test_engine_block_number_is_cached(monkeypatch):
+    calls = []
+
+    class Eth:
+        @property
+        def block_number(self):
+            calls.append(1)
+            return 100
+
+    w3 = SimpleNamespace(eth=Eth())
+    monkeypatch.setattr(balance_engine, "get_web3", lambda rpc_url: w3)
+    monkeypatch.setattr(balance_engine, "_engines", {})
+    engine = balance_engine.get_balance_engine("http://node")
+    assert [engine.get_block_number() for _ in range(5)] == [100] * 5
+    assert len(calls) == 1
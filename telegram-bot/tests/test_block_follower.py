@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+
+from block_follower import BlockFollower
+from config import config
+
+async def wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("condition not met")
+        await asyncio.sleep(0.01)
+
+@pytest.fixture(autouse=True)
+def fast_reconnect(monkeypatch):
+    monkeypatch.setattr(config, "WS_RECONNECT_DELAY", 0.1)
+
+def test_pushed_head_wakes_the_follower(stub_nodes):
+    node, = stub_nodes(0.001)
+
+    async def main():
+        # Polling alone would take 30 seconds to see the new block
+        follower = BlockFollower(node.url, node.ws_url, poll_interval=30)
+        watcher = await follower.register()
+        await wait_until(lambda: follower.ws_connected)
+        for number in (101, 102):
+            node.head = number
+            start = time.perf_counter()
+            node.push_head()
+            block = await asyncio.wait_for(watcher.queue.get(), 2)
+            assert block["number"] == number
+            assert time.perf_counter() - start < 1
+        follower.unregister(watcher)
+
+    asyncio.run(main())
+
+def test_falls_back_to_polling_when_the_socket_drops(stub_nodes):
+    node, = stub_nodes(0.001)
+
+    async def main():
+        follower = BlockFollower(node.url, node.ws_url, poll_interval=0.1)
+        watcher = await follower.register()
+        await wait_until(lambda: follower.ws_connected)
+        node.drop_sockets()
+        await wait_until(lambda: not follower.ws_connected)
+
+        # No push: only polling can find this block
+        node.head = 101
+        block = await asyncio.wait_for(watcher.queue.get(), 2)
+        assert block["number"] == 101
+
+        # Once the node accepts sockets again the subscription comes back
+        node.ws_down = False
+        await wait_until(lambda: follower.ws_connected)
+        node.head = 102
+        node.push_head()
+        assert (await asyncio.wait_for(watcher.queue.get(), 2))["number"] == 102
+        follower.unregister(watcher)
+
+    asyncio.run(main())
+
+def test_polls_without_a_websocket_url(stub_nodes):
+    node, = stub_nodes(0.001)
+
+    async def main():
+        follower = BlockFollower(node.url, poll_interval=0.05)
+        watcher = await follower.register()
+        node.head = 103
+        numbers = [(await asyncio.wait_for(watcher.queue.get(), 2))["number"] for _ in range(3)]
+        assert numbers == [101, 102, 103]
+        assert not follower.ws_connected
+        follower.unregister(watcher)
+
+    asyncio.run(main())
+
+def test_retries_a_pushed_head_the_node_cannot_serve_yet(stub_nodes):
+    node, = stub_nodes(0.001)
+
+    async def main():
+        # Only the polling interval, not WS_HEAD_TIMEOUT, may pass before the retry
+        follower = BlockFollower(node.url, node.ws_url, poll_interval=0.1)
+        watcher = await follower.register()
+        await wait_until(lambda: follower.ws_connected)
+        node.lag = 1
+        node.head = 101
+        node.push_head()
+        await asyncio.sleep(0.2)
+        assert watcher.queue.empty()
+        assert follower.current_block == 100
+
+        node.lag = 0
+        block = await asyncio.wait_for(watcher.queue.get(), 2)
+        assert block["number"] == 101
+        follower.unregister(watcher)
+
+    asyncio.run(main())
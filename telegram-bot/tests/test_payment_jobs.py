@@ -0,0 +1,67 @@
+import asyncio
+from types import SimpleNamespace
+
+from constants import TransactionState
+from database import AsyncSupabaseDB
+from payment_jobs import PaymentJobScheduler
+
+class Query:
+    def __init__(self, action, row=None):
+        self.action = action
+        self.row = row
+
+    def __getattr__(self, name):
+        # eq / select chain without changing the query
+        return lambda *args, **kwargs: self
+
+class Table:
+    def select(self, *columns):
+        return Query("select")
+
+    def upsert(self, row, **kwargs):
+        return Query("upsert", row)
+
+    def update(self, fields):
+        return Query("update", fields)
+
+class Client:
+    def table(self, name):
+        return Table()
+
+class Bot:
+    def __init__(self):
+        self.messages = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.messages.append(text)
+
+def test_resumed_job_does_not_apply_its_payment_twice():
+    async def main():
+        db = AsyncSupabaseDB(Client(), None, 10)
+        rows = []
+
+        async def execute(query):
+            if query.action == "upsert":
+                rows.append(query.row)
+            return SimpleNamespace(data=rows[-1:] if query.action == "select" else [])
+        db._execute = execute
+
+        scheduler = PaymentJobScheduler(db)
+        scheduler.bot = Bot()
+        job = {"id": 1, "telegram_id": 7, "chat_id": 7, "kind": "subscribe"}
+        monitor = SimpleNamespace(confirmed_tx_hash="0x" + "ab" * 32)
+        # The second run is the job resumed after a crash before its state was saved
+        await scheduler._finish(dict(job), TransactionState.FOUND_CORRECT_AMOUNT, monitor)
+        await asyncio.sleep(0.01)
+        await scheduler._finish(dict(job), TransactionState.FOUND_CORRECT_AMOUNT, monitor)
+
+        assert len(rows) == 1
+        expiry = rows[0]["expiry_date"]
+        assert all(expiry in message for message in scheduler.bot.messages)
+
+        # A new payment extends it again
+        monitor.confirmed_tx_hash = "0x" + "cd" * 32
+        await scheduler._finish(dict(job), TransactionState.FOUND_CORRECT_AMOUNT, monitor)
+        assert len(rows) == 2
+
+    asyncio.run(main())
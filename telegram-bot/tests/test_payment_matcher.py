@@ -0,0 +1,80 @@
+import asyncio
+
+from block_follower import BlockWatcher
+from payment_matcher import PaymentMatcher
+
+SENDER = "0x" + "01" * 20
+RECIPIENT = "0x" + "ab" * 20
+
+class Follower:
+    def __init__(self, current_block: int):
+        self.current_block = current_block
+        self.watchers = 0
+
+    async def register(self) -> BlockWatcher:
+        self.watchers += 1
+        return BlockWatcher(self.watchers, self.current_block)
+
+    def unregister(self, watcher: BlockWatcher) -> None:
+        watcher.close()
+
+def block(number: int) -> dict:
+    tx = {"from": SENDER, "to": RECIPIENT, "value": 1, "hash": bytes([number])}
+    return {"number": number, "transactions": [tx]}
+
+def drain(session) -> list:
+    numbers = []
+    while not session.queue.empty():
+        numbers.append(session.queue.get_nowait().block["number"])
+    return numbers
+
+def test_session_registered_while_a_block_is_in_flight_skips_it():
+    async def main():
+        follower = Follower(10)
+        matcher = PaymentMatcher(follower, RECIPIENT)
+        matching = asyncio.Event()
+        release = asyncio.Event()
+        match_block = matcher._match
+
+        async def slow_match(block):
+            matching.set()
+            await release.wait()
+            return await match_block(block)
+        matcher._match = slow_match
+
+        first = await matcher.register(SENDER)
+        # The follower has handed block 11 over and moved on before the second session registers
+        matcher._watcher.queue.put_nowait(block(11))
+        await matching.wait()
+        follower.current_block = 11
+        second = await matcher.register(SENDER)
+        release.set()
+        await asyncio.sleep(0.01)
+
+        assert drain(first) == [11]
+        assert drain(second) == []
+
+        matcher._watcher.queue.put_nowait(block(12))
+        await asyncio.sleep(0.01)
+        assert drain(first) == [12]
+        assert drain(second) == [12]
+
+    asyncio.run(main())
+
+def test_blocks_queued_for_a_dropped_watcher_do_not_reach_new_sessions():
+    async def main():
+        follower = Follower(10)
+        matcher = PaymentMatcher(follower, RECIPIENT)
+        first = await matcher.register(SENDER)
+        old = matcher._watcher
+        for number in (9, 10, 11):
+            old.queue.put_nowait(block(number))
+        matcher.unregister(first)
+
+        follower.current_block = 12
+        second = await matcher.register(SENDER)
+        matcher._watcher.queue.put_nowait(block(13))
+        await asyncio.sleep(0.01)
+        assert drain(second) == [13]
+
+    asyncio.run(main())
@@ -0,0 +1,35 @@
+import threading
+
+from reverse_index import ReverseIndex, build_reverse_index
+
+SENDERS = ["0x" + f"{i:02x}" * 20 for i in range(1, 5)]
+
+def test_caps_the_total_number_of_entries(tmp_path):
+    path = str(tmp_path / "index.bin")
+    index = ReverseIndex(10, path, max_entries=25)
+    assert index.add_senders(SENDERS) == 20
+    assert len(index) == 20 and index.refused == 2
+
+    # Reloading the file respects the cap too
+    smaller = ReverseIndex(10, path, max_entries=15)
+    smaller.load()
+    assert len(smaller) == 15
+
+def test_builds_in_the_background():
+    release = threading.Event()
+
+    class SlowClient:
+        def table(self, name):
+            release.wait(5)
+            rows = [{"sender_address": SENDERS[0]}] if name == "watchlist" else []
+            return type("Query", (), {
+                "select": lambda query, column: query,
+                "range": lambda query, start, end: query,
+                "execute": lambda query: type("Response", (), {"data": rows})(),
+            })()
+
+    index = build_reverse_index(SlowClient(), 5)
+    assert not index.ready.is_set()
+    release.set()
+    assert index.ready.wait(5)
+    assert SENDERS[0] in index and len(index) == 5
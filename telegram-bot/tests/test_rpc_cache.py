@@ -0,0 +1,26 @@
+import asyncio
+
+from rpc_cache import BlockAwareCache
+
+def test_async_lookups_are_cached_until_a_new_block():
+    head = [100]
+    fetches = []
+
+    async def block_number():
+        return head[0]
+
+    async def fetch():
+        fetches.append(head[0])
+        return len(fetches)
+
+    cache = BlockAwareCache(block_number, "testnet", block_interval=0)
+
+    async def run():
+        first = await cache.aget("eth_getBalance", "0xAB", fetch)
+        assert await cache.aget("eth_getBalance", "0xab", fetch) == first
+        head[0] = 101
+        assert await cache.aget("eth_getBalance", "0xab", fetch) != first
+
+    asyncio.run(run())
+    assert fetches == [100, 101]
+    assert cache.stats()["blockNumber"] == 101
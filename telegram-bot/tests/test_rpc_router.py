@@ -0,0 +1,107 @@
+import time
+
+import pytest
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+
+from bench_rpc_router import run_reads
+from rpc_router import EndpointFailure, MultiEndpointProvider
+
+def provider(nodes, **kwargs) -> MultiEndpointProvider:
+    kwargs.setdefault("hedge", False)
+    return MultiEndpointProvider([node.url for node in nodes], pool_size=8, timeout=5, **kwargs)
+
+def requests_per_endpoint(rpc: MultiEndpointProvider):
+    return [endpoint["requests"] for endpoint in rpc.stats()["endpoints"]]
+
+def test_routes_reads_to_the_fastest_endpoint(stub_nodes):
+    fast, slow = stub_nodes(0.001, 0.05)
+    rpc = provider([slow, fast])
+    result = run_reads(Web3(rpc), 60, 1)
+    assert result["errors"] == 0
+    slow_requests, fast_requests = requests_per_endpoint(rpc)
+    assert fast_requests > 5 * slow_requests
+
+def test_fails_over_when_an_endpoint_goes_down(stub_nodes):
+    down, up = stub_nodes(0.001, 0.001)
+    down.down = True
+    rpc = provider([down, up])
+    result = run_reads(Web3(rpc), 50, 5)
+    assert result["errors"] == 0
+    assert rpc.stats()["failovers"] >= 1
+
+def test_single_endpoint_read_is_retried_once(stub_nodes):
+    node, = stub_nodes(0.001)
+    node.down = True
+    rpc = provider([node], eject_after=10)
+    with pytest.raises(EndpointFailure):
+        rpc.make_request("eth_getBalance", ["0x" + "11" * 20, "latest"])
+    assert requests_per_endpoint(rpc) == [2]
+
+def test_ejects_a_failing_endpoint_and_takes_it_back(stub_nodes):
+    flaky, steady = stub_nodes(0.001, 0.001)
+    flaky.down = True
+    rpc = provider([flaky, steady], eject_after=1, eject_seconds=0.3)
+    w3 = Web3(rpc)
+
+    assert run_reads(w3, 20, 1)["errors"] == 0
+    stats = rpc.stats()
+    assert stats["ejections"] == 1
+    assert stats["endpoints"][0]["ejected"]
+    # Ejected endpoints are only tried after the healthy ones
+    assert requests_per_endpoint(rpc)[0] == 1
+
+    flaky.down = False
+    time.sleep(0.4)
+    assert run_reads(w3, 20, 1)["errors"] == 0
+    stats = rpc.stats()
+    assert not stats["endpoints"][0]["ejected"]
+    assert stats["endpoints"][0]["requests"] > 1
+
+def test_hedges_a_read_stuck_on_a_slow_endpoint(stub_nodes):
+    slow, fast = stub_nodes(1.0, 0.001)
+    rpc = provider([slow, fast], hedge=True, hedge_default_delay=0.05)
+    start = time.perf_counter()
+    assert Web3(rpc).eth.block_number == 100
+    assert time.perf_counter() - start < 0.5
+    stats = rpc.stats()
+    assert stats["hedges"] == 1 and stats["hedgeWins"] == 1
+
+def test_write_is_sent_once_to_a_single_endpoint(stub_nodes):
+    node, = stub_nodes(0.001)
+    node.down = True
+    rpc = provider([node])
+    with pytest.raises(EndpointFailure):
+        rpc.make_request("eth_sendRawTransaction", ["0x00"])
+    assert requests_per_endpoint(rpc) == [1]
+
+def test_write_is_never_hedged(stub_nodes):
+    slow, fast = stub_nodes(0.2, 0.001)
+    rpc = provider([slow, fast], hedge=True, hedge_default_delay=0.01)
+    rpc.make_request("eth_sendRawTransaction", ["0x00"])
+    assert requests_per_endpoint(rpc) == [1, 0]
+    assert rpc.stats()["hedges"] == 0
+
+def test_batch_with_a_write_is_never_failed_over(stub_nodes):
+    down, up = stub_nodes(0.001, 0.001)
+    down.down = True
+    rpc = provider([down, up])
+    with pytest.raises(EndpointFailure):
+        rpc.make_batch_request([("eth_sendRawTransaction", ["0x00"]), ("eth_blockNumber", [])])
+    assert requests_per_endpoint(rpc) == [1, 0]
+    assert rpc.stats()["failovers"] == 0
+
+def test_json_rpc_error_with_http_400_reaches_the_caller(stub_nodes):
+    node, other = stub_nodes(0.001, 0.001)
+    rpc = provider([node, other], eject_after=1)
+    call = {"to": "0x" + "11" * 20, "data": "0x"}
+    for _ in range(3):
+        response = rpc.make_request("eth_call", [call, "latest"])
+        assert response["error"]["message"] == "execution reverted"
+    # Answered once each: no retry
+    assert sum(requests_per_endpoint(rpc)) == 3
+    with pytest.raises(ContractLogicError):
+        Web3(rpc).eth.call(call)
+    stats = rpc.stats()
+    assert stats["ejections"] == 0 and stats["failovers"] == 0
+    assert all(endpoint["failures"] == 0 for endpoint in stats["endpoints"])
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bench_single_flight import check_cancellation, check_failures, hammer_coroutines, hammer_threads
+from single_flight import SingleFlight
+
+def test_coroutines_share_requests_and_get_their_own_answer(stub_nodes):
+    node, = stub_nodes(0.02)
+    # hammer_coroutines asserts every caller got the nonce of its own sender
+    result = asyncio.run(hammer_coroutines(node, 2000, 20, True))
+    assert result["requests"] < 200
+    assert result["flights"]["coalesced"] > 1800
+
+def test_coroutines_without_coalescing_send_every_request(stub_nodes):
+    node, = stub_nodes(0.001)
+    result = asyncio.run(hammer_coroutines(node, 100, 20, False))
+    assert result["requests"] == 100
+
+def test_provider_coalesces_concurrent_thread_reads(stub_nodes):
+    node, = stub_nodes(0.02)
+    result = hammer_threads(node, 50, 4, True)
+    assert result["requests"] < 20
+    assert result["flights"]["inFlight"] == 0
+
+def test_failure_reaches_every_coroutine_waiter(stub_nodes):
+    node, = stub_nodes(0.02)
+    asyncio.run(check_failures(node, 500))
+
+def test_failure_reaches_every_thread_waiter():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait()
+        raise ConnectionError("node down")
+
+    def one(_):
+        try:
+            flights.call("down", failing)
+        except ConnectionError as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        leader = pool.submit(one, 0)
+        started.wait()
+        waiters = [pool.submit(one, i) for i in range(1, 20)]
+        while flights.stats()["coalesced"] < 19:
+            time.sleep(0.001)
+        release.set()
+        results = [leader.result()] + [waiter.result() for waiter in waiters]
+
+    assert all(isinstance(result, ConnectionError) for result in results)
+    stats = flights.stats()
+    assert stats["executed"] == 1 and stats["errors"] == 1 and stats["inFlight"] == 0
+    assert flights.call("down", lambda: "ok") == "ok"
+
+def test_cancelled_waiters_do_not_affect_the_others():
+    asyncio.run(check_cancellation(500))
+
+def test_cancelling_every_waiter_leaves_the_call_running():
+    flights = SingleFlight()
+    finished = []
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        finished.append(True)
+        return 42
+
+    async def main():
+        waiter = asyncio.ensure_future(flights.acall("slow", slow))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        # A caller arriving meanwhile joins the call that is still running
+        assert await flights.acall("slow", slow) == 42
+
+    asyncio.run(main())
+    assert finished == [True]
+    assert flights.stats()["executed"] == 1
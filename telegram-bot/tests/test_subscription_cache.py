@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from database import AsyncSupabaseDB
+
+class Query:
+    def __init__(self, table, action):
+        self.table = table
+        self.action = action
+
+    def __getattr__(self, name):
+        # select / eq / upsert chain without changing the query
+        return lambda *args, **kwargs: self
+
+class Client:
+    def table(self, name):
+        return Table(name)
+
+class Table:
+    def __init__(self, name):
+        self.name = name
+
+    def select(self, *columns):
+        return Query(self.name, "select")
+
+    def upsert(self, row, **kwargs):
+        return Query(self.name, "upsert")
+
+def test_lookup_racing_an_activation_does_not_cache_the_old_row():
+    async def main():
+        db = AsyncSupabaseDB(Client(), None, 10)
+        expiry = (datetime.now() + timedelta(days=30)).isoformat()
+        rows = {"active": False}
+        fetch_started = asyncio.Event()
+        release_fetch = asyncio.Event()
+        reads = []
+
+        async def execute(query):
+            if query.action == "upsert":
+                rows["active"] = True
+                return None
+            reads.append(rows["active"])
+            snapshot = {"telegram_id": 1, "is_active": rows["active"],
+                        "expiry_date": expiry if rows["active"] else None}
+            if len(reads) == 1:
+                # The first lookup read the old row and is still in flight
+                fetch_started.set()
+                await release_fetch.wait()
+            return type("Response", (), {"data": [snapshot]})()
+        db._execute = execute
+
+        lookup = asyncio.create_task(db.get_subscription(1))
+        await fetch_started.wait()
+        assert await db.activate_subscription(1, "0x" + "11" * 20, expiry)
+        release_fetch.set()
+        assert (await lookup)["is_active"] is False
+
+        # The stale row was not cached: the next lookup reads the new one
+        assert (await db.get_subscription(1))["is_active"] is True
+        assert reads == [False, True]
+        assert db.subscriptions.stats()["staleSkips"] == 1
+
+    asyncio.run(main())
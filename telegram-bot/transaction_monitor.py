@@ -1,9 +1,14 @@
 import asyncio
+from contextlib import aclosing
 from web3 import Web3
-from web3.types import BlockData
-from typing import List, Dict, Optional
+from web3.types import TxData
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Optional, Tuple
 from config import config
+from block_cursor import BlockCursor
 from constants import TransactionState
+from mempool_watcher import PendingSession, get_mempool_watcher
+from payment_matcher import MatchedBlock, PaymentSession, address_bytes, get_payment_matcher
+from web3_pool import get_web3
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,150 +16,237 @@ logger = logging.getLogger(__name__)
 class TransactionMonitor:
     def __init__(self, rpc_url: str):
         logger.info("🚀 Initializing Transaction Monitor...")
-        self.w3 = Web3(Web3.HTTPProvider(rpc_url))
-        
-        if not self.w3.is_connected():
-            logger.error("Failed to connect to Ethereum network")
-            raise ValueError("Failed to connect to Ethereum network")
+        self.w3 = get_web3(rpc_url)
+        self.matcher = get_payment_matcher(rpc_url)
+        self.mempool = get_mempool_watcher(rpc_url)
             
         self.start_block_number = 0
+        self.last_checked_block = 0
         self.blocks_checked = 0
         self.is_destroyed = False
         self.found_transactions: List[Dict[str, str]] = []
+        # Hex hash of the payment that confirmed, once FOUND_CORRECT_AMOUNT is returned
+        self.confirmed_tx_hash: Optional[str] = None
+        # tx hash -> (number, hash) of the block it was seen in
+        self.pending_confirmations: Dict[bytes, Tuple[int, bytes]] = {}
+        self.cursor = BlockCursor()
+        self._session: Optional[PaymentSession] = None
+        self._pending_session: Optional[PendingSession] = None
+        self.seen_in_mempool: Optional[TxData] = None
         self._stop_event = asyncio.Event()
-        logger.info(f"Connected to network: {self.w3.eth.chain_id}")
 
-    async def wait_for_confirmations(self, tx_hash: str, confirmations: int) -> Optional[Dict]:
+    async def _check_confirmations(self, head: int) -> Optional[TransactionState]:
+        # Called once per new block: every pending payment is compared against
+        # the new head, and only the ones deep enough cost a receipt lookup.
+        for tx_hash, (tx_block, tx_block_hash) in list(self.pending_confirmations.items()):
+            confirmations = head - tx_block + 1
+            if confirmations < config.CONFIRMATIONS:
+                logger.debug(f"Waiting for confirmations on {Web3.to_hex(tx_hash)}: {confirmations}/{config.CONFIRMATIONS}")
+                continue
+
+            try:
+                receipt = await asyncio.get_event_loop().run_in_executor(
+                    None, lambda: self.w3.eth.get_transaction_receipt(tx_hash)
+                )
+            except Exception as e:
+                logger.error(f"Error fetching receipt for {Web3.to_hex(tx_hash)}: {e}")
+                continue
+
+            # Only final if the block it was seen in is still canonical
+            if receipt and receipt["blockNumber"] == tx_block and bytes(receipt["blockHash"]) == tx_block_hash:
+                logger.info(f"Transaction {Web3.to_hex(tx_hash)} confirmed with {config.CONFIRMATIONS} confirmations")
+                logger.info(f"✅ Found valid transaction: {Web3.to_hex(tx_hash)}")
+                self.confirmed_tx_hash = Web3.to_hex(tx_hash)
+                return TransactionState.FOUND_CORRECT_AMOUNT
+
+            # Dropped or re-mined elsewhere; a re-mined copy is matched again
+            # when its new block arrives
+            del self.pending_confirmations[tx_hash]
+        return None
+
+    @property
+    def checkpoint(self) -> Tuple[int, Optional[bytes]]:
+        # Resuming from here re-scans any block holding a payment that was
+        # still confirming, since pending confirmations are not persisted
+        number = self.last_checked_block
+        if self.pending_confirmations:
+            number = min(number, min(block for block, _ in self.pending_confirmations.values()) - 1)
+        return number, self.cursor.hash_at(number)
+
+    def _rewind(self, number: int) -> None:
+        # The follower re-delivers blocks after a reorg; forget everything
+        # seen in the replaced blocks and check them again
+        logger.warning(f"Reorg: rescanning from block {number + 1} (was at {self.last_checked_block})")
+        self.cursor.rewind(number)
+        self.pending_confirmations = {
+            tx_hash: seen for tx_hash, seen in self.pending_confirmations.items() if seen[0] <= number
+        }
+        self.last_checked_block = number
+        self.blocks_checked = max(0, number - self.start_block_number)
+
+    async def _verify_checkpoint(self, last_checked_hash: Optional[str]) -> None:
+        # A saved hash that is no longer canonical means a reorg happened while
+        # the monitor was down, so step back far enough to rescan it
+        number = self.last_checked_block
+        if last_checked_hash is None:
+            self.cursor.reset(number, self.matcher.follower.cursor.hash_at(number))
+            return
+        saved = bytes(Web3.to_bytes(hexstr=last_checked_hash))
         try:
-            receipt = await asyncio.get_event_loop().run_in_executor(
-                None, lambda: self.w3.eth.get_transaction_receipt(tx_hash)
+            block = await asyncio.get_event_loop().run_in_executor(
+                None, lambda: self.w3.eth.get_block(number)
             )
-            
-            if not receipt:
-                return None
-
-            tx_block = receipt["blockNumber"]
-            
-            while True:
-                latest_block = await asyncio.get_event_loop().run_in_executor(
-                    None, self.w3.eth.get_block_number
-                )
-                
-                if latest_block >= tx_block + confirmations - 1:
-                    logger.info(f"Transaction {tx_hash} confirmed with {confirmations} confirmations")
-                    return receipt
-                    
-                logger.debug(f"Waiting for confirmations: {latest_block - tx_block + 1}/{confirmations}")
-                await asyncio.sleep(5)
-
         except Exception as e:
-            logger.error(f"Error waiting for confirmations: {e}")
-            return None
-
-    async def monitor_transaction(self, sender_address: str) -> TransactionState:
+            logger.error(f"Error verifying checkpoint block {number}: {e}")
+            block = None
+        if block and bytes(block["hash"]) == saved:
+            self.cursor.reset(number, saved)
+            return
+        self.last_checked_block = max(self.start_block_number, number - config.REORG_DEPTH)
+        self.blocks_checked = self.last_checked_block - self.start_block_number
+        self.cursor.reset(self.last_checked_block)
+        logger.warning(f"Checkpoint block {number} is no longer canonical, "
+                       f"rescanning from block {self.last_checked_block + 1}")
+
+    async def _matched_blocks(self, sender_address: str) -> AsyncIterator[MatchedBlock]:
+        # Blocks missed while the monitor was not running come first, then the
+        # live feed from the payment matcher
+        backfill_to = self._session.start_block
+        if self.last_checked_block < backfill_to:
+            logger.info(f"Catching up on blocks {self.last_checked_block + 1}-{backfill_to}")
+            async with aclosing(self.matcher.backfill(
+                address_bytes(sender_address), self.last_checked_block + 1, backfill_to
+            )) as matched_blocks:
+                async for matched in matched_blocks:
+                    yield matched
+
+        while True:
+            matched = await self._session.queue.get()
+            if matched is None:
+                return
+            yield matched
+
+    async def _watch_mempool(self, expected_amount_wei: int,
+                             on_pending: Callable[[TxData], Awaitable[None]]) -> None:
+        # Reports the first qualifying transfer once; the block scan below
+        # still decides when it is confirmed
+        while True:
+            tx = await self._pending_session.queue.get()
+            if tx["value"] >= expected_amount_wei:
+                logger.info(f"Payment {Web3.to_hex(tx['hash'])} seen in the mempool")
+                self.seen_in_mempool = tx
+                await on_pending(tx)
+                return
+
+    async def monitor_transaction(self, sender_address: str, start_block: Optional[int] = None,
+                                  last_checked_block: Optional[int] = None,
+                                  last_checked_hash: Optional[str] = None,
+                                  on_checkpoint: Optional[Callable[[int, Optional[bytes]], Awaitable[None]]] = None,
+                                  on_pending: Optional[Callable[[TxData], Awaitable[None]]] = None
+                                  ) -> TransactionState:
         if not Web3.is_address(sender_address):
             raise ValueError("Invalid sender address format")
 
         expected_amount_wei = Web3.to_wei(config.EXPECTED_AMOUNT, "ether")
-        network_block = await asyncio.get_event_loop().run_in_executor(
-            None, self.w3.eth.get_block, "latest"
-        )
-        self.start_block_number = network_block["number"]
+        self._session = await self.matcher.register(sender_address)
+        # A resumed job passes its original start block and checkpoint
+        self.start_block_number = self._session.start_block if start_block is None else start_block
+        self.last_checked_block = self.start_block_number if last_checked_block is None else last_checked_block
+        self.blocks_checked = self.last_checked_block - self.start_block_number
 
         logger.info(
             f"🔍 Starting transaction monitoring:\n"
             f"   - Starting from block: {self.start_block_number}\n"
+            f"   - Last checked block: {self.last_checked_block}\n"
             f"   - Expected amount: {config.EXPECTED_AMOUNT} ETH\n"
             f"   - From: {sender_address}\n"
             f"   - To: {config.RECIPIENT_ADDRESS}\n"
             f"   - Max blocks: {config.MAX_BLOCKS_TO_WAIT}"
         )
+        await self._verify_checkpoint(last_checked_hash)
 
-        current_block = self.start_block_number
+        mempool_task = None
+        if self.mempool and on_pending:
+            self._pending_session = self.mempool.register(sender_address)
+            mempool_task = asyncio.create_task(self._watch_mempool(expected_amount_wei, on_pending))
 
-        while not self.is_destroyed and not self._stop_event.is_set():
-            latest_block = await asyncio.get_event_loop().run_in_executor(
-                None, self.w3.eth.get_block_number
-            )
+        try:
+            if on_checkpoint:
+                await on_checkpoint(*self.checkpoint)
+
+            async with aclosing(self._matched_blocks(sender_address)) as matched_blocks:
+                async for matched in matched_blocks:
+                    if self.is_destroyed or self._stop_event.is_set():
+                        break
+
+                    block = matched.block
+                    head = self.cursor.head
+                    if head is not None and block["number"] <= head:
+                        self._rewind(block["number"] - 1)
 
-            if latest_block > current_block:
-                for block_number in range(current_block + 1, latest_block + 1):
-                    result = await self._check_block(
-                        block_number, sender_address, expected_amount_wei
-                    )
+                    await self._check_block(matched, expected_amount_wei)
+                    result = await self._check_confirmations(matched.block["number"])
                     if result:
                         self._stop_event.set()
                         return result
-                current_block = latest_block
 
-            if self.blocks_checked >= config.MAX_BLOCKS_TO_WAIT:
-                self._stop_event.set()
-                return (TransactionState.FOUND_INCORRECT_AMOUNT 
-                       if self.found_transactions 
-                       else TransactionState.TIMEOUT)
+                    self.cursor.append(block)
+                    self.last_checked_block = block["number"]
+                    if on_checkpoint:
+                        await on_checkpoint(*self.checkpoint)
 
-            await asyncio.sleep(5)
+                    # Keep going past the block limit while a payment is confirming
+                    if self.blocks_checked >= config.MAX_BLOCKS_TO_WAIT and not self.pending_confirmations:
+                        self._stop_event.set()
+                        return (TransactionState.FOUND_INCORRECT_AMOUNT 
+                               if self.found_transactions 
+                               else TransactionState.TIMEOUT)
+        finally:
+            self.matcher.unregister(self._session)
+            if mempool_task:
+                mempool_task.cancel()
+                self.mempool.unregister(self._pending_session)
 
         return TransactionState.TIMEOUT
 
-    async def _check_block(self, block_number: int, sender_address: str, 
-                          expected_amount_wei: int) -> Optional[TransactionState]:
+    async def _check_block(self, matched: MatchedBlock, expected_amount_wei: int) -> None:
         if self.is_destroyed or self._stop_event.is_set():
-            return None
+            return
 
+        block_number = matched.block["number"]
         try:
-            block: BlockData = await asyncio.get_event_loop().run_in_executor(
-                None, lambda: self.w3.eth.get_block(block_number, full_transactions=True)
-            )
-
-            if not block:
-                return None
-
             self.blocks_checked += 1
             logger.debug(f"Checked block {block_number} ({self.blocks_checked}/{config.MAX_BLOCKS_TO_WAIT})")
 
-            if self.blocks_checked > config.MAX_BLOCKS_TO_WAIT:
-                return (TransactionState.FOUND_INCORRECT_AMOUNT 
-                       if self.found_transactions 
-                       else TransactionState.TIMEOUT)
-
-            if not block.get("transactions"):
-                return None
-
-            for tx in block["transactions"]:
-                if self._is_target_transaction(tx, sender_address):
-                    amount_in_eth = Web3.from_wei(tx["value"], "ether")
-                    
-                    if tx["value"] < expected_amount_wei:
-                        self.found_transactions.append({
-                            "hash": tx["hash"], 
-                            "amount": str(amount_in_eth)
-                        })
-                        continue
-
-                    if tx["value"] >= expected_amount_wei:
-                        receipt = await self.wait_for_confirmations(
-                            tx["hash"], config.CONFIRMATIONS
-                        )
-                        if receipt:
-                            logger.info(f"✅ Found valid transaction: {tx['hash']}")
-                            return TransactionState.FOUND_CORRECT_AMOUNT
-
-            return None
+            # The matcher has already reduced the block to transfers from the
+            # sender to the recipient
+            for tx in matched.payments:
+                amount_in_eth = Web3.from_wei(tx["value"], "ether")
+                
+                if tx["value"] < expected_amount_wei:
+                    self.found_transactions.append({
+                        "hash": tx["hash"], 
+                        "amount": str(amount_in_eth)
+                    })
+                    continue
+
+                if tx["value"] >= expected_amount_wei:
+                    # Track it without blocking; confirmations are checked
+                    # against every following block from the main loop
+                    logger.info(f"Found candidate transaction {Web3.to_hex(tx['hash'])} in block {block_number}")
+                    self.pending_confirmations[tx["hash"]] = (block_number, bytes(matched.block["hash"]))
 
         except Exception as e:
             if not self.is_destroyed:
                 logger.error(f"Error processing block {block_number}: {e}")
-            return None
-
-    def _is_target_transaction(self, tx, sender_address: str) -> bool:
-        return (tx["from"].lower() == sender_address.lower() and
-                tx.get("to") and 
-                tx["to"].lower() == config.RECIPIENT_ADDRESS.lower())
 
     async def destroy(self):
         logger.info("🧹 Cleaning up monitor resources...")
         self.is_destroyed = True
         self._stop_event.set()
+        if self._session:
+            self.matcher.unregister(self._session)
+        if self._pending_session:
+            self.mempool.unregister(self._pending_session)
         await asyncio.sleep(0.1)
         logger.info("✅ Cleanup completed")
\ No newline at end of file
@@ -1,13 +1,15 @@
 from web3 import Web3
-import rlp
 from datetime import datetime
 import logging
+import time
 
-logger = logging.getLogger(__name__)
+# Re-exported for older imports; new code imports these from prediction
+from prediction import predict_contract_address, predict_contract_addresses
+
+__all__ = ["predict_contract_address", "predict_contract_addresses", "is_subscribed",
+           "validate_eth_address", "format_watchlist_entry"]
 
-def predict_contract_address(sender: str, nonce: int) -> str:
-    encoded = Web3.keccak(rlp.encode([Web3.to_bytes(hexstr=sender), nonce]))[12:]
-    return Web3.to_checksum_address(encoded)
+logger = logging.getLogger(__name__)
 
 def is_subscribed(subscription: dict) -> bool:
     logger.debug(f"Checking subscription: {subscription}")
@@ -16,6 +18,11 @@ def is_subscribed(subscription: dict) -> bool:
         logger.debug("Subscription not active or not found")
         return False
     
+    # Rows from the subscription cache carry the parsed expiry
+    expires_at = subscription.get("expires_at")
+    if expires_at is not None:
+        return expires_at > time.time()
+    
     expiry_date = subscription.get("expiry_date")
     if expiry_date:
         is_valid = datetime.fromisoformat(expiry_date) > datetime.now()
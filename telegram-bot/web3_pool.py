@@ -0,0 +1,57 @@
+import logging
+import threading
+from typing import Dict, Iterable
+
+from web3 import Web3
+
+from config import config
+from rpc_router import MultiEndpointProvider
+
+logger = logging.getLogger(__name__)
+
+# One Web3 client per network, shared by every handler, monitor, follower and
+# balance lookup on it, keyed by the network's primary RPC URL. Each client
+# routes over all of the network's endpoints (see MultiEndpointProvider) with
+# a pool of keep-alive connections per endpoint, so calls reuse warm
+# connections instead of opening a new one per Web3 instance. Chain IDs are
+# checked once at startup by `validate_networks`; nothing else needs to ask
+# the node who it is.
+_clients: Dict[str, Web3] = {}
+_lock = threading.Lock()
+
+def get_web3(rpc_url: str) -> Web3:
+    with _lock:
+        if rpc_url not in _clients:
+            _clients[rpc_url] = Web3(MultiEndpointProvider(
+                config.rpc_urls_for(rpc_url),
+                pool_size=config.RPC_POOL_SIZE,
+                timeout=config.RPC_TIMEOUT,
+                hedge=config.RPC_HEDGE,
+                hedge_min_delay=config.RPC_HEDGE_MIN_DELAY,
+                eject_after=config.RPC_EJECT_AFTER,
+                eject_seconds=config.RPC_EJECT_SECONDS
+            ))
+        return _clients[rpc_url]
+
+def get_network_web3(network: str) -> Web3:
+    return get_web3(config.rpc_url_for(network))
+
+def validate_networks(networks: Iterable[str] = config.NETWORKS) -> None:
+    # Every endpoint is asked on its own. A wrong chain ID is a configuration
+    # error and stops the bot; an unreachable endpoint is only logged, since
+    # it may come back later
+    for network in networks:
+        expected = config.CHAIN_IDS[network]
+        for endpoint, chain_id in get_network_web3(network).provider.request_each("eth_chainId").items():
+            if isinstance(chain_id, Exception):
+                logger.error(f"Could not reach {network} RPC endpoint {endpoint}: {chain_id}")
+                continue
+            if int(chain_id, 16) != expected:
+                raise ValueError(f"{network} RPC endpoint {endpoint} reports chain ID {int(chain_id, 16)}, "
+                                 f"expected {expected}")
+            logger.info(f"Connected to {network} RPC endpoint {endpoint} (chain ID {expected})")
+
+def rpc_stats() -> Dict[str, Dict]:
+    with _lock:
+        clients = dict(_clients)
+    return {str(w3.provider): w3.provider.stats() for w3 in clients.values()}
@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+# Collects rows from request threads and writes them from one background
+# thread with `write(rows)`, as soon as `batch_size` rows are waiting or
+# `flush_interval` seconds after the first one arrived. At most `max_backlog`
+# rows wait in memory; when full, `overflow` decides whether the oldest row is
+# dropped, the new row is dropped, or the caller blocks for up to
+# `block_timeout` seconds before its row is dropped. A failed batch is put
+# back at the front of the queue and retried on the next flush.
+class WriteBehindQueue:
+    def __init__(self, write: Callable[[List[Dict[str, Any]]], None], batch_size: int = 100,
+                 flush_interval: float = 1.0, max_backlog: int = 10_000,
+                 overflow: str = "drop_oldest", block_timeout: float = 1.0, name: str = "write-behind"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {', '.join(OVERFLOW_POLICIES)}")
+        self.write = write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backlog = max_backlog
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self._rows: Deque[Dict[str, Any]] = deque()
+        self._first_row_at = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._space = threading.Condition(self._lock)
+        self._stats = {"enqueued": 0, "written": 0, "dropped": 0, "batches": 0, "failedBatches": 0}
+        self._last_batch_ms = None
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def put(self, row: Dict[str, Any]) -> bool:
+        with self._lock:
+            if self._closed:
+                self._stats["dropped"] += 1
+                return False
+            if len(self._rows) >= self.max_backlog:
+                if self.overflow == "drop_newest":
+                    self._stats["dropped"] += 1
+                    return False
+                if self.overflow == "block":
+                    self._space.wait_for(lambda: len(self._rows) < self.max_backlog or self._closed,
+                                         self.block_timeout)
+                    if len(self._rows) >= self.max_backlog or self._closed:
+                        self._stats["dropped"] += 1
+                        return False
+                else:
+                    self._rows.popleft()
+                    self._stats["dropped"] += 1
+            if not self._rows:
+                # Start the flush timer
+                self._first_row_at = time.monotonic()
+                self._wakeup.notify()
+            self._rows.append(row)
+            self._stats["enqueued"] += 1
+            if len(self._rows) >= self.batch_size:
+                self._wakeup.notify()
+            return True
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        batch = [self._rows.popleft() for _ in range(min(self.batch_size, len(self._rows)))]
+        self._first_row_at = time.monotonic() if self._rows else None
+        self._space.notify_all()
+        return batch
+
+    def _due(self) -> bool:
+        return (len(self._rows) >= self.batch_size or self._closed or
+                (self._first_row_at is not None and
+                 time.monotonic() - self._first_row_at >= self.flush_interval))
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._due():
+                    timeout = None
+                    if self._first_row_at is not None:
+                        timeout = max(0.0, self._first_row_at + self.flush_interval - time.monotonic())
+                    self._wakeup.wait(timeout)
+                if self._closed and not self._rows:
+                    return
+                batch = self._take_batch()
+            self._write(batch)
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        start = time.perf_counter()
+        try:
+            self.write(batch)
+        except Exception as e:
+            logger.error(f"Write-behind batch of {len(batch)} rows failed: {e}")
+            with self._lock:
+                self._stats["failedBatches"] += 1
+                if self._closed:
+                    self._stats["dropped"] += len(batch)
+                    return
+                # Retry later, keeping the backlog bound
+                room = max(0, self.max_backlog - len(self._rows))
+                self._rows.extendleft(reversed(batch[:room]))
+                self._stats["dropped"] += max(0, len(batch) - room)
+                self._first_row_at = time.monotonic()
+            time.sleep(self.flush_interval)
+            return
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["written"] += len(batch)
+            self._last_batch_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    def close(self, timeout: float = 10.0) -> None:
+        # Flushes what is queued, then stops the writer thread
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+            self._space.notify_all()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Write-behind queue closed with {len(self._rows)} rows unwritten")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "depth": len(self._rows),
+                "maxBacklog": self.max_backlog,
+                "overflow": self.overflow,
+                "lastBatchMs": self._last_batch_ms,
+                **self._stats,
+            }
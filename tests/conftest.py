@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "telegram-bot"))
+
+# app.py reads its configuration at import; point it at nothing reachable so
+# the tests never touch a real database or node
+os.environ.update(
+    SUPABASE_URL="http://127.0.0.1:9",
+    SUPABASE_KEY="x.y.z",
+    ETH_RPC_URL="http://127.0.0.1:9",
+    RPC_TIMEOUT="1",
+)
+
+@pytest.fixture(scope="session")
+def app_module():
+    import app
+    return app
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,71 @@
+import json
+import threading
+import time
+
+from write_behind import WriteBehindQueue
+
+class FakeTable:
+    def __init__(self):
+        self.inserts = []
+
+    def insert(self, rows):
+        self.inserts.append(list(rows))
+        return self
+
+    def execute(self):
+        return type("Response", (), {"data": self.inserts[-1]})()
+
+def wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met"
+        time.sleep(0.01)
+
+def test_failed_indexing_does_not_rewrite_the_batch(app_module, monkeypatch):
+    table = FakeTable()
+    monkeypatch.setattr(app_module.supabase, "table", lambda name: table)
+
+    def broken_index(senders):
+        raise OSError("disk full")
+    monkeypatch.setattr(app_module.reverse_index, "add_senders", broken_index)
+
+    writes = WriteBehindQueue(app_module.insert_predictions, flush_interval=0.01)
+    writes.put({"contract_address": "0x" + "11" * 20})
+    wait_until(lambda: app_module.sender_indexing.stats()["batches"] >= 1)
+    writes.close()
+
+    assert len(table.inserts) == 1
+    assert writes.stats()["failedBatches"] == 0
+    assert writes.stats()["written"] == 1
+
+def test_reverse_lookup_answers_503_while_warming_up(app_module, client, monkeypatch):
+    address = "0x" + "22" * 20
+    monkeypatch.setattr(app_module.reverse_index, "ready", threading.Event())
+    assert client.get(f"/reverse/{address}").status_code == 503
+    app_module.reverse_index.ready.set()
+    assert client.get(f"/reverse/{address}").status_code == 404
+
+def test_range_rejects_an_invalid_address_buffered_and_streamed(client):
+    for stream in (False, True):
+        response = client.post("/predict", json={"contractAddress": "0x1234", "count": 3, "nonceStart": 0,
+                                                 "stream": stream})
+        assert response.status_code == 400
+        assert response.get_json() == {"error": "Invalid contractAddress parameter"}
+
+def test_range_streams_complete_json(client):
+    response = client.post("/predict", json={"contractAddress": "0x" + "11" * 20, "count": 3, "nonceStart": 0,
+                                             "stream": "true"})
+    assert response.status_code == 200
+    assert len(json.loads(response.get_data(as_text=True))["predictedAddresses"]) == 3
+
+def test_cache_network_follows_the_node_chain(monkeypatch):
+    import predict_api
+    monkeypatch.delenv("ETH_NETWORK", raising=False)
+    assert predict_api.cache_network("http://node", lambda: 11155111) == "sepolia"
+    assert predict_api.cache_network("http://node", lambda: 10) == "chain-10"
+
+    def unreachable():
+        raise ConnectionError("refused")
+    assert predict_api.cache_network("http://node", unreachable) == "http://node"
+    monkeypatch.setenv("ETH_NETWORK", "mainnet")
+    assert predict_api.cache_network("http://node", unreachable) == "mainnet"
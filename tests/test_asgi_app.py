@@ -0,0 +1,32 @@
+import asyncio
+import json
+
+import pytest
+
+ADDRESS = "0x" + "11" * 20
+
+@pytest.fixture(scope="module")
+def asgi_module():
+    import asgi_app
+    return asgi_app
+
+def asgi_post(asgi_module, body):
+    async def post():
+        response = await asgi_module.app.test_client().post("/predict", json=body)
+        return response.status_code, await response.get_data(as_text=True)
+    return asyncio.run(post())
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"contractAddress": "0x1234"},
+    {"contractAddress": ADDRESS, "count": "three"},
+    {"contractAddress": ADDRESS, "count": 0, "nonceStart": 0},
+    {"contractAddress": ADDRESS, "count": 10 ** 9, "nonceStart": 0},
+    {"contractAddress": ADDRESS, "count": 3, "nonceStart": 5},
+    {"contractAddress": ADDRESS, "count": 3, "nonceStart": 5, "stream": True},
+])
+def test_both_front_ends_answer_predict_alike(client, asgi_module, body):
+    flask_response = client.post("/predict", json=body)
+    status, text = asgi_post(asgi_module, body)
+    assert status == flask_response.status_code
+    assert json.loads(text) == json.loads(flask_response.get_data(as_text=True))